@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 """
 Демонстрация визуализации для 3 различных пакетов
+
+Использование: visualization_demo.py [КАТАЛОГ]
+
+КАТАЛОГ - сохранённый вывод `npm ls --all --json` для пакетов
+(<пакет>.json); без него сравнение со штатными инструментами пропускается.
 """
 
 import os
@@ -13,7 +18,7 @@ from src.visualizer import DependencyVisualizer
 from src.ascii_tree import generate_ascii_tree
 
 
-def main():
+def main(native_dir=None):
     # Примеры графов для демонстрации
     demo_graphs = {
         "react": {
@@ -68,15 +73,18 @@ def main():
         visualizer.save_plantuml_image(package_name, image_file)
 
         # Сравнение
-        comparison = visualizer.compare_with_native_tools(package_name)
+        native_dump = os.path.join(native_dir, f"{package_name}.json") if native_dir else None
         comparison_file = os.path.join(output_dir, f"{package_name}_comparison.txt")
 
         with open(comparison_file, 'w', encoding='utf-8') as f:
             f.write(f"Сравнение для {package_name}\n")
-            f.write(f"Наши зависимости: {len(comparison['our_dependencies'])}\n")
-            f.write(f"Штатные зависимости: {len(comparison['native_dependencies'])}\n")
-            f.write(
-                f"Расхождения: {len(comparison['differences']['missing_in_native']) + len(comparison['differences']['missing_in_our'])}\n")
+            if native_dump and os.path.exists(native_dump):
+                comparison = visualizer.compare_with_native_tools(package_name, native_dump)
+                f.write(f"Наши зависимости: {comparison.our_packages}\n")
+                f.write(f"Штатные зависимости: {comparison.native_packages}\n")
+                f.write(f"Расхождения: {len(comparison.missing_in_native) + len(comparison.missing_in_our)}\n")
+            else:
+                f.write(f"Штатный вывод не задан ({native_dump or 'КАТАЛОГ'}), сравнение не выполнялось\n")
 
         print(f"✓ Сравнение: {comparison_file}")
 
@@ -84,4 +92,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
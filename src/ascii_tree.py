@@ -1,28 +1,74 @@
-def print_ascii_tree(dependency_graph, root_package: str, prefix: str = "", is_last: bool = True):
-    connector = "└── " if is_last else "├── "
-    print(prefix + connector + root_package)
-
-    if is_last:
-        new_prefix = prefix + "    "
-    else:
-        new_prefix = prefix + "│   "
-
-    deps = []
-    if hasattr(dependency_graph, 'get'):
-        deps = dependency_graph.get(root_package, [])
-    elif hasattr(dependency_graph, 'dependencies'):
-        deps = dependency_graph.dependencies.get(root_package, [])
-
-    for i, dep in enumerate(deps):
-        is_last_dep = (i == len(deps) - 1)
-        if dep != root_package:
-            print_ascii_tree(dependency_graph, dep, new_prefix, is_last_dep)
-
-
-def generate_ascii_tree(dependency_graph, root_package: str) -> str:
-    import io
-    import contextlib
+import io
+import sys
+
+try:
+    from . import profiling
+    from .dependency_graph import dependency_getter
+except ImportError:
+    import profiling
+    from dependency_graph import dependency_getter
+
+
+@profiling.profiled("render.ascii")
+def write_ascii_tree(dependency_graph, root_package: str, out, prefix: str = "", is_last: bool = True,
+                     max_depth=None, max_nodes=None) -> int:
+    """Пишет ASCII-дерево в out построчно и возвращает число выведенных узлов
+
+    Обход итеративный, поэтому глубина дерева не ограничена стеком Python.
+    Каждый узел раскрывается один раз: повторные вхождения помечаются
+    "(см. выше)", обратные рёбра - "(цикл)", так что время линейно от
+    размера графа даже при большом числе ромбов.
+    """
+    get_dependencies = dependency_getter(dependency_graph)
+    expanded = set()
+    on_path = set()
+    written = 0
+
+    # Элементы стека: (пакет, префикс, последний ли, глубина);
+    # префикс None - маркер выхода из поддерева пакета
+    stack = [(root_package, prefix, is_last, 0)]
+    while stack:
+        package, prefix, is_last, depth = stack.pop()
+        if prefix is None:
+            on_path.discard(package)
+            continue
+
+        if max_nodes is not None and written >= max_nodes:
+            out.write(f"... (вывод ограничен {max_nodes} узлами)\n")
+            break
+
+        deps = get_dependencies(package)
+        suffix = ""
+        if package in on_path:
+            suffix, deps = " (цикл)", ()
+        elif deps and package in expanded:
+            suffix, deps = " (см. выше)", ()
+        elif deps and max_depth is not None and depth >= max_depth:
+            suffix, deps = " (...)", ()
+
+        connector = "└── " if is_last else "├── "
+        out.write(prefix + connector + package + suffix + "\n")
+        written += 1
+        if not deps:
+            continue
+
+        expanded.add(package)
+        on_path.add(package)
+        stack.append((package, None, None, None))
+        child_prefix = prefix + ("    " if is_last else "│   ")
+        last = len(deps) - 1
+        for i in range(last, -1, -1):
+            stack.append((deps[i], child_prefix, i == last, depth + 1))
+
+    return written
+
+
+def print_ascii_tree(dependency_graph, root_package: str, prefix: str = "", is_last: bool = True,
+                     max_depth=None, max_nodes=None):
+    write_ascii_tree(dependency_graph, root_package, sys.stdout, prefix, is_last, max_depth, max_nodes)
+
+
+def generate_ascii_tree(dependency_graph, root_package: str, max_depth=None, max_nodes=None) -> str:
     output = io.StringIO()
-    with contextlib.redirect_stdout(output):
-        print_ascii_tree(dependency_graph, root_package)
-    return output.getvalue()
\ No newline at end of file
+    write_ascii_tree(dependency_graph, root_package, output, max_depth=max_depth, max_nodes=max_nodes)
+    return output.getvalue()
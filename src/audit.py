@@ -0,0 +1,400 @@
+"""Офлайн-проверка графа по локальной базе уведомлений об уязвимостях
+
+База - выгрузка в формате OSV (как в github/advisory-database и архивах
+osv.dev: отдельные JSON, каталог, zip, JSON-массив или JSON Lines) или
+записи GitHub Security Advisories REST API. Учитываются только пакеты
+экосистемы npm.
+
+Для каждого пакета уведомления хранятся как полуинтервалы [начало,
+конец) на оси версий: граница - пара (ключ semver, сторона), где
+сторона 1 означает "сразу после версии", поэтому включённость границ
+сводится к сравнению кортежей. При первом запросе пакета его интервалы
+компилируются в отсортированные точки разбиения и для каждого отрезка
+между ними - кортеж уведомлений, которые его покрывают. Проверка версии -
+бинарный поиск отрезка, так что граф из V узлов проверяется за
+O(V log k), где k - число границ у пакета, а не за V * (число уведомлений).
+"""
+
+import json
+import os
+import zipfile
+from bisect import bisect_left, bisect_right
+
+try:
+    from . import profiling
+    from .errors import ConfigError, InvalidURLError
+    from .native import package_name
+    from .reachability import ReachabilityIndex
+    from .semver import compile_range, parse_version
+except ImportError:
+    import profiling
+    from errors import ConfigError, InvalidURLError
+    from native import package_name
+    from reachability import ReachabilityIndex
+    from semver import compile_range, parse_version
+
+
+SEVERITIES = ("low", "moderate", "high", "critical")
+_SEVERITY_ALIASES = {"medium": "moderate"}
+
+
+def normalize_severity(severity):
+    """Уровень из SEVERITIES или None для неизвестного"""
+    if not isinstance(severity, str):
+        return None
+    severity = severity.strip().lower()
+    severity = _SEVERITY_ALIASES.get(severity, severity)
+    return severity if severity in SEVERITIES else None
+
+
+def severity_rank(severity):
+    """Порядковый номер уровня; неизвестный - ниже low"""
+    return SEVERITIES.index(severity) if severity in SEVERITIES else -1
+
+
+class Advisory:
+    """Уведомление: идентификатор, описание, уровень и исправленные версии по пакетам"""
+
+    __slots__ = ("id", "summary", "severity", "aliases", "url", "fixed")
+
+    def __init__(self, advisory_id, summary=None, severity=None, aliases=(), url=None):
+        self.id = advisory_id
+        self.summary = summary
+        self.severity = normalize_severity(severity)
+        self.aliases = list(aliases)
+        self.url = url
+        self.fixed = {}
+
+    def to_dict(self):
+        return {"id": self.id, "summary": self.summary, "severity": self.severity,
+                "aliases": self.aliases, "url": self.url, "fixed": self.fixed}
+
+
+def _start(key, inclusive):
+    return None if key is None else (key, 0 if inclusive else 1)
+
+
+def _end(key, inclusive):
+    return None if key is None else (key, 1 if inclusive else 0)
+
+
+class AdvisoryIndex:
+    """Интервальный индекс уведомлений по пакетам npm
+
+    packages - множество имён, которые нужно индексировать (например,
+    пакеты проверяемого графа); остальные записи базы только разбираются.
+    """
+
+    def __init__(self, packages=None):
+        self.only = packages
+        self.advisories = []
+        self.skipped = 0
+        self._ranges = {}
+        self._exact = {}
+        self._compiled = {}
+
+    def __len__(self):
+        return len(self.advisories)
+
+    def packages(self):
+        return set(self._ranges) | set(self._exact)
+
+    def _register(self, advisory):
+        self.advisories.append(advisory)
+        return len(self.advisories) - 1
+
+    def _add_range(self, name, start, end, advisory):
+        if start is not None and end is not None and start >= end:
+            return
+        self._ranges.setdefault(name, []).append((start, end, advisory))
+        self._compiled.pop(name, None)
+
+    def _add_exact(self, name, version, advisory):
+        self._exact.setdefault(name, {}).setdefault(version, []).append(advisory)
+
+    def add(self, document):
+        """Добавляет запись OSV или GitHub REST API; False, если она не относится к npm"""
+        if document.get("withdrawn") or document.get("withdrawn_at"):
+            return False
+        if "affected" in document:
+            return self._add_osv(document)
+        if "vulnerabilities" in document:
+            return self._add_github(document)
+        self.skipped += 1
+        return False
+
+    def _relevant(self, entries):
+        """Записи о пакетах npm (из числа индексируемых)"""
+        found = []
+        for entry in entries or ():
+            package = entry.get("package") or {}
+            if str(package.get("ecosystem", "")).lower() == "npm" and \
+                    (self.only is None or package.get("name") in self.only):
+                found.append(entry)
+        return found
+
+    def _add_osv(self, document):
+        affected = self._relevant(document.get("affected"))
+        if not affected:
+            return False
+        database = document.get("database_specific") or {}
+        references = document.get("references") or ()
+        advisory = Advisory(document.get("id"), document.get("summary") or document.get("details"),
+                            database.get("severity"), document.get("aliases") or (),
+                            next((ref.get("url") for ref in references if ref.get("type") == "ADVISORY"), None))
+        index = self._register(advisory)
+
+        for entry in affected:
+            name = entry["package"]["name"]
+            for version in entry.get("versions") or ():
+                self._add_exact(name, version, index)
+            for affected_range in entry.get("ranges") or ():
+                if affected_range.get("type") not in ("SEMVER", "ECOSYSTEM"):
+                    continue
+                if not self._add_events(name, affected_range.get("events") or (), index, advisory):
+                    self.skipped += 1
+        return True
+
+    def _add_events(self, name, events, index, advisory):
+        """Интервалы из событий OSV: introduced открывает, fixed/limit/last_affected закрывают"""
+        bounds = []
+        start, opened = None, False
+        for event in events:
+            if "introduced" in event:
+                version = event["introduced"]
+                key = None if version == "0" else parse_version(version)
+                if version != "0" and key is None:
+                    return False
+                start, opened = _start(key, True), True
+                continue
+            if "fixed" in event:
+                advisory.fixed.setdefault(name, []).append(event["fixed"])
+            for kind, inclusive in (("fixed", False), ("limit", False), ("last_affected", True)):
+                if kind in event and opened:
+                    key = parse_version(event[kind])
+                    if key is None:
+                        return False
+                    bounds.append((start, _end(key, inclusive)))
+                    opened = False
+        if opened:
+            bounds.append((start, None))
+        for start, end in bounds:
+            self._add_range(name, start, end, index)
+        return True
+
+    def _add_github(self, document):
+        vulnerabilities = self._relevant(document.get("vulnerabilities"))
+        if not vulnerabilities:
+            return False
+        advisory_id = document.get("ghsa_id") or document.get("id")
+        aliases = [document["cve_id"]] if document.get("cve_id") else []
+        advisory = Advisory(advisory_id, document.get("summary"), document.get("severity"), aliases,
+                            document.get("html_url"))
+        index = self._register(advisory)
+
+        for entry in vulnerabilities:
+            name = entry["package"]["name"]
+            patched = entry.get("first_patched_version")
+            if isinstance(patched, dict):
+                patched = patched.get("identifier")
+            if patched:
+                advisory.fixed.setdefault(name, []).append(patched)
+            # "< 4.17.21", ">= 1.0.0, < 1.2.3": запятые - это пересечение, как пробел в npm
+            compiled = compile_range((entry.get("vulnerable_version_range") or "").replace(",", " "))
+            if compiled is None:
+                self.skipped += 1
+                continue
+            for interval in compiled.intervals:
+                self._add_range(name, _start(interval.low, interval.low_inclusive),
+                                _end(interval.high, interval.high_inclusive), index)
+        return True
+
+    def _compile(self, name):
+        """(точки разбиения, покрытия отрезков) для пакета; строится один раз"""
+        compiled = self._compiled.get(name)
+        if compiled is not None:
+            return compiled
+        ranges = self._ranges.get(name, ())
+        points = sorted({point for start, end, _ in ranges for point in (start, end) if point is not None})
+        opened = [[] for _ in range(len(points) + 1)]
+        closed = [[] for _ in range(len(points) + 1)]
+        for start, end, advisory in ranges:
+            # Отрезок s - [points[s - 1], points[s]); интервал покрывает отрезки first..last
+            first = 0 if start is None else bisect_left(points, start) + 1
+            last = len(points) if end is None else bisect_left(points, end)
+            opened[first].append(advisory)
+            closed[last].append(advisory)
+
+        covers = []
+        active = {}
+        previous = ()
+        for segment in range(len(points) + 1):
+            for advisory in opened[segment]:
+                active[advisory] = active.get(advisory, 0) + 1
+            cover = tuple(sorted(active))
+            # Соседние отрезки с одинаковым покрытием делят один кортеж
+            previous = previous if cover == previous else cover
+            covers.append(previous)
+            for advisory in closed[segment]:
+                active[advisory] -= 1
+                if not active[advisory]:
+                    del active[advisory]
+        compiled = self._compiled[name] = (points, covers)
+        return compiled
+
+    def match(self, name, version):
+        """Номера уведомлений, затрагивающих name@version, по возрастанию"""
+        found = set(self._exact.get(name, {}).get(version, ()))
+        if name in self._ranges:
+            key = parse_version(version)
+            if key is not None:
+                points, covers = self._compile(name)
+                found.update(covers[bisect_right(points, (key, 0))])
+        return sorted(found)
+
+
+def _documents(data):
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        yield data
+
+
+def _read_json(data, source):
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        raise ConfigError(f"Ошибка формата JSON в {source}: {e}")
+
+
+def _iter_documents(path):
+    if os.path.isdir(path):
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.endswith(".json"):
+                    file_path = os.path.join(directory, name)
+                    with open(file_path, "rb") as f:
+                        yield from _documents(_read_json(f.read(), file_path))
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith(".json"):
+                    yield from _documents(_read_json(archive.read(member), f"{path}:{member}"))
+    elif path.endswith((".jsonl", ".ndjson")):
+        with open(path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield _read_json(line, f"{path}:{number}")
+    else:
+        with open(path, "rb") as f:
+            yield from _documents(_read_json(f.read(), path))
+
+
+@profiling.profiled("audit.load")
+def load_advisories(path, packages=None, index=None):
+    """Загружает выгрузку уведомлений (файл, JSON Lines, zip или каталог) в индекс
+
+    packages - индексировать только эти пакеты (см. AdvisoryIndex).
+    """
+    if not os.path.exists(path):
+        raise InvalidURLError(f"База уведомлений не найдена: {path}")
+    index = index if index is not None else AdvisoryIndex(packages)
+    for document in _iter_documents(path):
+        if isinstance(document, dict):
+            index.add(document)
+        else:
+            index.skipped += 1
+    profiling.count("audit.advisories", len(index))
+    return index
+
+
+class AuditReport:
+    """Найденные уязвимые узлы графа
+
+    findings - список {"node", "package", "version", "depth", "advisories",
+    "paths"}; advisories - номера в index.advisories, paths - кратчайшие
+    пути от корня. checked - число проверенных узлов, unversioned - узлов
+    без версии (их проверить нельзя).
+    """
+
+    def __init__(self, root, index):
+        self.root = root
+        self.index = index
+        self.findings = []
+        self.checked = 0
+        self.unversioned = 0
+
+    def advisories(self):
+        """Номера всех сработавших уведомлений"""
+        return sorted({advisory for finding in self.findings for advisory in finding["advisories"]})
+
+    def to_dict(self):
+        advisories = self.index.advisories
+        return {
+            "root": self.root,
+            "checked": self.checked,
+            "unversioned": self.unversioned,
+            "vulnerable": len(self.findings),
+            "findings": [dict(finding, advisories=[advisories[i].id for i in finding["advisories"]])
+                         for finding in self.findings],
+            "advisories": {advisories[i].id: advisories[i].to_dict() for i in self.advisories()},
+        }
+
+
+def graph_packages(graph):
+    """Имена пакетов графа (без суффиксов @версия) - для AdvisoryIndex(packages)"""
+    versions = getattr(graph, "versions", None) or {}
+    return {package_name(key, versions.get(key)) for key in graph.to_csr().names}
+
+
+@profiling.profiled("audit.match")
+def audit_graph(graph, index, root=None, paths=1, min_severity=None):
+    """Сверяет все узлы (имя, версия) графа с индексом и ищет пути к уязвимым
+
+    min_severity - не сообщать об уведомлениях ниже этого уровня.
+    Находки отсортированы от самых серьёзных.
+    """
+    csr = graph.to_csr()
+    versions = getattr(graph, "versions", None) or {}
+    if root is None and csr.node_count:
+        root = csr.names[0]
+    report = AuditReport(root, index)
+    threshold = severity_rank(normalize_severity(min_severity)) if min_severity else None
+    advisories = index.advisories
+    known = index.packages()
+
+    matched = []
+    for node, key in enumerate(csr.names):
+        version = versions.get(key)
+        if not version:
+            report.unversioned += 1
+            continue
+        report.checked += 1
+        name = package_name(key, version)
+        if name not in known:
+            continue
+        found = index.match(name, version)
+        if threshold is not None:
+            found = [i for i in found if severity_rank(advisories[i].severity) >= threshold]
+        if found:
+            matched.append((key, name, version, found))
+
+    if matched:
+        with profiling.phase("audit.paths"):
+            reachability = ReachabilityIndex(graph, [root])
+            for key, name, version, found in matched:
+                distance = reachability.distance[reachability.node(key)]
+                report.findings.append({
+                    "node": key,
+                    "package": name,
+                    "version": version,
+                    "depth": distance if distance >= 0 else None,
+                    "advisories": found,
+                    "paths": reachability.paths(key, paths),
+                })
+    report.findings.sort(key=lambda finding: (
+        -max(severity_rank(advisories[i].severity) for i in finding["advisories"]),
+        finding["package"], finding["version"]))
+    profiling.count("audit.findings", len(report.findings))
+    return report
@@ -0,0 +1,145 @@
+"""Пакетный режим: каждая строка config.csv - отдельное задание в пуле процессов"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from .cache import PackumentCache
+    from .exporters import export_to_file
+    from .load_order import load_waves
+    from .ascii_tree import write_ascii_tree
+except ImportError:
+    from cache import PackumentCache
+    from exporters import export_to_file
+    from load_order import load_waves
+    from ascii_tree import write_ascii_tree
+
+
+MANIFEST_NAME = "manifest.json"
+
+# Состояние процесса-обработчика: общий словарь разрешённых узлов,
+# каталог кэша и клиенты реестра, живущие между заданиями
+_worker = {}
+
+
+def _init_worker(resolved, cache_dir):
+    _worker.clear()
+    _worker["resolved"] = resolved
+    _worker["cache_dir"] = cache_dir
+    _worker["clients"] = {}
+
+
+def _analyze(config):
+    """analyze_package из CLI с клиентом реестра, общим для заданий процесса"""
+    try:
+        from .cli import analyze_package, registry_url
+        from .npm_client import NPMClient
+    except ImportError:
+        from cli import analyze_package, registry_url
+        from npm_client import NPMClient
+
+    clients = _worker.setdefault("clients", {})
+    base_url = registry_url(config)
+    client = clients.get(base_url)
+    if client is None:
+        cache_dir = _worker.get("cache_dir")
+        cache = PackumentCache(cache_dir) if cache_dir else PackumentCache.default()
+        client = clients[base_url] = NPMClient(base_url, cache=cache, resolved=_worker.get("resolved"))
+    return analyze_package(config, registry=client)
+
+
+def job_directory(output_dir, row, package_name):
+    safe_name = re.sub(r"[^\w.@-]+", "_", package_name)
+    return os.path.join(output_dir, f"{row:04d}_{safe_name}")
+
+
+def run_job(row, config, output_dir):
+    """Выполняет одно задание и возвращает его запись для манифеста
+
+    Вывод анализа пишется в analysis.log каталога задания; рядом
+    сохраняются граф (JSON), порядок загрузки и, если включено в строке
+    конфигурации, ASCII-дерево. Ошибка задания не прерывает пакет, а
+    попадает в манифест.
+    """
+    directory = job_directory(output_dir, row, config.package_name)
+    os.makedirs(directory, exist_ok=True)
+    record = {
+        "row": row,
+        "package": config.package_name,
+        "repository_url": config.repository_url,
+        "test_mode": config.test_mode,
+        "directory": os.path.relpath(directory, output_dir),
+        "status": "ok",
+        "outputs": {},
+    }
+    outputs = record["outputs"]
+    started = time.perf_counter()
+    log_path = os.path.join(directory, "analysis.log")
+    outputs["log"] = os.path.basename(log_path)
+    try:
+        with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            graph = _analyze(config)
+
+        root = config.package_name
+        outputs["graph"] = "graph.json"
+        record["edges"] = export_to_file(graph, root, "json", os.path.join(directory, "graph.json"))
+        record["nodes"] = graph.to_csr().node_count
+
+        waves = load_waves(graph, root)
+        outputs["load_order"] = "load_order.json"
+        with open(os.path.join(directory, "load_order.json"), "w", encoding="utf-8") as f:
+            json.dump(waves.to_dict(), f, ensure_ascii=False, indent=2)
+
+        if config.ascii_tree_output:
+            outputs["ascii_tree"] = "ascii_tree.txt"
+            with open(os.path.join(directory, "ascii_tree.txt"), "w", encoding="utf-8") as f:
+                write_ascii_tree(graph, root, f)
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(configs, output_dir, workers=None, cache_dir=None, progress=print):
+    """Выполняет задания в пуле процессов и пишет manifest.json в output_dir
+
+    Процессы делят словарь разрешённых узлов реестра (через
+    multiprocessing.Manager) и дисковый кэш пакументов, поэтому общие
+    поддеревья разных сервисов загружаются один раз на весь пакет.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    records = []
+    with multiprocessing.Manager() as manager:
+        resolved = manager.dict()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(resolved, cache_dir)) as executor:
+            futures = {executor.submit(run_job, row, config, output_dir): row
+                       for row, config in enumerate(configs, 1)}
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                if progress:
+                    detail = (f"{record.get('nodes', 0)} узлов" if record["status"] == "ok"
+                              else record["error"])
+                    progress(f"[{len(records)}/{len(configs)}] {record['package']}: "
+                             f"{record['status']} ({detail}, {record['seconds']} с)")
+        shared_nodes = len(resolved)
+
+    records.sort(key=lambda record: record["row"])
+    manifest = {
+        "jobs": records,
+        "total": len(records),
+        "failed": sum(record["status"] != "ok" for record in records),
+        "resolved_nodes": shared_nodes,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
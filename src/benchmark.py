@@ -0,0 +1,177 @@
+"""Набор замеров горячих путей на синтетических графах
+
+Каждый случай выполняется repeat раз для времени (берётся лучшее) и
+ещё раз под tracemalloc для пиковой памяти Python-аллокаций, чтобы
+накладные расходы трассировки не искажали время. Результаты - словарь,
+пригодный для json.dump и сравнения между прогонами.
+
+Сетевые случаи (NETWORK_CASES) обходят граф через локальный
+fake_registry по HTTP; они медленнее и выполняются только по запросу.
+"""
+
+import contextlib
+import gc
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+try:
+    from .ascii_tree import generate_ascii_tree
+    from .dependency_graph import DependencyGraph
+    from .fake_registry import FakeRegistry, GraphSource, running_registry
+    from .npm_client import NPMClient
+    from .synthetic import ROOT, generate_graph, write_package_lock, write_test_graph
+    from .visualizer import DependencyVisualizer
+except ImportError:
+    from ascii_tree import generate_ascii_tree
+    from dependency_graph import DependencyGraph
+    from fake_registry import FakeRegistry, GraphSource, running_registry
+    from npm_client import NPMClient
+    from synthetic import ROOT, generate_graph, write_package_lock, write_test_graph
+    from visualizer import DependencyVisualizer
+
+
+CASES = ("build_dict", "build_compact", "ascii_tree", "plantuml", "load_order",
+         "analyze_package_json", "analyze_package_lockfile")
+NETWORK_CASES = ("crawl_registry",)
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def _build(compact, names, sources, targets):
+    graph = DependencyGraph(compact=compact)
+    for name in names:
+        graph.add_package(name)
+    for source, target in zip(sources, targets):
+        graph.add_dependency(names[source], names[target])
+    return graph.to_csr()
+
+
+def _analyzer(path):
+    """analyze_package по файлу path; импорт CLI выполняется заранее, вне замера"""
+    try:
+        from .cli import analyze_package
+        from .config import Config
+    except ImportError:
+        from cli import analyze_package
+        from config import Config
+
+    def analyze():
+        config = Config()
+        config.repository_url = path
+        config.test_mode = True
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return analyze_package(config, ROOT)
+    return analyze
+
+
+def _crawler(url):
+    def crawl():
+        client = NPMClient(url)
+        client.verbose = False
+        try:
+            return client.get_dependencies_recursive(ROOT)
+        finally:
+            client.close()
+    return crawl
+
+
+def _prepare(case, graph, workdir, resources):
+    """Функция замера для случая; подготовка данных в замер не входит
+
+    resources - ExitStack для ресурсов, живущих до конца замеров размера.
+    """
+    size = graph.freeze().node_count
+    if case in ("build_dict", "build_compact"):
+        csr = graph.freeze()
+        names = list(csr.names)
+        sources = array('i')
+        for node in range(size):
+            sources.extend([node] * (csr.offsets[node + 1] - csr.offsets[node]))
+        return lambda: _build(case == "build_compact", names, sources, csr.targets)
+
+    if case == "ascii_tree":
+        return lambda: generate_ascii_tree(graph, ROOT)
+    if case == "plantuml":
+        visualizer = DependencyVisualizer(graph)
+        return lambda: visualizer.generate_plantuml(ROOT)
+    if case == "load_order":
+        return graph.get_load_order
+    if case == "analyze_package_json":
+        path = os.path.join(workdir, f"graph-{size}.json")
+        write_test_graph(graph, path)
+        return _analyzer(path)
+    if case == "analyze_package_lockfile":
+        directory = os.path.join(workdir, f"lock-{size}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "package-lock.json")
+        write_package_lock(graph, path)
+        return _analyzer(path)
+    if case == "crawl_registry":
+        return _crawler(resources.enter_context(running_registry(FakeRegistry(GraphSource(graph)))))
+    raise ValueError(f"Неизвестный случай: {case} (доступны: {', '.join(CASES + NETWORK_CASES)})")
+
+
+def measure(function, repeat=3, trace_memory=True):
+    """(лучшее время, процессорное время лучшего прогона, пик tracemalloc в байтах)"""
+    best = best_cpu = None
+    for _ in range(repeat):
+        gc.collect()
+        started, started_cpu = time.perf_counter(), time.process_time()
+        function()
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - started_cpu
+        if best is None or elapsed < best:
+            best, best_cpu = elapsed, cpu
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, best_cpu, peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cases=CASES, repeat=3, trace_memory=True, progress=None,
+                   **params):
+    """Замеряет cases на графах размеров sizes; params передаются генератору"""
+    params = {"fanout": 3.0, "distribution": "poisson", "diamond_density": 0.3, "cycles": 0, "seed": 0,
+              **params}
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            graph = generate_graph(size, **params)
+            reference = graph.freeze()
+            for case in cases:
+                with contextlib.ExitStack() as resources:
+                    function = _prepare(case, graph, workdir, resources)
+                    seconds, cpu_seconds, peak = measure(function, repeat, trace_memory)
+                record = {
+                    "case": case,
+                    "size": size,
+                    "nodes": reference.node_count,
+                    "edges": reference.edge_count,
+                    "seconds": round(seconds, 6),
+                    "cpu_seconds": round(cpu_seconds, 6),
+                    "peak_bytes": peak,
+                    "repeat": repeat,
+                }
+                results.append(record)
+                if progress:
+                    memory = f", пик {peak / 2 ** 20:.1f} МБ" if peak is not None else ""
+                    progress(f"{case:<26} n={size:<8} {seconds:.4f} с{memory}")
+                del function
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": params,
+        "results": results,
+    }
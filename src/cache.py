@@ -0,0 +1,162 @@
+"""Дисковый кэш пакументов
+
+Записи хранятся в JSON, а не в pickle: каталог кэша может быть общим или
+задаваться пользователем (DEPVIZ_CACHE_DIR), а загрузка чужого
+pickle-файла выполняет произвольный код. Цена - тёплое попадание в новом
+процессе снова проходит json.load, то есть выигрыш "без повторного
+разбора" из pickle-формата потерян сознательно. Обходчик кэширует не
+документ реестра, а уже сведённую scan_dependencies сводку {версия:
+зависимости}, поэтому повторно разбирается в разы меньший JSON, чем
+пришёл из сети; внутри процесса записи отдаются из памяти без разбора.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    from . import profiling
+except ImportError:
+    import profiling
+
+
+CacheEntry = namedtuple("CacheEntry", ["url", "data", "etag", "last_modified", "stored_at"])
+# Записи старых версий (pickle) не читаются, но вытесняются и очищаются
+SUFFIXES = (".json", ".pickle")
+
+
+class PackumentCache:
+    """Дисковый кэш разобранных пакументов с LRU-вытеснением, TTL и ревалидацией
+
+    Каждая запись - отдельный JSON-файл, каталог создаётся с правами 0700.
+    Время последнего обращения хранится в mtime файла, так что LRU-порядок
+    общий для всех процессов, использующих один каталог.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, ttl=300, memory_entries=1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    @classmethod
+    def default(cls):
+        """Кэш в каталоге из DEPVIZ_CACHE_DIR (по умолчанию ~/.cache/depviz)"""
+        directory = os.environ.get("DEPVIZ_CACHE_DIR") or \
+            os.path.join(os.path.expanduser("~"), ".cache", "depviz")
+        max_mb = int(os.environ.get("DEPVIZ_CACHE_MAX_MB", "512"))
+        ttl = int(os.environ.get("DEPVIZ_CACHE_TTL", "300"))
+        return cls(directory, max_bytes=max_mb * 1024 * 1024, ttl=ttl)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + SUFFIXES[0])
+
+    def _scan(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIXES):
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def _remember(self, entry):
+        self._memory[entry.url] = entry
+        self._memory.move_to_end(entry.url)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, url):
+        """Возвращает запись (свежую или устаревшую) либо None"""
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry is not None:
+                self._memory.move_to_end(url)
+                return entry
+
+        path = self._path(url)
+        try:
+            with profiling.phase("cache.read"), open(path, "rb") as f:
+                entry = CacheEntry(**json.load(f))
+            os.utime(path)
+        except (OSError, ValueError, TypeError):
+            return None
+        if entry.url != url:
+            return None
+
+        with self._lock:
+            self._remember(entry)
+        return entry
+
+    def count(self, kind):
+        """Учитывает исход обращения: hits, misses или revalidated"""
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+        profiling.count(f"cache.{kind}")
+
+    def is_fresh(self, entry):
+        return time.time() - entry.stored_at < self.ttl
+
+    def put(self, url, data, etag=None, last_modified=None):
+        entry = CacheEntry(url, data, etag, last_modified, time.time())
+        self._write(entry)
+        return entry
+
+    def refresh(self, entry):
+        """Продлевает TTL записи после ответа 304 Not Modified"""
+        return self._write(entry._replace(stored_at=time.time()))
+
+    def _write(self, entry):
+        path = self._path(entry.url)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with profiling.phase("cache.write"), os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry._asdict(), f, ensure_ascii=False, separators=(",", ":"))
+        size = os.path.getsize(tmp_path)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(entry)
+            self._total_bytes += size - old_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+        return entry
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока кэш не уложится в лимит"""
+        files = sorted(self._scan(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        removed = set()
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.add(path)
+        with self._lock:
+            self._total_bytes = total
+            for url in [url for url in self._memory if self._path(url) in removed]:
+                del self._memory[url]
+
+    def clear(self):
+        for path, _, _ in list(self._scan()):
+            os.remove(path)
+        with self._lock:
+            self._total_bytes = 0
+            self._memory.clear()
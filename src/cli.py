@@ -1,4 +1,6 @@
+import contextlib
 import sys
+import time
 import os
 import click
 import json
@@ -9,7 +11,7 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 try:
-    from config import Config
+    from config import Config, load_configs
 except ImportError:
     class Config:
         def __init__(self):
@@ -27,6 +29,36 @@ except ImportError:
             print(f"  repository_url: {self.repository_url}")
             print(f"  test_mode: {self.test_mode}")
 
+    def load_configs(csv_path):
+        return [Config()]
+
+from dependency_graph import DependencyGraph
+from npm_client import NPMClient as RegistryClient
+from cache import PackumentCache
+from ascii_tree import print_ascii_tree, write_ascii_tree
+from exporters import export_to_file, open_output
+from visualizer import DependencyVisualizer
+from native import write_report
+from load_order import LoadOrder, load_waves
+from reachability import ReachabilityIndex
+from diff import diff_graphs
+from audit import SEVERITIES, audit_graph, graph_packages, load_advisories
+from metrics import COLUMNS as METRICS, DEFAULT_SAMPLES, compute_metrics
+from lockfiles import lockfile_format, read_lockfile
+from batch import MANIFEST_NAME, run_batch
+from snapshot import open_snapshot, save_snapshot
+from synthetic import FANOUT_DISTRIBUTIONS, ROOT as SYNTHETIC_ROOT, generate_graph, write_package_lock, \
+    write_test_graph
+from benchmark import CASES as BENCHMARK_CASES, NETWORK_CASES, run_benchmarks
+import profiling
+from profiling import FORMATS as PROFILE_FORMATS, Profiler
+from fake_registry import DirectorySource, FakeRegistry, FaultInjector, GraphSource, RecordingSource, \
+    make_fake_registry, registry_url as fake_registry_url
+from store import Store, ingest_batch
+from summary import DEFAULT_MAX_NODES as SUMMARY_NODES, DEFAULT_TOP_K, GraphSummary, Summarizer
+from server import DEFAULT_HOST, DEFAULT_PORT, DaemonClient, GraphStore, QueryService, make_server, \
+    read_graph, server_address
+
 
 class NPMClient:
     def get_complete_test_graph(self, file_path):
@@ -84,126 +116,20 @@ class NPMClient:
         }.get("WebApp", {})
 
 
-class DependencyGraph:
-    def __init__(self):
-        self.dependencies = {}
-
-    def build_graph_from_complete_data(self, complete_data, root_package):
-        self.dependencies = complete_data
-
-    def display_graph(self):
-        print("\n" + "=" * 60)
-        print("ГРАФ ЗАВИСИМОСТЕЙ")
-        print("=" * 60)
-        for pkg, deps in self.dependencies.items():
-            if deps:
-                deps_str = ", ".join(deps)
-                print(f"{pkg:.<20} -> {deps_str}")
-            else:
-                print(f"{pkg:.<20} -> нет зависимостей")
-
-    def get_load_order(self):
-        visited = set()
-        order = []
-
-        def visit(pkg):
-            if pkg not in visited:
-                visited.add(pkg)
-                if pkg in self.dependencies:
-                    for dep in self.graph.dependencies[pkg]:
-                        visit(dep)
-                order.append(pkg)
-
-        for pkg in self.dependencies:
-            visit(pkg)
-
-        return order
-
-    def get_graph(self):
-        return self.dependencies
-
-
-class DependencyVisualizer:
-    def __init__(self, dependency_graph):
-        self.graph = dependency_graph
-
-    def generate_plantuml(self, root_package: str) -> str:
-        lines = [
-            "@startuml",
-            "skinparam monochrome true",
-            "skinparam nodesep 20",
-            "skinparam ranksep 40",
-            "left to right direction",
-            ""
-        ]
-
-        visited = set()
-
-        def add_dependencies(pkg: str, depth: int = 0):
-            if pkg in visited or depth > 8:
-                return
-            visited.add(pkg)
-
-            if pkg in self.graph.dependencies:
-                for dep in self.graph.dependencies[pkg]:
-                    lines.append(f'["{pkg}"] --> ["{dep}"]')
-                    add_dependencies(dep, depth + 1)
-
-        add_dependencies(root_package)
-        lines.append("@enduml")
-        return "\n".join(lines)
-
-    def save_plantuml_image(self, root_package: str, output_path: str):
-        plantuml_code = self.generate_plantuml(root_package)
-        puml_file = output_path.replace('.png', '.puml')
-        with open(puml_file, 'w', encoding='utf-8') as f:
-            f.write(plantuml_code)
-        print(f"PlantUML код сохранен: {puml_file}")
-        print("Для просмотра диаграммы скопируйте код на:")
-        print("https://www.plantuml.com/plantuml/uml/")
-
-    def compare_with_native_tools(self, root_package: str):
-        our_deps = set(self.graph.dependencies.get(root_package, []))
-        return {
-            'package': root_package,
-            'our_dependencies': our_deps,
-            'native_dependencies': our_deps,
-            'differences': {
-                'missing_in_native': [],
-                'missing_in_our': [],
-                'version_differences': []
-            }
-        }
-
-
-def print_ascii_tree(dependency_graph, root_package: str, prefix: str = "", is_last: bool = True):
-    connector = "└── " if is_last else "├── "
-    print(prefix + connector + root_package)
-
-    if is_last:
-        new_prefix = prefix + "    "
-    else:
-        new_prefix = prefix + "│   "
-
-    if root_package in dependency_graph:
-        deps = dependency_graph[root_package]
-        for i, dep in enumerate(deps):
-            is_last_dep = (i == len(deps) - 1)
-            if dep != root_package:
-                print_ascii_tree(dependency_graph, dep, new_prefix, is_last_dep)
-
+def registry_url(config):
+    """Адрес реестра из repository_url; для путей к файлам - публичный npm"""
+    if config.repository_url.startswith(("http://", "https://")):
+        return config.repository_url
+    return "https://registry.npmjs.org"
 
-def generate_ascii_tree(dependency_graph, root_package: str) -> str:
-    import io
-    import contextlib
-    output = io.StringIO()
-    with contextlib.redirect_stdout(output):
-        print_ascii_tree(dependency_graph, root_package)
-    return output.getvalue()
 
+@profiling.profiled("analyze")
+def analyze_package(config, package_name=None, registry=None):
+    """Основная функция анализа пакета
 
-def analyze_package(config, package_name=None):
-    """Основная функция анализа пакета"""
+    registry - уже созданный клиент реестра (например, долгоживущий клиент
+    процесса пакетного режима); без него клиент создаётся на один вызов.
+    """
     if package_name:
         config.package_name = package_name
 
@@ -213,31 +139,93 @@ def analyze_package(config, package_name=None):
     print(f"\nАнализ пакета: {config.package_name}")
     print("-" * 50)
 
-    if config.test_mode:
+    if lockfile_format(config.repository_url):
+        print(f"Режим: lock-файл ({config.repository_url})")
+        graph = read_lockfile(config.repository_url, config.package_name)
+    elif config.test_mode:
         print("Режим: ТЕСТИРОВАНИЕ (используются демо-данные)")
 
-        if os.path.exists(config.repository_url):
-            complete_graph = npm_client.get_complete_test_graph(config.repository_url)
-        else:
-            print("Тестовый файл не найден, используем демо-граф")
-            complete_graph = npm_client._get_detailed_test_graph()
+        with profiling.phase("analyze.test_file"):
+            if os.path.exists(config.repository_url):
+                complete_graph = npm_client.get_complete_test_graph(config.repository_url)
+            else:
+                print("Тестовый файл не найден, используем демо-граф")
+                complete_graph = npm_client._get_detailed_test_graph()
 
-        graph.build_graph_from_complete_data(complete_graph, config.package_name)
+        with profiling.phase("graph.build"):
+            graph.build_graph_from_complete_data(complete_graph, config.package_name)
+    else:
+        print("Режим: npm реестр (параллельный обход зависимостей)")
+        if registry is not None:
+            registry.get_dependencies_recursive(config.package_name, graph=graph)
+        else:
+            registry = RegistryClient(registry_url(config), cache=PackumentCache.default())
+            try:
+                registry.get_dependencies_recursive(config.package_name, graph=graph)
+            finally:
+                registry.close()
 
-    graph.display_graph()
+    with profiling.phase("analyze.display"):
+        graph.display_graph()
 
-    print(f"\nСтатистика графа:")
-    print(f"  Всего пакетов: {len(graph.get_graph())}")
-    print(f"  Пакетов с зависимостями: {len([p for p, d in graph.get_graph().items() if d])}")
-    print(f"  Независимых пакетов: {len([p for p, d in graph.get_graph().items() if not d])}")
+        print(f"\nСтатистика графа:")
+        print(f"  Всего пакетов: {len(graph.get_graph())}")
+        print(f"  Пакетов с зависимостями: {len([p for p, d in graph.get_graph().items() if d])}")
+        print(f"  Независимых пакетов: {len([p for p, d in graph.get_graph().items() if not d])}")
 
     return graph
 
 
+def load_graph(package, repository=None, snapshot=None):
+    """Граф для команд: из снимка, если он задан, иначе через analyze_package"""
+    if snapshot:
+        started = time.perf_counter()
+        graph = open_snapshot(snapshot).graph
+        print(f"Граф загружен из снимка {snapshot} за {(time.perf_counter() - started) * 1000:.1f} мс")
+        return graph
+
+    config = Config()
+    config.test_mode = True
+    if repository:
+        config.repository_url = repository
+        config.test_mode = not repository.startswith(("http://", "https://"))
+    return analyze_package(config, package)
+
+
+def server_option(command):
+    """Параметр --server: выполнять запрос на запущенном `depviz serve`"""
+    return click.option('--server', envvar='DEPVIZ_SERVER',
+                        help='Адрес сервера depviz serve (хост:порт или unix:путь); '
+                             'по умолчанию из DEPVIZ_SERVER')(command)
+
+
+def server_source(repository=None, snapshot=None):
+    """Источник графа для сервера: абсолютный путь, чтобы не зависеть от его каталога"""
+    source = snapshot or repository
+    if source and not source.startswith(("http://", "https://")):
+        source = os.path.abspath(source)
+    return source
+
+
 @click.group()
-def cli():
+@click.option('--profile', 'profile_path', help='Сохранить профиль выполнения по фазам (JSON; *.prom - Prometheus)')
+@click.option('--profile-format', type=click.Choice(PROFILE_FORMATS),
+              help='Формат профиля (по умолчанию - по расширению файла)')
+@click.option('--profile-memory', is_flag=True, help='Учитывать аллокации через tracemalloc (медленнее)')
+@click.pass_context
+def cli(ctx, profile_path, profile_format, profile_memory):
     """Dependency Analyzer - Анализатор зависимостей"""
-    pass
+    if profile_path:
+        profiler = Profiler(trace_memory=profile_memory)
+
+        def write_profile():
+            profiler.write(profile_path, profile_format, {"command": ctx.invoked_subcommand})
+            print(f"Профиль сохранен: {profile_path}", file=sys.stderr)
+
+        # Колбэки закрытия выполняются в обратном порядке: профилировщик
+        # остановится до записи отчёта
+        ctx.call_on_close(write_profile)
+        ctx.with_resource(profiling.activate(profiler))
 
 
 @cli.command()
@@ -257,41 +245,98 @@ def analyze():
 @click.argument('package')
 @click.option('--ascii', is_flag=True, help='Вывести дерево в ASCII формате')
 @click.option('--plantuml', help='Сохранить PlantUML код в файл')
-@click.option('--image', help='Сохранить изображение графа (PNG)')
+@click.option('--dot', help='Сохранить граф в формате Graphviz DOT')
+@click.option('--graphml', help='Сохранить граф в формате GraphML')
+@click.option('--json', 'json_file', help='Сохранить граф в формате JSON')
+@click.option('--ndjson', help='Сохранить рёбра графа в формате NDJSON')
+@click.option('--gzip', 'compress', is_flag=True, default=None,
+              help='Сжимать выгрузки gzip (по умолчанию - для файлов *.gz)')
+@click.option('--image', help='Сохранить изображение графа (PlantUML-код и SVG рядом)')
+@click.option('--svg', help='Нарисовать граф встроенной укладкой в SVG')
+@click.option('--html', help='Интерактивная HTML-страница с силовой укладкой (без сети)')
 @click.option('--compare', is_flag=True, help='Сравнить с штатными инструментами')
+@click.option('--native', 'native_dump', help='Сохранённый вывод `npm ls --all --json` для --compare')
+@click.option('--compare-report', help='Сохранить отчёт о расхождениях в JSON')
 @click.option('--output', '-o', help='Сохранить ASCII дерево в файл')
-def visualize(package, ascii, plantuml, image, compare, output):
+@click.option('--max-depth', type=int, help='Ограничить глубину ASCII дерева')
+@click.option('--max-nodes', type=int, help='Ограничить число узлов в ASCII дереве')
+@click.option('--snapshot', help='Загрузить граф из снимка вместо анализа')
+@click.option('--summary', 'summarize', is_flag=True,
+              help='Рисовать сводку: мелкие ветви свёрнуты в агрегаты "… +N (родитель)"')
+@click.option('--summary-nodes', type=int, default=SUMMARY_NODES, show_default=True,
+              help='Сколько пакетов оставить видимыми в сводке')
+@click.option('--top-k', type=int, default=DEFAULT_TOP_K, show_default=True,
+              help='Сколько самых тяжёлых ветвей раскрывать у одного пакета')
+@click.option('--min-size', type=int, default=1, show_default=True,
+              help='Не раскрывать ветви меньше этого числа пакетов')
+@click.option('--summary-depth', type=int, help='Не раскрывать пакеты глубже этого уровня')
+@click.option('--expand', multiple=True, help='Раскрыть пакет в сводке целиком (можно повторять; включает --summary)')
+@server_option
+def visualize(package, ascii, plantuml, dot, graphml, json_file, ndjson, compress, image, svg, html, compare,
+              native_dump, compare_report, output, max_depth, max_nodes, snapshot, summarize, summary_nodes, top_k,
+              min_size, summary_depth, expand, server):
     """Визуализация графа зависимостей (Этап 5)"""
 
     try:
-        config = Config()
-        config.test_mode = True
-
         print("ВИЗУАЛИЗАЦИЯ ЗАВИСИМОСТЕЙ")
         print("=" * 60)
 
-        graph = analyze_package(config, package)
+        if compare and not native_dump:
+            raise ValueError("Для --compare нужен сохранённый вывод `npm ls --all --json` (--native)")
+        summarize = summarize or bool(expand)
+        if server:
+            if compare:
+                raise ValueError("Сравнение со штатными инструментами недоступно через сервер")
+            with DaemonClient(server) as client:
+                if not summarize:
+                    exports = {"plantuml": plantuml, "dot": dot, "graphml": graphml, "json": json_file,
+                               "ndjson": ndjson}
+                    visualize_remote(client, package, server_source(snapshot=snapshot), ascii, output, max_depth,
+                                     max_nodes, exports, compress, svg, image, html)
+                    print(f"\nВизуализация завершена!")
+                    return
+                # Размеры поддеревьев уже посчитаны сервером; сводку рисуем локально
+                summary = GraphSummary.from_dict(client.json(
+                    "summary", source=server_source(snapshot=snapshot), package=package, max_nodes=summary_nodes,
+                    top_k=top_k, min_size=min_size, depth=summary_depth, expand=",".join(expand) or None))
+            full_graph = None
+        else:
+            full_graph = load_graph(package, snapshot=snapshot)
+            if summarize:
+                summary = Summarizer(full_graph, package).summarize(summary_nodes, top_k, min_size, summary_depth,
+                                                                   expand)
+        if summarize:
+            print(f"Сводка: {summary.visible} из {summary.total} пакетов, агрегатов: {len(summary.aggregates)}")
+            graph = summary.graph
+        else:
+            graph = full_graph
         visualizer = DependencyVisualizer(graph)
 
         if ascii or output:
             print(f"\nASCII-ДЕРЕВО ЗАВИСИМОСТЕЙ:")
             print("-" * 40)
-            ascii_tree = generate_ascii_tree(graph.dependencies, package)
 
             if output:
                 with open(output, 'w', encoding='utf-8') as f:
                     f.write(f"ASCII дерево зависимостей: {package}\n")
                     f.write("=" * 50 + "\n\n")
-                    f.write(ascii_tree)
+                    write_ascii_tree(graph, package, f, max_depth=max_depth, max_nodes=max_nodes)
                 print(f"Файл сохранен: {output}")
             else:
-                print_ascii_tree(graph.dependencies, package)
+                print_ascii_tree(graph, package, max_depth=max_depth, max_nodes=max_nodes)
 
-        if plantuml:
-            plantuml_code = visualizer.generate_plantuml(package)
-            with open(plantuml, 'w', encoding='utf-8') as f:
-                f.write(plantuml_code)
-            print(f"PlantUML код сохранен: {plantuml}")
+        exports = [("plantuml", plantuml, "PlantUML код"), ("dot", dot, "DOT"),
+                   ("graphml", graphml, "GraphML"), ("json", json_file, "JSON"), ("ndjson", ndjson, "NDJSON")]
+        for fmt, path, title in exports:
+            if path:
+                edges = export_to_file(graph, package, fmt, path, compress)
+                print(f"{title} сохранен: {path} (рёбер: {edges})")
+
+        if svg:
+            visualizer.save_svg(package, svg)
+
+        if html:
+            visualizer.save_html(package, html)
 
         if image:
             visualizer.save_plantuml_image(package, image)
@@ -299,39 +344,752 @@ def visualize(package, ascii, plantuml, image, compare, output):
         if compare:
             print(f"\nСРАВНЕНИЕ С ШТАТНЫМИ ИНСТРУМЕНТАМИ:")
             print("-" * 45)
-            comparison = visualizer.compare_with_native_tools(package)
+            comparison = DependencyVisualizer(full_graph).compare_with_native_tools(package, native_dump)
+            print_comparison(comparison)
+            if compare_report:
+                write_report(comparison, compare_report)
+                print(f"\nОтчёт о расхождениях сохранен: {compare_report}")
 
-            print(f"Наши зависимости ({len(comparison['our_dependencies'])}):")
-            for dep in sorted(comparison['our_dependencies']):
-                print(f"  - {dep}")
+        print(f"\nВизуализация завершена!")
 
-            print(f"\nШтатные зависимости ({len(comparison['native_dependencies'])}):")
-            for dep in sorted(comparison['native_dependencies']):
-                print(f"  - {dep}")
+    except Exception as e:
+        print(f"Ошибка при визуализации: {e}")
 
-            print(f"\nРЕЗУЛЬТАТ СРАВНЕНИЯ:")
-            if not comparison['differences']['missing_in_native'] and not comparison['differences']['missing_in_our']:
-                print("  Зависимости полностью совпадают")
-            else:
-                if comparison['differences']['missing_in_native']:
-                    print("  В наших данных, но отсутствует в штатных:")
-                    for dep in comparison['differences']['missing_in_native']:
-                        print(f"    - {dep}")
 
-                if comparison['differences']['missing_in_our']:
-                    print("  В штатных данных, но отсутствует в наших:")
-                    for dep in comparison['differences']['missing_in_our']:
-                        print(f"    - {dep}")
+def print_comparison(comparison, limit=20):
+    """Сводка сравнения со штатным инструментом; списки обрезаются до limit"""
+    report = comparison.to_dict()
+    print(f"Наш граф: {report['ours']['packages']} пакетов, {report['ours']['edges']} рёбер")
+    print(f"Штатный: {report['native']['packages']} пакетов, {report['native']['edges']} рёбер")
+    if not comparison.compare_versions:
+        print("Версии не сравнивались: в одном из графов их нет")
+
+    print(f"\nРЕЗУЛЬТАТ СРАВНЕНИЯ:")
+    if comparison.identical:
+        print("  Зависимости полностью совпадают")
+    sections = [
+        ("missing_in_native", "В наших данных, но отсутствует в штатных", str),
+        ("missing_in_our", "В штатных данных, но отсутствует в наших", str),
+        ("version_differences", "Различаются версии",
+         lambda item: f"{item['name']}: у нас {', '.join(item['ours']) or '-'}, "
+                      f"в штатных {', '.join(item['native']) or '-'}"),
+        ("edges_missing_in_native", "Рёбра только в наших данных", " -> ".join),
+        ("edges_missing_in_our", "Рёбра только в штатных данных", " -> ".join),
+    ]
+    for key, title, describe in sections:
+        items = report['differences'][key]
+        if items:
+            print(f"  {title} ({len(items)}):")
+            for item in items[:limit]:
+                print(f"    - {describe(item)}")
+            if len(items) > limit:
+                print(f"    ... и ещё {len(items) - limit}")
+    if comparison.problems:
+        print(f"  Неустановленные зависимости в штатном выводе: {', '.join(sorted(set(comparison.problems)))}")
+
+
+def visualize_remote(client, package, source, ascii, output, max_depth, max_nodes, exports, compress, svg, image,
+                     html=None):
+    """visualize через сервер: граф уже в памяти сервера, клиент только пишет файлы"""
+    if ascii or output:
+        tree = client.get("ascii", source=source, package=package, max_depth=max_depth, max_nodes=max_nodes)
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(f"ASCII дерево зависимостей: {package}\n")
+                f.write("=" * 50 + "\n\n")
+                f.write(tree)
+            print(f"Файл сохранен: {output}")
+        else:
+            print(f"\nASCII-ДЕРЕВО ЗАВИСИМОСТЕЙ:")
+            print("-" * 40)
+            print(tree, end="")
+
+    if image:
+        puml_file = image.replace('.png', '.puml')
+        if not image.endswith('.svg'):
+            with open(puml_file, 'w', encoding='utf-8') as f:
+                f.write(client.get("export", source=source, package=package, format="plantuml"))
+            print(f"PlantUML код сохранен: {puml_file}")
+        svg_file = image if image.endswith('.svg') else puml_file.rsplit('.', 1)[0] + '.svg'
+        with open(svg_file, 'w', encoding='utf-8') as f:
+            f.write(client.get("svg", source=source, package=package))
+        print(f"SVG сохранен: {svg_file}")
+
+    for fmt, path in exports.items():
+        if path:
+            with open_output(path, compress) as out:
+                out.write(client.get("export", source=source, package=package, format=fmt))
+            print(f"{fmt} сохранен: {path}")
+
+    if svg:
+        with open(svg, 'w', encoding='utf-8') as f:
+            f.write(client.get("svg", source=source, package=package))
+        print(f"SVG сохранен: {svg}")
+
+    if html:
+        with open(html, 'w', encoding='utf-8') as f:
+            f.write(client.get("html", source=source, package=package))
+        print(f"HTML сохранен: {html}")
 
-        print(f"\nВизуализация завершена!")
+
+@cli.command()
+@click.argument('package')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести волны в формате JSON')
+@click.option('--output', '-o', help='Сохранить волны в JSON-файл')
+@click.option('--repository', '-r', help='Источник графа: тестовый файл, lock-файл или URL реестра')
+@click.option('--snapshot', help='Загрузить граф из снимка вместо анализа')
+@server_option
+def order(package, as_json, output, repository, snapshot, server):
+    """Порядок загрузки пакетов параллельными волнами"""
+    try:
+        if server:
+            with DaemonClient(server) as client:
+                answer = client.json("order", source=server_source(repository, snapshot), package=package)
+            result = LoadOrder(answer["waves"], answer["cycles"], answer["root"])
+        else:
+            # Диагностика анализа не должна смешиваться с JSON в stdout
+            with contextlib.redirect_stdout(sys.stderr if as_json else sys.stdout):
+                graph = load_graph(package, repository, snapshot)
+            result = load_waves(graph, package)
+
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(result.to_dict(), f, ensure_ascii=False, indent=2)
+            print(f"Порядок загрузки сохранен: {output}", file=sys.stderr if as_json else sys.stdout)
+
+        if as_json:
+            json.dump(result.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        elif not output:
+            print(f"\nПОРЯДОК ЗАГРУЗКИ ({len(result.waves)} волн):")
+            print("-" * 40)
+            for i, wave in enumerate(result.waves, 1):
+                print(f"  Волна {i}: {', '.join(wave)}")
+            for cycle in result.cycles:
+                print(f"  Цикл: {' <-> '.join(cycle)}")
 
     except Exception as e:
-        print(f"Ошибка при визуализации: {e}")
+        print(f"Ошибка: {e}")
+
+
+@cli.command()
+@click.argument('package')
+@click.argument('target')
+@click.option('-k', 'limit', type=int, default=1, help='Сколько кратчайших путей показать')
+@click.option('--all-roots', is_flag=True,
+              help='Искать пути от всех корней графа (пакетов, от которых никто не зависит)')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести ответ в формате JSON')
+@click.option('--repository', '-r', help='Источник графа: тестовый файл, lock-файл или URL реестра')
+@click.option('--snapshot', help='Загрузить граф из снимка вместо анализа')
+@server_option
+def why(package, target, limit, all_roots, as_json, repository, snapshot, server):
+    """Почему TARGET попал в граф PACKAGE: зависящие пакеты и кратчайшие пути"""
+    try:
+        if server:
+            with DaemonClient(server) as client:
+                answer = client.json("why", source=server_source(repository, snapshot), package=package,
+                                     target=target, k=limit, all_roots=1 if all_roots else None)
+        else:
+            with contextlib.redirect_stdout(sys.stderr if as_json else sys.stdout):
+                graph = load_graph(package, repository, snapshot)
+                started = time.perf_counter()
+                index = ReachabilityIndex(graph, None if all_roots else [package])
+                print(f"Индекс построен за {(time.perf_counter() - started) * 1000:.1f} мс")
+            answer = index.explain(target, limit)
+
+        if as_json:
+            json.dump(answer, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return
+
+        print(f"\nПОЧЕМУ {target}:")
+        print("-" * 40)
+        if answer["distance"] is None:
+            print(f"  {target} не достижим из {'корней графа' if all_roots else package}")
+        else:
+            print(f"  Глубина: {answer['distance']}")
+            print(f"  Подтягивают корни: {', '.join(answer['roots'])}")
+        print(f"  Напрямую зависят ({len(answer['dependents'])}): {', '.join(answer['dependents']) or '-'}")
+        for i, path in enumerate(answer["paths"], 1):
+            print(f"  Путь {i}: {' -> '.join(path)}")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+cli.add_command(why, 'paths')
+
+
+@cli.command()
+@click.argument('package')
+@click.option('--advisories', '-a', envvar='DEPVIZ_ADVISORIES', required=True,
+              help='Локальная база уведомлений OSV/GitHub: JSON, JSON Lines, zip или каталог '
+                   '(по умолчанию из DEPVIZ_ADVISORIES)')
+@click.option('--severity', type=click.Choice(SEVERITIES), help='Не сообщать об уведомлениях ниже этого уровня')
+@click.option('-k', 'limit', type=int, default=1, help='Сколько кратчайших путей от корня показать')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести отчёт в формате JSON')
+@click.option('--output', '-o', help='Сохранить отчёт в JSON-файл')
+@click.option('--fail', is_flag=True,
+              help='Код выхода 1, если найдены уязвимые пакеты, и 2 при ошибке проверки (для сборки)')
+@click.option('--repository', '-r', help='Источник графа: тестовый файл, lock-файл или URL реестра')
+@click.option('--snapshot', help='Загрузить граф из снимка вместо анализа')
+def audit(package, advisories, severity, limit, as_json, output, fail, repository, snapshot):
+    """Проверка графа PACKAGE по локальной базе уязвимостей (без сети)"""
+    status = 0
+    try:
+        with contextlib.redirect_stdout(sys.stderr if as_json else sys.stdout):
+            graph = load_graph(package, repository, snapshot)
+            started = time.perf_counter()
+            index = load_advisories(advisories, graph_packages(graph))
+            loaded = time.perf_counter()
+            print(f"База уведомлений: {len(index)} записей о пакетах графа за {(loaded - started) * 1000:.1f} мс")
+            report = audit_graph(graph, index, package, limit, severity)
+            elapsed = time.perf_counter() - loaded
+        status = 1 if report.findings else 0
+
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+            print(f"Отчёт сохранен: {output}", file=sys.stderr if as_json else sys.stdout)
+        if as_json:
+            json.dump(report.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            print(f"\nАУДИТ {package}:")
+            print("-" * 40)
+            for finding in report.findings:
+                print(f"  {finding['package']}@{finding['version']}")
+                for i in finding["advisories"]:
+                    advisory = index.advisories[i]
+                    fixed = advisory.fixed.get(finding["package"])
+                    print(f"    [{advisory.severity or '?'}] {advisory.id}: {advisory.summary or ''}"
+                          + (f" (исправлено в {', '.join(fixed)})" if fixed else ""))
+                for path in finding["paths"]:
+                    print(f"    Путь: {' -> '.join(path)}")
+            print(f"\nУязвимых пакетов: {len(report.findings)}, уведомлений: {len(report.advisories())}; "
+                  f"проверено узлов: {report.checked} (без версии: {report.unversioned}) "
+                  f"за {elapsed * 1000:.1f} мс")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        status = 2
+    if fail and status:
+        sys.exit(status)
+
+
+@cli.command()
+@click.argument('package')
+@click.option('--sort', type=click.Choice(METRICS), default='pagerank', show_default=True,
+              help='Метрика для сортировки')
+@click.option('--ascending', is_flag=True, help='Сортировать по возрастанию')
+@click.option('--top', type=int, default=20, show_default=True, help='Сколько пакетов вывести (0 - все)')
+@click.option('--samples', type=int, default=DEFAULT_SAMPLES, show_default=True,
+              help='Число источников для оценки betweenness (0 - не считать)')
+@click.option('--seed', type=int, default=0, help='Зерно выборки источников и оценки замыканий')
+@click.option('--exact/--estimate', default=None,
+              help='Точные размеры замыканий или оценка (по умолчанию - точные для небольших графов)')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести метрики в формате JSON')
+@click.option('--output', '-o', help='Сохранить метрики в JSON-файл')
+@click.option('--repository', '-r', help='Источник графа: тестовый файл, lock-файл или URL реестра')
+@click.option('--snapshot', help='Загрузить граф из снимка вместо анализа')
+def metrics(package, sort, ascending, top, samples, seed, exact, as_json, output, repository, snapshot):
+    """Метрики пакетов графа PACKAGE: связи, глубина, замыкания, PageRank, betweenness"""
+    try:
+        with contextlib.redirect_stdout(sys.stderr if as_json else sys.stdout):
+            graph = load_graph(package, repository, snapshot)
+            started = time.perf_counter()
+            result = compute_metrics(graph, package, samples, seed, exact)
+            elapsed = time.perf_counter() - started
+            print(f"\nПакетов: {len(result)}, рёбер: {result.edge_count}, "
+                  f"максимальная глубина: {result.max_depth}; замыкания: "
+                  f"{'точные' if result.exact else 'оценка'}, betweenness по {result.samples} источникам")
+
+        report = result.to_dict(sort, top or None, ascending)
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"Метрики сохранены: {output}", file=sys.stderr if as_json else sys.stdout)
+        if as_json:
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return
+        rows = [dict(row, pagerank=f"{row['pagerank']:.6f}", betweenness=f"{row['betweenness']:.1f}")
+                for row in report["nodes"]]
+        print_rows(rows, [("package", "Пакет"), ("version", "Версия"), ("in_degree", "Входящих"),
+                          ("out_degree", "Исходящих"), ("depth", "Глубина"), ("dependencies", "Тянет"),
+                          ("dependents", "Зависят"), ("pagerank", "PageRank"), ("betweenness", "Betweenness")],
+                   False, elapsed)
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@cli.command()
+@click.argument('old')
+@click.argument('new')
+@click.option('--root', help='Корневой пакет (по умолчанию - корень снимка или первый пакет графа)')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести изменения в формате JSON')
+@click.option('--output', '-o', help='Сохранить изменения в JSON-файл')
+def diff(old, new, root, as_json, output):
+    """Сравнение двух разрешённых графов: OLD и NEW - тестовые файлы, lock-файлы или снимки"""
+    try:
+        started = time.perf_counter()
+        result = diff_graphs(read_graph(old, root), read_graph(new, root), root)
+        elapsed = time.perf_counter() - started
+        report = result.to_dict()
+
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"Изменения сохранены: {output}", file=sys.stderr if as_json else sys.stdout)
+        if as_json:
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return
+
+        print(f"СРАВНЕНИЕ ГРАФОВ ({result.root}): {old} -> {new}")
+        print("=" * 60)
+        if result.identical:
+            print("Графы идентичны")
+        sections = [("Добавлены пакеты", [f"{name}@{version}" if version else name
+                                          for name, version in result.added]),
+                    ("Удалены пакеты", [f"{name}@{version}" if version else name
+                                        for name, version in result.removed]),
+                    ("Изменены версии", [f"{name}: {old_version} -> {new_version}"
+                                         for name, old_version, new_version in result.changed]),
+                    ("Добавлены рёбра", [f"{source} -> {target}" for source, target in result.edges_added]),
+                    ("Удалены рёбра", [f"{source} -> {target}" for source, target in result.edges_removed])]
+        for title, lines in sections:
+            if lines:
+                print(f"\n{title} ({len(lines)}):")
+                for line in lines:
+                    print(f"  {line}")
+        print(f"\nСравнено узлов: {result.compared} за {elapsed * 1000:.1f} мс")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+def store_option(command):
+    """Параметр --db: файл общего хранилища графов"""
+    return click.option('--db', envvar='DEPVIZ_STORE', default='depviz.db', show_default=True,
+                        help='База хранилища графов (SQLite); по умолчанию из DEPVIZ_STORE')(command)
+
+
+@cli.command()
+@click.argument('project')
+@click.argument('source')
+@click.option('--root', '-p', help='Корневой пакет (для lock-файлов и реестра; по умолчанию - первый пакет графа)')
+@store_option
+def ingest(project, source, root, db):
+    """Загружает граф проекта PROJECT в хранилище: SOURCE - файл графа, снимок, lock-файл или URL"""
+    try:
+        graph = read_graph(source, root)
+        started = time.perf_counter()
+        with Store(db) as store:
+            nodes, edges = store.ingest(project, graph, root, source)
+        print(f"Проект {project} загружен в {db}: {nodes} узлов, {edges} рёбер "
+              f"за {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@cli.group()
+def query():
+    """Запросы к хранилищу графов по всем загруженным проектам"""
+    pass
+
+
+def print_rows(rows, columns, as_json, elapsed):
+    """Результат запроса: JSON-список или таблица по колонкам [(ключ, заголовок)]"""
+    if as_json:
+        json.dump(rows, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    if rows:
+        cells = [[title for _, title in columns]]
+        cells += [["-" if row[key] is None else str(row[key]) for key, _ in columns] for row in rows]
+        widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+        for i, line in enumerate(cells):
+            print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip())
+            if i == 0:
+                print("  ".join("-" * width for width in widths))
+    print(f"\nСтрок: {len(rows)} за {elapsed * 1000:.2f} мс")
+
+
+@query.command('projects')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести ответ в формате JSON')
+@store_option
+def query_projects(as_json, db):
+    """Загруженные проекты"""
+    try:
+        with Store(db) as store:
+            started = time.perf_counter()
+            rows = store.projects()
+            elapsed = time.perf_counter() - started
+        for row in rows:
+            row["ingested_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["ingested_at"]))
+        print_rows(rows, [("project", "Проект"), ("root", "Корень"), ("packages", "Пакетов"),
+                          ("edges", "Рёбер"), ("ingested_at", "Загружен"), ("source", "Источник")],
+                   as_json, elapsed)
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@query.command('reach')
+@click.argument('package')
+@click.option('--range', 'spec', help='Диапазон версий npm, например "<4.17.21"')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести ответ в формате JSON')
+@store_option
+def query_reach(package, spec, as_json, db):
+    """Проекты, в граф которых входит PACKAGE (версии из --range)"""
+    try:
+        with Store(db) as store:
+            started = time.perf_counter()
+            rows = store.reach(package, spec)
+            elapsed = time.perf_counter() - started
+        print_rows(rows, [("project", "Проект"), ("version", "Версия"), ("depth", "Глубина")], as_json, elapsed)
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@query.command('versions')
+@click.argument('package')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести ответ в формате JSON')
+@store_option
+def query_versions(package, as_json, db):
+    """Версии PACKAGE по всем проектам и число проектов с каждой"""
+    try:
+        with Store(db) as store:
+            started = time.perf_counter()
+            rows = store.versions(package)
+            elapsed = time.perf_counter() - started
+        print_rows(rows, [("version", "Версия"), ("projects", "Проектов")], as_json, elapsed)
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@query.command('dependents')
+@click.argument('package')
+@click.option('--range', 'spec', help='Диапазон версий npm')
+@click.option('--project', help='Только в этом проекте')
+@click.option('--json', 'as_json', is_flag=True, help='Вывести ответ в формате JSON')
+@store_option
+def query_dependents(package, spec, project, as_json, db):
+    """Пакеты, напрямую зависящие от PACKAGE, по проектам"""
+    try:
+        with Store(db) as store:
+            started = time.perf_counter()
+            rows = store.dependents(package, spec, project)
+            elapsed = time.perf_counter() - started
+        print_rows(rows, [("project", "Проект"), ("package", "Пакет"), ("version", "Версия"),
+                          ("dependency", "Зависит от версии")], as_json, elapsed)
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@cli.command()
+@click.option('--host', default=DEFAULT_HOST, help='Адрес для HTTP')
+@click.option('--port', type=int, default=DEFAULT_PORT, help='Порт для HTTP')
+@click.option('--socket', 'socket_path', help='Слушать Unix-сокет вместо TCP')
+@click.option('--repository', '-r', help='Источник графа по умолчанию: тестовый файл, lock-файл, снимок или URL')
+@click.option('--package', '-p', help='Корневой пакет источника по умолчанию (загружается сразу)')
+def serve(host, port, socket_path, repository, package):
+    """Сервер запросов: графы загружаются один раз и остаются в памяти"""
+    try:
+        store = GraphStore(server_source(repository))
+        if repository:
+            started = time.perf_counter()
+            entry = store.get(root=package)
+            print(f"Граф загружен: {entry.source} ({entry.graph.to_csr().node_count} узлов, "
+                  f"{(time.perf_counter() - started) * 1000:.0f} мс)")
+
+        server = make_server(f"unix:{socket_path}" if socket_path else f"{host}:{port}", QueryService(store))
+        address = server_address(server)
+        print(f"Сервер depviz слушает {address}")
+        print(f"Клиенты: depviz order PACKAGE --server {address} (или DEPVIZ_SERVER={address})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nОстановка сервера")
+        finally:
+            server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+# Демо-графы для demo_visualization: разные графы для разных пакетов
+DEMO_GRAPHS = {
+    "WebApp": {
+        "WebApp": ["React", "Vue", "Express", "Database"],
+        "React": ["ReactDOM", "PropTypes", "JSX-Runtime"],
+        "Vue": ["VueRouter", "Vuex", "VueCompiler"],
+        "Express": ["BodyParser", "CORS", "Helmet", "Session"],
+        "Database": ["MongoDriver", "Redis", "ORM"],
+        "ReactDOM": ["Scheduler", "Reconciler"],
+        "PropTypes": [],
+        "JSX-Runtime": ["Babel"],
+        "VueRouter": ["PathParser", "History"],
+        "Vuex": ["StateManager", "MutationHelper"],
+        "VueCompiler": ["TemplateParser"],
+        "BodyParser": ["Stream", "JSON"],
+        "CORS": ["Options"],
+        "Helmet": ["Security"],
+        "Session": ["Cookie", "Store"],
+        "MongoDriver": ["BSON"],
+        "Redis": ["Networking"],
+        "ORM": ["QueryBuilder"],
+        "Scheduler": ["PriorityQueue"],
+        "Reconciler": ["Fiber"],
+        "Babel": ["Parser", "Generator"],
+        "PathParser": ["Regex"],
+        "History": ["Location"],
+        "StateManager": ["Events", "Observer"],
+        "MutationHelper": [],
+        "TemplateParser": ["AST"],
+        "Stream": ["Buffer"],
+        "JSON": [],
+        "Options": [],
+        "Security": ["Headers"],
+        "Cookie": [],
+        "Store": [],
+        "BSON": [],
+        "Networking": ["Socket"],
+        "QueryBuilder": ["SQL"],
+        "PriorityQueue": ["Heap"],
+        "Fiber": [],
+        "Parser": ["Tokenizer"],
+        "Generator": ["Codegen"],
+        "Regex": [],
+        "Location": [],
+        "Events": [],
+        "Observer": [],
+        "AST": [],
+        "Buffer": [],
+        "Headers": [],
+        "Socket": [],
+        "SQL": [],
+        "Heap": [],
+        "Tokenizer": [],
+        "Codegen": []
+    },
+    "react": {
+        "react": ["react-dom", "prop-types", "scheduler"],
+        "react-dom": ["scheduler"],
+        "prop-types": [],
+        "scheduler": []
+    },
+    "express": {
+        "express": ["body-parser", "cookie-parser", "cors"],
+        "body-parser": ["bytes", "content-type"],
+        "cookie-parser": ["cookie"],
+        "cors": ["vary"],
+        "bytes": [],
+        "content-type": [],
+        "cookie": [],
+        "vary": []
+    }
+}
+
+
+@cli.group()
+def snapshot():
+    """Двоичные снимки разрешённого графа"""
+    pass
+
+
+@snapshot.command('save')
+@click.argument('package')
+@click.option('--output', '-o', required=True, help='Файл снимка')
+@click.option('--repository', '-r', help='Источник графа: тестовый файл, lock-файл или URL реестра')
+def snapshot_save(package, output, repository):
+    """Анализирует пакет и сохраняет граф в снимок"""
+    try:
+        graph = load_graph(package, repository)
+        nodes, edges = save_snapshot(graph, output, {"root": package, "source": repository})
+        print(f"\nСнимок сохранен: {output} ({nodes} узлов, {edges} рёбер, "
+              f"{os.path.getsize(output)} байт)")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@snapshot.command('info')
+@click.argument('path')
+def snapshot_info(path):
+    """Показывает метаданные и размер снимка"""
+    try:
+        started = time.perf_counter()
+        with open_snapshot(path) as snap:
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"Снимок: {path}")
+            print(f"  Узлов: {snap.node_count}")
+            print(f"  Рёбер: {snap.edge_count}")
+            for key, value in snap.metadata.items():
+                print(f"  {key}: {value}")
+            print(f"  Открыт за {elapsed:.2f} мс")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+def synthetic_options(command):
+    """Общие параметры генератора синтетических графов"""
+    options = [
+        click.option('--fanout', type=float, default=3.0, help='Среднее число зависимостей пакета'),
+        click.option('--distribution', type=click.Choice(FANOUT_DISTRIBUTIONS), default='poisson',
+                     help='Распределение числа зависимостей'),
+        click.option('--diamond-density', type=float, default=0.3,
+                     help='Доля зависимостей на уже существующие пакеты (ромбы)'),
+        click.option('--cycles', type=int, default=0,
+                     help='Число обратных рёбер, замыкающих циклы (пересекающиеся циклы сливаются)'),
+        click.option('--seed', type=int, default=0, help='Зерно генератора'),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+@cli.command()
+@click.argument('size', type=int)
+@click.option('--output', '-o', required=True, help='Файл графа')
+@click.option('--format', 'fmt', type=click.Choice(['json', 'package-lock', 'snapshot']), default='json',
+              help='json - тестовый формат {пакет: [зависимости]}')
+@synthetic_options
+def generate(size, output, fmt, fanout, distribution, diamond_density, cycles, seed):
+    """Генерирует детерминированный синтетический граф зависимостей"""
+    try:
+        params = dict(fanout=fanout, distribution=distribution, diamond_density=diamond_density,
+                      cycles=cycles, seed=seed)
+        graph = generate_graph(size, **params)
+        if fmt == 'json':
+            write_test_graph(graph, output)
+        elif fmt == 'package-lock':
+            write_package_lock(graph, output)
+        else:
+            save_snapshot(graph, output, {"root": SYNTHETIC_ROOT, "source": "synthetic", **params})
+        csr = graph.freeze()
+        print(f"Граф сохранен: {output} ({csr.node_count} узлов, {csr.edge_count} рёбер, "
+              f"корень '{SYNTHETIC_ROOT}')")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@cli.command()
+@click.option('--sizes', default='1000,10000,100000', help='Размеры графов через запятую')
+@click.option('--case', 'cases', multiple=True, type=click.Choice(BENCHMARK_CASES + NETWORK_CASES),
+              help='Замеряемые случаи (по умолчанию все, кроме сетевых)')
+@click.option('--repeat', type=int, default=3, help='Повторов на случай (берётся лучшее время)')
+@click.option('--no-memory', is_flag=True, help='Не измерять пиковую память (tracemalloc)')
+@click.option('--output', '-o', help='Сохранить результаты в JSON-файл')
+@synthetic_options
+def bench(sizes, cases, repeat, no_memory, output, fanout, distribution, diamond_density, cycles, seed):
+    """Замеры времени и памяти горячих путей на синтетических графах"""
+    try:
+        sizes = [int(size) for size in sizes.split(',') if size.strip()]
+        results = run_benchmarks(sizes, cases or BENCHMARK_CASES, repeat, not no_memory, print,
+                                 fanout=fanout, distribution=distribution,
+                                 diamond_density=diamond_density, cycles=cycles, seed=seed)
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"Результаты сохранены: {output}")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@cli.command()
+@click.option('--source', '-s', help='Каталог пакументов или файл графа (снимок, lock-файл, тестовый JSON)')
+@click.option('--root', help='Корневой пакет lock-файла')
+@click.option('--synthetic', 'synthetic_size', type=int, help='Раздавать синтетический граф из N пакетов')
+@click.option('--record', 'upstream', help='Дописывать в каталог --source недостающие пакументы из этого реестра')
+@click.option('--host', default=DEFAULT_HOST, help='Адрес для HTTP')
+@click.option('--port', type=int, default=4873, help='Порт для HTTP (0 - любой свободный)')
+@click.option('--latency', type=float, default=0.0, help='Задержка ответа, мс')
+@click.option('--jitter', type=float, default=0.0, help='Случайная добавка к задержке (до), мс')
+@click.option('--bandwidth', type=float, help='Пропускная способность соединения, КБ/с')
+@click.option('--throttle-rate', type=float, default=0.0, help='Доля ответов 429')
+@click.option('--error-rate', type=float, default=0.0, help='Доля ответов 5xx')
+@click.option('--truncate-rate', type=float, default=0.0, help='Доля обрезанных тел')
+@click.option('--rate-limit', type=float, help='Запросов в секунду; сверх - 429 с Retry-After')
+@click.option('--retry-after', type=int, default=1, help='Retry-After для случайных 429, с')
+@synthetic_options
+def fake_registry(source, root, synthetic_size, upstream, host, port, latency, jitter, bandwidth, throttle_rate,
+                  error_rate, truncate_rate, rate_limit, retry_after, fanout, distribution, diamond_density,
+                  cycles, seed):
+    """Локальный реестр пакументов с задержками и сбоями для офлайн-замеров"""
+    try:
+        if synthetic_size:
+            graph = generate_graph(synthetic_size, fanout, distribution, diamond_density, cycles, seed)
+            packuments = GraphSource(graph)
+            print(f"Синтетический граф: {synthetic_size} пакетов, корень '{SYNTHETIC_ROOT}'")
+        elif not source:
+            raise ValueError("Укажите --source или --synthetic")
+        elif upstream:
+            packuments = RecordingSource(source, upstream)
+            print(f"Запись пакументов из {upstream} в {source}")
+        elif os.path.isdir(source):
+            packuments = DirectorySource(source)
+        else:
+            packuments = GraphSource(read_graph(source, root))
+
+        faults = FaultInjector(latency / 1000, jitter / 1000, bandwidth * 1024 if bandwidth else None, throttle_rate,
+                               error_rate, truncate_rate, rate_limit, retry_after=retry_after, seed=seed)
+        server = make_fake_registry(FakeRegistry(packuments, faults), host, port)
+        address = fake_registry_url(server)
+        print(f"Реестр слушает {address}")
+        print(f"Клиенты: depviz order PACKAGE -r {address} (а также why, audit, metrics) "
+              f"или NPMClient(\"{address}\")")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nОстановка реестра")
+        finally:
+            server.server_close()
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+
+@cli.command()
+@click.argument('csv_path', default='config.csv')
+@click.option('--output-dir', '-o', default='batch_results', help='Директория для результатов заданий')
+@click.option('--workers', '-j', type=int, help='Число процессов (по умолчанию - число CPU)')
+@click.option('--cache-dir', help='Каталог общего кэша пакументов (по умолчанию DEPVIZ_CACHE_DIR)')
+@click.option('--store', 'db', help='Загрузить графы успешных заданий в хранилище (SQLite)')
+def batch(csv_path, output_dir, workers, cache_dir, db):
+    """Пакетный анализ: каждая строка CSV - отдельное задание"""
+    try:
+        configs = load_configs(csv_path)
+        print(f"ПАКЕТНЫЙ АНАЛИЗ: {len(configs)} заданий из {csv_path}")
+        print("=" * 60)
+        manifest = run_batch(configs, output_dir, workers, cache_dir)
+        print(f"\nГотово за {manifest['seconds']} с: успешно {manifest['total'] - manifest['failed']}, "
+              f"с ошибками {manifest['failed']}")
+        print(f"Манифест: {os.path.join(output_dir, MANIFEST_NAME)}")
+        if db:
+            with Store(db) as store:
+                loaded = ingest_batch(store, manifest, output_dir)
+            print(f"Загружено в хранилище {db}: {loaded} проектов")
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
 
 
 @cli.command()
 @click.option('--output-dir', '-o', default='stage5_results', help='Директория для сохранения примеров')
-def demo_visualization(output_dir):
+@click.option('--native-dir', help='Каталог с выводом `npm ls --all --json` для пакетов (<пакет>.json)')
+def demo_visualization(output_dir, native_dir):
     """Демонстрация визуализации для 3 различных пакетов (Этап 5)"""
 
     demo_packages = [
@@ -356,94 +1114,20 @@ def demo_visualization(output_dir):
             config = Config()
             config.test_mode = True
 
-            # Используем разные графы для разных пакетов
-            detailed_graphs = {
-                "WebApp": {
-                    "WebApp": ["React", "Vue", "Express", "Database"],
-                    "React": ["ReactDOM", "PropTypes", "JSX-Runtime"],
-                    "Vue": ["VueRouter", "Vuex", "VueCompiler"],
-                    "Express": ["BodyParser", "CORS", "Helmet", "Session"],
-                    "Database": ["MongoDriver", "Redis", "ORM"],
-                    "ReactDOM": ["Scheduler", "Reconciler"],
-                    "PropTypes": [],
-                    "JSX-Runtime": ["Babel"],
-                    "VueRouter": ["PathParser", "History"],
-                    "Vuex": ["StateManager", "MutationHelper"],
-                    "VueCompiler": ["TemplateParser"],
-                    "BodyParser": ["Stream", "JSON"],
-                    "CORS": ["Options"],
-                    "Helmet": ["Security"],
-                    "Session": ["Cookie", "Store"],
-                    "MongoDriver": ["BSON"],
-                    "Redis": ["Networking"],
-                    "ORM": ["QueryBuilder"],
-                    "Scheduler": ["PriorityQueue"],
-                    "Reconciler": ["Fiber"],
-                    "Babel": ["Parser", "Generator"],
-                    "PathParser": ["Regex"],
-                    "History": ["Location"],
-                    "StateManager": ["Events", "Observer"],
-                    "MutationHelper": [],
-                    "TemplateParser": ["AST"],
-                    "Stream": ["Buffer"],
-                    "JSON": [],
-                    "Options": [],
-                    "Security": ["Headers"],
-                    "Cookie": [],
-                    "Store": [],
-                    "BSON": [],
-                    "Networking": ["Socket"],
-                    "QueryBuilder": ["SQL"],
-                    "PriorityQueue": ["Heap"],
-                    "Fiber": [],
-                    "Parser": ["Tokenizer"],
-                    "Generator": ["Codegen"],
-                    "Regex": [],
-                    "Location": [],
-                    "Events": [],
-                    "Observer": [],
-                    "AST": [],
-                    "Buffer": [],
-                    "Headers": [],
-                    "Socket": [],
-                    "SQL": [],
-                    "Heap": [],
-                    "Tokenizer": [],
-                    "Codegen": []
-                },
-                "react": {
-                    "react": ["react-dom", "prop-types", "scheduler"],
-                    "react-dom": ["scheduler"],
-                    "prop-types": [],
-                    "scheduler": []
-                },
-                "express": {
-                    "express": ["body-parser", "cookie-parser", "cors"],
-                    "body-parser": ["bytes", "content-type"],
-                    "cookie-parser": ["cookie"],
-                    "cors": ["vary"],
-                    "bytes": [],
-                    "content-type": [],
-                    "cookie": [],
-                    "vary": []
-                }
-            }
-
-            graph_data = detailed_graphs.get(package, detailed_graphs["WebApp"])
+            graph_data = DEMO_GRAPHS.get(package, DEMO_GRAPHS["WebApp"])
             graph = DependencyGraph()
             graph.build_graph_from_complete_data(graph_data, package)
             visualizer = DependencyVisualizer(graph)
 
             # ASCII дерево
             ascii_file = os.path.join(output_dir, f"{package}_ascii.txt")
-            ascii_tree = generate_ascii_tree(graph.dependencies, package)
             with open(ascii_file, 'w', encoding='utf-8') as f:
                 f.write(f"ASCII ДЕРЕВО ЗАВИСИМОСТЕЙ: {package}\n")
                 f.write("=" * 60 + "\n\n")
-                f.write(ascii_tree)
+                write_ascii_tree(graph, package, f)
                 f.write(f"\n\nСТАТИСТИКА:\n")
                 f.write(f"- Всего пакетов: {len(graph.get_graph())}\n")
-                f.write(f"- Максимальная глубина: 4 уровня\n")
+                f.write(f"- Максимальная глубина: {compute_metrics(graph, package, samples=0).max_depth}\n")
             print(f"  ASCII дерево: {ascii_file}")
 
             # PlantUML код
@@ -459,19 +1143,19 @@ def demo_visualization(output_dir):
 
             # Сравнение
             comparison_file = os.path.join(output_dir, f"{package}_comparison.txt")
-            comparison = visualizer.compare_with_native_tools(package)
+            native_dump = os.path.join(native_dir, f"{package}.json") if native_dir else None
 
             with open(comparison_file, 'w', encoding='utf-8') as f:
                 f.write(f"СРАВНЕНИЕ ЗАВИСИМОСТЕЙ: {package}\n")
                 f.write("=" * 60 + "\n\n")
-                f.write(f"ОБЩАЯ СТАТИСТИКА:\n")
-                f.write(f"- Всего узлов в графе: {len(graph.get_graph())}\n")
-                f.write(f"- Прямые зависимости: {len(comparison['our_dependencies'])}\n")
-                f.write(f"- Общие зависимости: {len(comparison['native_dependencies'])}\n\n")
-
-                f.write(f"РЕЗУЛЬТАТ СРАВНЕНИЯ:\n")
-                f.write(f"- Зависимости полностью совпадают\n")
-                f.write(f"- Расхождения не обнаружены\n")
+                if native_dump and os.path.exists(native_dump):
+                    comparison = visualizer.compare_with_native_tools(package, native_dump)
+                    with contextlib.redirect_stdout(f):
+                        print_comparison(comparison)
+                    write_report(comparison, os.path.join(output_dir, f"{package}_comparison.json"))
+                else:
+                    f.write(f"- Всего узлов в графе: {len(graph.get_graph())}\n")
+                    f.write(f"- Штатный вывод не задан ({native_dump or '--native-dir'}), сравнение не выполнялось\n")
 
             print(f"  Сравнение: {comparison_file}")
             print(f"  Узлов в графе: {len(graph.get_graph())}")
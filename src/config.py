@@ -1,3 +1,6 @@
+import csv
+
+
 class Config:
     def __init__(self):
         self.package_name = "WebApp"
@@ -6,26 +9,28 @@ class Config:
         self.ascii_tree_output = False
 
     def load_from_csv(self, csv_path):
-        """Загружает конфигурацию из CSV файла"""
+        """Загружает конфигурацию из первой строки данных CSV файла"""
         import os
         if os.path.exists(csv_path):
             try:
-                with open(csv_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if len(lines) >= 2:
-                        # Парсим заголовок и данные
-                        headers = [h.strip() for h in lines[0].split(',')]
-                        values = [v.strip() for v in lines[1].split(',')]
-
-                        for header, value in zip(headers, values):
-                            if hasattr(self, header):
-                                if header == 'test_mode' or header == 'ascii_tree_output':
-                                    setattr(self, header, value.lower() == 'true')
-                                else:
-                                    setattr(self, header, value)
+                rows = read_csv_rows(csv_path)
+                if rows:
+                    self.apply_row(rows[0])
             except Exception as e:
                 print(f"Ошибка загрузки конфигурации: {e}")
 
+    def apply_row(self, row):
+        """Применяет строку CSV вида {заголовок: значение}"""
+        for header, value in row.items():
+            if header is None or value is None:
+                continue
+            header, value = header.strip(), value.strip()
+            if hasattr(self, header):
+                if header == 'test_mode' or header == 'ascii_tree_output':
+                    setattr(self, header, value.lower() == 'true')
+                else:
+                    setattr(self, header, value)
+
     def display_config(self):
         """Выводит текущую конфигурацию"""
         print("Текущая конфигурация:")
@@ -35,6 +40,23 @@ class Config:
         print(f"  ascii_tree_output: {self.ascii_tree_output}")
 
 
+def read_csv_rows(csv_path):
+    """Все непустые строки данных CSV файла как словари по заголовку"""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        return [row for row in csv.DictReader(f)
+                if any(isinstance(value, str) and value.strip() for value in row.values())]
+
+
+def load_configs(csv_path):
+    """Конфигурация для каждой строки CSV файла (пакетный режим)"""
+    configs = []
+    for row in read_csv_rows(csv_path):
+        config = Config()
+        config.apply_row(row)
+        configs.append(config)
+    return configs
+
+
 def load_config():
     """Загружает конфигурацию (для обратной совместимости)"""
     config = Config()
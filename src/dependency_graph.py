@@ -1,15 +1,277 @@
+import sys
+from array import array
+from collections.abc import Mapping
+
+
+class CSRGraph:
+    """Неизменяемое представление графа в формате CSR (compressed sparse row)
+
+    Узлы - целые числа 0..n-1, names[i] - имя узла. Соседи узла i лежат
+    в targets[offsets[i]:offsets[i + 1]] в порядке добавления рёбер.
+    """
+
+    def __init__(self, names, offsets, targets, ids=None):
+        self.names = names
+        self.offsets = offsets
+        self.targets = targets
+        self.ids = ids if ids is not None else {name: i for i, name in enumerate(names)}
+
+    @property
+    def node_count(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def successors(self, node_id):
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def as_numpy(self):
+        """(offsets, targets) как массивы NumPy без копирования буферов"""
+        import numpy as np
+        return (np.frombuffer(self.offsets, dtype=np.int64),
+                np.frombuffer(self.targets, dtype=np.intc))
+
+    @classmethod
+    def from_edges(cls, names, sources, targets, ids=None):
+        """Строит CSR из параллельных массивов рёбер (устойчивая сортировка подсчётом)"""
+        node_count = len(names)
+        offsets = array('q', bytes(8 * (node_count + 1)))
+        for source in sources:
+            offsets[source + 1] += 1
+        for i in range(node_count):
+            offsets[i + 1] += offsets[i]
+
+        cursor = array('q', offsets)
+        ordered = array('i', bytes(4 * len(targets)))
+        for source, target in zip(sources, targets):
+            ordered[cursor[source]] = target
+            cursor[source] += 1
+        return cls(names, offsets, ordered, ids)
+
+
+class _AdjacencyView(Mapping):
+    """Словарь {пакет: [зависимости]} поверх CSR компактного графа"""
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, package):
+        csr = self._graph.freeze()
+        names = csr.names
+        return [names[target] for target in csr.successors(csr.ids[package])]
+
+    def __contains__(self, package):
+        return package in self._graph._ids
+
+    def __iter__(self):
+        return iter(self._graph.freeze().names)
+
+    def __len__(self):
+        return len(self._graph._names)
+
+
+def dependency_getter(graph):
+    """Функция package -> [зависимости] для словаря или объекта графа"""
+    if hasattr(graph, 'get'):
+        return lambda package: graph.get(package, [])
+    if hasattr(graph, 'dependencies'):
+        dependencies = graph.dependencies
+        return lambda package: dependencies.get(package, [])
+    if hasattr(graph, 'get_graph'):
+        dependencies = graph.get_graph()
+        return lambda package: dependencies.get(package, [])
+    return lambda package: []
+
+
 class DependencyGraph:
-    def __init__(self, dependencies=None):
+    """Граф зависимостей {пакет: [зависимости]}
+
+    В компактном режиме (compact=True) имена интернируются в целые
+    идентификаторы, рёбра при построении проверяются на дубликаты по
+    множеству 64-битных кодов, а при первом чтении граф замораживается
+    в CSR-массивы. Атрибут dependencies в этом режиме - представление
+    только для чтения с тем же интерфейсом, что и у словаря.
+    """
+
+    def __init__(self, dependencies=None, compact=False):
+        self.compact = compact
+        self.versions = {}
+        self._seen = {}
+        if compact:
+            self._reset_compact()
         self.dependencies = dependencies or {}
 
+    def _reset_compact(self):
+        self._ids = {}
+        self._names = []
+        self._sources = array('i')
+        self._targets = array('i')
+        self._edge_codes = set()
+        self._csr = None
+
+    @property
+    def dependencies(self):
+        if self.compact:
+            return _AdjacencyView(self)
+        return self._dependencies
+
+    @dependencies.setter
+    def dependencies(self, dependencies):
+        self._seen = {}
+        if not self.compact:
+            self._dependencies = dependencies
+            return
+        self._reset_compact()
+        for package, deps in dependencies.items():
+            self.add_package(package)
+            for dep in deps:
+                self.add_dependency(package, dep)
+
+    def _intern(self, name):
+        node_id = self._ids.get(name)
+        if node_id is None:
+            name = sys.intern(name)
+            node_id = len(self._names)
+            self._ids[name] = node_id
+            self._names.append(name)
+        return node_id
+
+    def freeze(self):
+        """Переводит компактный граф в CSR и возвращает его"""
+        if not self.compact:
+            return self.to_csr()
+        if self._csr is None:
+            self._csr = CSRGraph.from_edges(self._names, self._sources, self._targets, self._ids)
+            self._sources = self._targets = None
+            self._edge_codes = None
+        return self._csr
+
+    @classmethod
+    def from_csr(cls, csr, versions=None):
+        """Компактный граф поверх готового CSR (например, снимка) без копирования"""
+        graph = cls(compact=True)
+        graph._ids, graph._names, graph._csr = csr.ids, csr.names, csr
+        graph._sources = graph._targets = graph._edge_codes = None
+        if versions is not None:
+            graph.versions = versions
+        return graph
+
+    def _thaw(self):
+        csr, self._csr = self._csr, None
+        if not isinstance(self._names, list):
+            # Граф поверх внешнего CSR: перед изменением переносим в память
+            self._names = list(csr.names)
+            self._ids = {name: i for i, name in enumerate(self._names)}
+            self.versions = dict(self.versions)
+        self._sources = array('i')
+        for node_id in range(csr.node_count):
+            self._sources.extend([node_id] * (csr.offsets[node_id + 1] - csr.offsets[node_id]))
+        self._targets = array('i', csr.targets)
+        self._edge_codes = {source << 32 | target for source, target in zip(self._sources, self._targets)}
+
+    def add_package(self, package: str, version=None):
+        if self.compact:
+            # Новый узел или версия меняют общий со снимком CSR список имён
+            if self._csr is not None and (version is not None or package not in self._ids):
+                self._thaw()
+            self._intern(package)
+        elif package not in self._dependencies:
+            self._dependencies[package] = []
+        if version is not None:
+            self.versions[package] = sys.intern(version) if self.compact else version
+
     def add_dependency(self, package: str, dependency: str):
-        if package not in self.dependencies:
-            self.dependencies[package] = []
-        if dependency not in self.dependencies[package]:
-            self.dependencies[package].append(dependency)
+        if self.compact:
+            if self._csr is not None:
+                self._thaw()
+            source = self._intern(package)
+            target = self._intern(dependency)
+            code = source << 32 | target
+            if code not in self._edge_codes:
+                self._edge_codes.add(code)
+                self._sources.append(source)
+                self._targets.append(target)
+            return
+
+        if package not in self._dependencies:
+            self._dependencies[package] = []
+        deps = self._dependencies[package]
+        # Множество уже добавленных зависимостей; пересоздаётся, если
+        # список меняли в обход add_dependency
+        seen = self._seen.get(package)
+        if seen is None or len(seen) != len(deps):
+            seen = self._seen[package] = set(deps)
+        if dependency not in seen:
+            seen.add(dependency)
+            deps.append(dependency)
 
     def get_dependencies(self, package: str):
         return self.dependencies.get(package, [])
 
     def to_dict(self):
-        return self.dependencies
\ No newline at end of file
+        if self.compact:
+            return dict(self.dependencies.items())
+        return self._dependencies
+
+    def to_csr(self):
+        """Целочисленное CSR-представление графа (в обычном режиме строится заново)"""
+        if self.compact:
+            return self.freeze()
+
+        names = list(self._dependencies)
+        ids = {name: i for i, name in enumerate(names)}
+        offsets = array('q', [0])
+        targets = array('i')
+        for deps in self._dependencies.values():
+            for dep in deps:
+                target = ids.get(dep)
+                if target is None:
+                    target = ids[dep] = len(names)
+                    names.append(dep)
+                targets.append(target)
+            offsets.append(len(targets))
+        offsets.extend([len(targets)] * (len(names) + 1 - len(offsets)))
+        return CSRGraph(names, offsets, targets, ids)
+
+    def get_graph(self):
+        return self.dependencies
+
+    def build_graph_from_complete_data(self, complete_data, root_package):
+        self.dependencies = complete_data
+
+    def display_graph(self):
+        print("\n" + "=" * 60)
+        print("ГРАФ ЗАВИСИМОСТЕЙ")
+        print("=" * 60)
+        for pkg, deps in self.dependencies.items():
+            if deps:
+                deps_str = ", ".join(deps)
+                print(f"{pkg:.<20} -> {deps_str}")
+            else:
+                print(f"{pkg:.<20} -> нет зависимостей")
+
+    def get_load_waves(self, root_package=None):
+        """Волны загрузки (см. load_order.load_waves)"""
+        try:
+            from .load_order import load_waves
+        except ImportError:
+            from load_order import load_waves
+        return load_waves(self, root_package)
+
+    def get_load_order(self, root_package=None):
+        """Пакеты в порядке загрузки: зависимости раньше зависящих от них
+
+        Циклы не приводят к зацикливанию: взаимозависимые пакеты
+        загружаются одной группой внутри своей волны.
+        """
+        return self.get_load_waves(root_package).order
+
+    def get_reachability_index(self, roots=None):
+        """Индекс обратных зависимостей и путей от корней (см. reachability)"""
+        try:
+            from .reachability import ReachabilityIndex
+        except ImportError:
+            from reachability import ReachabilityIndex
+        return ReachabilityIndex(self, roots)
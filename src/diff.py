@@ -0,0 +1,131 @@
+"""Структурное сравнение двух разрешённых графов по хешам Меркла
+
+Обход идёт от корня одновременно по обоим графам. Узел, хеш которого
+совпадает в обоих графах, пропускается вместе со всем достижимым из него
+подграфом за O(1); раскрываются только узлы с разными хешами и узлы,
+которые есть лишь в одном из графов. Поэтому сравнение снимков с
+сохранёнными хешами стоит порядка числа изменений, а не размера графа.
+
+Узлы сопоставляются по ключу графа: имя пакета или "имя@версия" для
+дополнительных версий (см. NPMClient.get_dependencies_recursive).
+"""
+
+try:
+    from . import profiling
+    from .dependency_graph import DependencyGraph
+    from .merkle import node_hashes
+except ImportError:
+    import profiling
+    from dependency_graph import DependencyGraph
+    from merkle import node_hashes
+
+
+class GraphDiff:
+    """Результат сравнения: изменения пакетов и рёбер от old к new
+
+    added / removed - пары (пакет, версия); changed - (пакет, было, стало);
+    edges_added / edges_removed - пары (от, к); compared - число узлов,
+    которые пришлось раскрыть (остальные отсечены по хешам).
+    """
+
+    def __init__(self, root, old_hash, new_hash):
+        self.root = root
+        self.old_hash = old_hash
+        self.new_hash = new_hash
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.edges_added = []
+        self.edges_removed = []
+        self.compared = 0
+
+    @property
+    def identical(self):
+        return self.old_hash == self.new_hash
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "identical": self.identical,
+            "old_hash": self.old_hash.hex() if self.old_hash else None,
+            "new_hash": self.new_hash.hex() if self.new_hash else None,
+            "packages": {
+                "added": [{"name": name, "version": version} for name, version in self.added],
+                "removed": [{"name": name, "version": version} for name, version in self.removed],
+                "version_changed": [{"name": name, "from": old, "to": new} for name, old, new in self.changed],
+            },
+            "edges": {
+                "added": [list(edge) for edge in self.edges_added],
+                "removed": [list(edge) for edge in self.edges_removed],
+            },
+            "compared": self.compared,
+        }
+
+
+def default_root(graph):
+    """Корень графа: из метаданных снимка, иначе первый узел (так строят все читатели)"""
+    csr = graph.to_csr()
+    snapshot = getattr(graph, "snapshot", None)
+    root = snapshot.metadata.get("root") if snapshot is not None else None
+    if root is not None and root in csr.ids:
+        return root
+    return csr.names[0] if csr.node_count else None
+
+
+@profiling.profiled("diff")
+def diff_graphs(old, new, root=None):
+    """Сравнивает графы old и new от корня root (по умолчанию - default_root)"""
+    if not hasattr(old, 'to_csr'):
+        old = DependencyGraph(old)
+    if not hasattr(new, 'to_csr'):
+        new = DependencyGraph(new)
+    old_csr, old_hashes = node_hashes(old)
+    new_csr, new_hashes = node_hashes(new)
+    old_versions = getattr(old, "versions", None) or {}
+    new_versions = getattr(new, "versions", None) or {}
+
+    if root is not None:
+        roots = [root]
+    else:
+        roots = list(dict.fromkeys(filter(None, (default_root(old), default_root(new)))))
+    old_root = old_csr.ids.get(roots[0]) if roots else None
+    new_root = new_csr.ids.get(roots[0]) if roots else None
+    result = GraphDiff(roots[0] if roots else None,
+                       old_hashes[old_root] if old_root is not None else None,
+                       new_hashes[new_root] if new_root is not None else None)
+    if result.identical and result.old_hash is not None:
+        return result
+
+    def children(csr, node):
+        names = csr.names
+        return [names[target] for target in csr.successors(node)]
+
+    queue = list(roots)
+    seen = set(queue)
+    for package in queue:
+        old_node = old_csr.ids.get(package)
+        new_node = new_csr.ids.get(package)
+        if old_node is not None and new_node is not None and old_hashes[old_node] == new_hashes[new_node]:
+            continue
+        result.compared += 1
+
+        old_deps = children(old_csr, old_node) if old_node is not None else []
+        new_deps = children(new_csr, new_node) if new_node is not None else []
+        if old_node is None:
+            result.added.append((package, new_versions.get(package)))
+        elif new_node is None:
+            result.removed.append((package, old_versions.get(package)))
+        elif old_versions.get(package) != new_versions.get(package):
+            result.changed.append((package, old_versions.get(package), new_versions.get(package)))
+
+        old_set, new_set = set(old_deps), set(new_deps)
+        result.edges_removed.extend((package, dep) for dep in old_deps if dep not in new_set)
+        result.edges_added.extend((package, dep) for dep in new_deps if dep not in old_set)
+        for dep in old_deps + new_deps:
+            if dep not in seen:
+                seen.add(dep)
+                queue.append(dep)
+
+    for changes in (result.added, result.removed, result.changed, result.edges_added, result.edges_removed):
+        changes.sort(key=lambda item: tuple(str(part) for part in item))
+    return result
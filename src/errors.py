@@ -20,4 +20,8 @@ class CSVFormatError(ConfigError):
 
 class NPMError(ConfigError):
     """Ошибка работы с npm реестром"""
-    pass
\ No newline at end of file
+    pass
+
+class RegistryUnavailableError(NPMError):
+    """Реестр временно недоступен (сработал предохранитель)"""
+    pass
@@ -0,0 +1,207 @@
+"""Потоковая выгрузка графа зависимостей в текстовые форматы"""
+
+import gzip
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    from . import profiling
+    from .dependency_graph import DependencyGraph, dependency_getter
+except ImportError:
+    import profiling
+    from dependency_graph import DependencyGraph, dependency_getter
+
+
+def iter_edges(graph, root_package):
+    """Рёбра, достижимые из root_package, в порядке обхода в глубину
+
+    Обход итеративный и без ограничения глубины: каждый узел раскрывается
+    один раз, ребро к уже посещённому узлу выдаётся, но не раскрывается.
+    """
+    get_dependencies = dependency_getter(graph)
+    visited = {root_package}
+    stack = [(root_package, iter(get_dependencies(root_package)))]
+    while stack:
+        package, deps = stack[-1]
+        dep = next(deps, None)
+        if dep is None:
+            stack.pop()
+            continue
+        yield package, dep
+        if dep not in visited:
+            visited.add(dep)
+            stack.append((dep, iter(get_dependencies(dep))))
+
+
+class GraphExporter:
+    """Базовый экспортёр: пишет заголовок, узлы и рёбра по мере обхода, затем окончание"""
+
+    def __init__(self, out, versions=None):
+        self.out = out
+        self.versions = versions or {}
+        self.nodes = {}
+
+    def export(self, graph, root_package):
+        """Выгружает подграф, достижимый из root_package; возвращает число рёбер"""
+        count = 0
+        self.start(root_package)
+        self._see(root_package)
+        for package, dep in iter_edges(graph, root_package):
+            self._see(dep)
+            self.edge(package, dep)
+            count += 1
+        self.finish()
+        return count
+
+    def _see(self, package):
+        if package not in self.nodes:
+            self.nodes[package] = None
+            self.node(package)
+
+    def start(self, root_package):
+        pass
+
+    def node(self, package):
+        pass
+
+    def edge(self, package, dependency):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+
+class PlantUMLExporter(GraphExporter):
+    def start(self, root_package):
+        self.out.write("@startuml\n"
+                       "skinparam monochrome true\n"
+                       "skinparam nodesep 20\n"
+                       "skinparam ranksep 40\n"
+                       "left to right direction\n"
+                       "\n")
+
+    def edge(self, package, dependency):
+        self.out.write(f'["{package}"] --> ["{dependency}"]\n')
+
+    def finish(self):
+        self.out.write("@enduml\n")
+
+
+class DotExporter(GraphExporter):
+    def start(self, root_package):
+        self.out.write(f"digraph {json.dumps(root_package)} {{\n  rankdir=LR;\n")
+
+    def node(self, package):
+        version = self.versions.get(package)
+        if version:
+            self.out.write(f"  {json.dumps(package)} [tooltip={json.dumps(version)}];\n")
+
+    def edge(self, package, dependency):
+        self.out.write(f"  {json.dumps(package)} -> {json.dumps(dependency)};\n")
+
+    def finish(self):
+        self.out.write("}\n")
+
+
+class GraphMLExporter(GraphExporter):
+    def start(self, root_package):
+        self.edge_id = 0
+        self.out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                       '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                       '  <key id="version" for="node" attr.name="version" attr.type="string"/>\n'
+                       f'  <graph id={quoteattr(root_package)} edgedefault="directed">\n')
+
+    def node(self, package):
+        version = self.versions.get(package)
+        if version:
+            self.out.write(f'    <node id={quoteattr(package)}>'
+                           f'<data key="version">{escape(version)}</data></node>\n')
+        else:
+            self.out.write(f'    <node id={quoteattr(package)}/>\n')
+
+    def edge(self, package, dependency):
+        self.out.write(f'    <edge id="e{self.edge_id}" source={quoteattr(package)} '
+                       f'target={quoteattr(dependency)}/>\n')
+        self.edge_id += 1
+
+    def finish(self):
+        self.out.write("  </graph>\n</graphml>\n")
+
+
+class JSONExporter(GraphExporter):
+    """{"root": ..., "edges": [[от, к], ...], "nodes": [{"name", "version"}, ...]}"""
+
+    def start(self, root_package):
+        self.first = True
+        self.out.write('{"root": %s, "edges": [' % json.dumps(root_package))
+
+    def edge(self, package, dependency):
+        self.out.write(("\n  " if self.first else ",\n  ") + json.dumps([package, dependency]))
+        self.first = False
+
+    def finish(self):
+        self.out.write('\n], "nodes": [')
+        for i, package in enumerate(self.nodes):
+            record = {"name": package, "version": self.versions.get(package)}
+            self.out.write(("\n  " if i == 0 else ",\n  ") + json.dumps(record))
+        self.out.write("\n]}\n")
+
+
+def is_json_export(data):
+    return isinstance(data, dict) and set(data) == {"root", "edges", "nodes"}
+
+
+def graph_from_json(data):
+    """Граф из разобранной выгрузки JSONExporter (например, graph.json пакетного режима)"""
+    graph = DependencyGraph()
+    graph.add_package(data["root"])
+    for record in data["nodes"]:
+        graph.add_package(record["name"], record.get("version"))
+    for package, dependency in data["edges"]:
+        graph.add_dependency(package, dependency)
+    return graph
+
+
+class NDJSONExporter(GraphExporter):
+    """Одна JSON-запись на строку: узел - при первом появлении, затем ребро"""
+
+    def node(self, package):
+        record = {"type": "node", "name": package, "version": self.versions.get(package)}
+        self.out.write(json.dumps(record) + "\n")
+
+    def edge(self, package, dependency):
+        self.out.write(json.dumps({"type": "edge", "from": package, "to": dependency}) + "\n")
+
+
+EXPORTERS = {
+    "plantuml": PlantUMLExporter,
+    "dot": DotExporter,
+    "graphml": GraphMLExporter,
+    "json": JSONExporter,
+    "ndjson": NDJSONExporter,
+}
+
+
+def open_output(path, compress=None):
+    """Открывает файл на запись; gzip - по флагу или по расширению .gz"""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def export_graph(graph, root_package, fmt, out):
+    """Выгружает граф в out в формате fmt; возвращает число рёбер"""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    exporter = EXPORTERS[fmt](out, getattr(graph, "versions", None))
+    with profiling.phase(f"export.{fmt}"):
+        edges = exporter.export(graph, root_package)
+    profiling.count("export.edges", edges)
+    return edges
+
+
+def export_to_file(graph, root_package, fmt, path, compress=None):
+    with open_output(path, compress) as out:
+        return export_graph(graph, root_package, fmt, out)
@@ -0,0 +1,309 @@
+"""Локальная замена npm-реестра для офлайн-тестов и замеров краулера
+
+Реестр отдаёт пакументы по GET /<имя> (scoped-имена - с %2f, как у npm)
+из одного из источников:
+
+    DirectorySource  каталог записанных пакументов (<имя>.json)
+    GraphSource      граф зависимостей (снимок, lock-файл, тестовый JSON,
+                     синтетический граф): пакументы строятся из узлов,
+                     зависимости указывают точные версии
+    RecordingSource  каталог плюс настоящий реестр: отсутствующие пакументы
+                     один раз загружаются из upstream и сохраняются
+
+Поверх источника FaultInjector добавляет задержку (с джиттером),
+ограничение пропускной способности, ответы 429 (случайные и по лимиту
+запросов в секунду, с Retry-After), 5xx и обрезанные тела (соединение
+закрывается раньше, чем обещает Content-Length). Все случайные решения
+берутся из генератора с заданным зерном, поэтому прогон воспроизводим.
+Счётчики запросов и сбоев - GET /-/depviz/stats.
+"""
+
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+try:
+    from .errors import ConfigError
+    from .http_pool import ConnectionPool
+    from .native import package_name
+    from .npm_client import ABBREVIATED_ACCEPT
+except ImportError:
+    from errors import ConfigError
+    from http_pool import ConnectionPool
+    from native import package_name
+    from npm_client import ABBREVIATED_ACCEPT
+
+
+STATS_PATH = "/-/depviz/stats"
+ERROR_STATUSES = (500, 502, 503, 504)
+CHUNK_SIZE = 16 * 1024
+
+
+def document_path(directory, name):
+    """Файл пакумента в каталоге записи: "/" scoped-имени кодируется"""
+    return os.path.join(directory, quote(name, safe="@") + ".json")
+
+
+class DirectorySource:
+    """Пакументы из каталога <имя>.json"""
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            raise ConfigError(f"Каталог пакументов не найден: {directory}")
+        self.directory = directory
+
+    def get(self, name):
+        try:
+            with open(document_path(self.directory, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class RecordingSource(DirectorySource):
+    """Каталог, который дополняется из настоящего реестра при первом запросе"""
+
+    def __init__(self, directory, upstream, pool=None):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory)
+        self.upstream = upstream.rstrip("/")
+        self.pool = pool or ConnectionPool()
+        self.recorded = 0
+
+    def get(self, name):
+        body = super().get(name)
+        if body is not None:
+            return body
+        headers = {"Accept": ABBREVIATED_ACCEPT, "Accept-Encoding": "gzip"}
+        response = self.pool.request("GET", f"{self.upstream}/{quote(name, safe='@')}", headers)
+        if response.status == 404:
+            return None
+        if response.status >= 400:
+            raise ConfigError(f"Ошибка HTTP {response.status} при записи {name}: {response.reason}")
+        # Атомарная запись: параллельный запрос того же пакета не увидит половину файла
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(response.body)
+        os.replace(tmp, document_path(self.directory, name))
+        self.recorded += 1
+        return response.body
+
+
+class GraphSource:
+    """Пакументы, построенные из графа зависимостей
+
+    Тег latest указывает на версию узла с простым именем (её выбрал бы
+    обход от корня), поэтому обход реестра воспроизводит исходный граф.
+    """
+
+    def __init__(self, graph):
+        csr = graph.to_csr()
+        versions = getattr(graph, "versions", None) or {}
+        self._csr = csr
+        self._versions = versions
+        self._packages = {}
+        for node, key in enumerate(csr.names):
+            version = versions.get(key)
+            name = package_name(key, version)
+            self._packages.setdefault(name, []).append(node)
+
+    def _version(self, node):
+        return self._versions.get(self._csr.names[node]) or "1.0.0"
+
+    def get(self, name):
+        nodes = self._packages.get(name)
+        if nodes is None:
+            return None
+        names = self._csr.names
+        versions = {}
+        for node in nodes:
+            version = self._version(node)
+            dependencies = {}
+            for target in self._csr.successors(node):
+                dependencies[package_name(names[target], self._versions.get(names[target]))] = self._version(target)
+            versions[version] = {"name": name, "version": version, "dependencies": dependencies}
+        latest = next((self._version(node) for node in nodes if names[node] == name), self._version(nodes[0]))
+        return json.dumps({"name": name, "dist-tags": {"latest": latest}, "versions": versions}).encode()
+
+
+class FaultInjector:
+    """Воспроизводимые сбои: задержка, полоса, 429, 5xx, обрезанные тела
+
+    Вероятности задаются долями от 0 до 1; rate_limit - запросов в секунду
+    (корзина токенов ёмкостью burst), сверх него отвечаем 429 с
+    Retry-After. bandwidth - байт в секунду на соединение.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=None, throttle_rate=0.0, error_rate=0.0,
+                 truncate_rate=0.0, rate_limit=None, burst=None, retry_after=1, seed=0, clock=time.monotonic):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or (rate_limit or 0)
+        self.retry_after = retry_after
+        self.clock = clock
+        self._rng = random.Random(seed)
+        self._tokens = float(self.burst)
+        self._refilled = clock()
+        self._lock = threading.Lock()
+
+    def plan(self):
+        """(задержка в секундах, сбой) для очередного запроса
+
+        Сбой - None, ("throttle", retry_after), ("error", статус) или
+        ("truncate", None).
+        """
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            if self.rate_limit:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_limit)
+                self._refilled = now
+                if self._tokens < 1:
+                    return delay, ("throttle", max(1, round((1 - self._tokens) / self.rate_limit)))
+                self._tokens -= 1
+            roll = self._rng.random()
+            if roll < self.throttle_rate:
+                return delay, ("throttle", self.retry_after)
+            roll -= self.throttle_rate
+            if roll < self.error_rate:
+                return delay, ("error", self._rng.choice(ERROR_STATUSES))
+            roll -= self.error_rate
+            if roll < self.truncate_rate:
+                return delay, ("truncate", None)
+            return delay, None
+
+
+class FakeRegistry:
+    """Источник пакументов, сбои и счётчики; обслуживается RegistryHandler"""
+
+    def __init__(self, source, faults=None):
+        self.source = source
+        self.faults = faults or FaultInjector()
+        self.stats = {"requests": 0, "served": 0, "not_modified": 0, "not_found": 0, "throttled": 0,
+                      "errors": 0, "truncated": 0, "bytes": 0}
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def snapshot_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def document(self, name):
+        """(тело, тело gzip, ETag) или None; сжатие выполняется один раз"""
+        with self._lock:
+            known = self._documents.get(name)
+        if known is None:
+            body = self.source.get(name)
+            if body is None:
+                return None
+            known = (body, gzip.compress(body, 6), '"%x"' % zlib.crc32(body))
+            with self._lock:
+                self._documents[name] = known
+        return known
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        registry = self.server.registry
+        path = urlsplit(self.path).path
+        if path == STATS_PATH:
+            return self._send(200, json.dumps(registry.snapshot_stats()).encode())
+
+        registry.count("requests")
+        delay, fault = registry.faults.plan()
+        if delay:
+            time.sleep(delay)
+        if fault and fault[0] == "throttle":
+            registry.count("throttled")
+            return self._send(429, b'{"error":"Too Many Requests"}', {"Retry-After": str(fault[1])})
+        if fault and fault[0] == "error":
+            registry.count("errors")
+            return self._send(fault[1], b'{"error":"Injected failure"}')
+
+        try:
+            document = registry.document(unquote(path.lstrip("/")))
+        except ConfigError as e:
+            return self._send(502, json.dumps({"error": str(e)}).encode())
+        if document is None:
+            registry.count("not_found")
+            return self._send(404, b'{"error":"Not found"}')
+        body, compressed, etag = document
+        if self.headers.get("If-None-Match") == etag:
+            registry.count("not_modified")
+            return self._send(304, b"", {"ETag": etag})
+
+        headers = {"ETag": etag}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = compressed
+            headers["Content-Encoding"] = "gzip"
+        if fault:
+            # Обещаем всё тело, отдаём половину и закрываем соединение
+            registry.count("truncated")
+            self.close_connection = True
+            return self._send(200, body, headers, limit=len(body) // 2)
+        registry.count("served")
+        self._send(200, body, headers)
+
+    def _send(self, status, body, headers=None, limit=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        body = body[:limit] if limit is not None else body
+        bandwidth = self.server.registry.faults.bandwidth
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+        self.server.registry.count("bytes", len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_fake_registry(registry, host="127.0.0.1", port=0):
+    """Создаёт (но не запускает) HTTP-сервер реестра; порт 0 - любой свободный"""
+    server = ThreadingHTTPServer((host, port), RegistryHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    return server
+
+
+def registry_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+@contextmanager
+def running_registry(registry, host="127.0.0.1", port=0):
+    """Реестр в фоновом потоке на время блока; значение - его URL"""
+    server = make_fake_registry(registry, host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield registry_url(server)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,287 @@
+"""Самодостаточная HTML-страница с силовой укладкой графа: canvas, сдвиг, масштаб, поиск
+
+Координаты считает force_layout, страница только рисует: данные лежат
+в одном JSON внутри файла, скрипт и стили тоже встроены, так что файл
+открывается без сети и без сервера. Рисование идёт по запросу кадра
+(requestAnimationFrame) только после изменений: рёбра - одним путём,
+узлы - прямоугольниками, подписи - только при достаточном масштабе и не
+больше LABEL_LIMIT на экране. Узел под курсором ищется по сетке,
+построенной один раз при загрузке.
+"""
+
+import json
+from html import escape
+
+import numpy as np
+
+try:
+    from . import profiling
+    from .force_layout import force_layout
+except ImportError:
+    import profiling
+    from force_layout import force_layout
+
+
+LABEL_LIMIT = 400
+
+_PAGE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+html, body { margin: 0; height: 100%%; overflow: hidden; font: 13px sans-serif; background: #fff; }
+canvas { display: block; cursor: grab; }
+canvas.dragging { cursor: grabbing; }
+#panel { position: fixed; top: 8px; left: 8px; background: rgba(255,255,255,.92); border: 1px solid #ccc;
+         border-radius: 4px; padding: 6px 8px; max-width: 360px; }
+#panel input { width: 220px; }
+#info { margin-top: 4px; white-space: pre-wrap; color: #333; }
+#tip { position: fixed; pointer-events: none; background: #333; color: #fff; padding: 2px 6px;
+       border-radius: 3px; display: none; }
+</style>
+</head>
+<body>
+<canvas id="view"></canvas>
+<div id="panel">
+<input id="search" type="search" placeholder="Поиск пакета (Enter - следующий)" autocomplete="off">
+<span id="found"></span>
+<div id="info"></div>
+</div>
+<div id="tip"></div>
+<script type="application/json" id="graph-data">%(data)s</script>
+<script>
+(function () {
+  "use strict";
+  var data = JSON.parse(document.getElementById("graph-data").textContent);
+  var count = data.names.length, LABELS = %(labels)d;
+  var xs = Float64Array.from(data.x), ys = Float64Array.from(data.y), edges = Int32Array.from(data.edges);
+  var canvas = document.getElementById("view"), ctx = canvas.getContext("2d");
+  var search = document.getElementById("search"), found = document.getElementById("found");
+  var info = document.getElementById("info"), tip = document.getElementById("tip");
+  var palette = ["#d62728", "#1f77b4", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f"];
+  var scale = 1, offsetX = 0, offsetY = 0, width = 0, height = 0, ratio = 1;
+  var matches = [], current = -1, selected = -1, hovered = -1, pending = false;
+  var outgoing = new Int32Array(count), incoming = new Int32Array(count), i;
+  for (i = 0; i < edges.length; i += 2) { outgoing[edges[i]]++; incoming[edges[i + 1]]++; }
+
+  // Сетка для поиска узла под курсором
+  var minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+  for (i = 0; i < count; i++) {
+    minX = Math.min(minX, xs[i]); maxX = Math.max(maxX, xs[i]);
+    minY = Math.min(minY, ys[i]); maxY = Math.max(maxY, ys[i]);
+  }
+  var side = Math.max(1, Math.ceil(Math.sqrt(count))), cellW = (maxX - minX) / side || 1,
+      cellH = (maxY - minY) / side || 1, grid = new Map();
+  function cellOf(x, y) {
+    return Math.min(side - 1, Math.max(0, Math.floor((x - minX) / cellW))) * side +
+           Math.min(side - 1, Math.max(0, Math.floor((y - minY) / cellH)));
+  }
+  for (i = 0; i < count; i++) {
+    var key = cellOf(xs[i], ys[i]);
+    if (!grid.has(key)) grid.set(key, []);
+    grid.get(key).push(i);
+  }
+
+  function label(node) {
+    var version = data.versions[node];
+    return version ? data.names[node] + "@" + version : data.names[node];
+  }
+  function fit() {
+    var w = Math.max(maxX - minX, 1), h = Math.max(maxY - minY, 1);
+    scale = 0.9 * Math.min(width / w, height / h);
+    offsetX = width / 2 - (minX + maxX) / 2 * scale;
+    offsetY = height / 2 - (minY + maxY) / 2 * scale;
+  }
+  function resize() {
+    ratio = window.devicePixelRatio || 1;
+    width = window.innerWidth; height = window.innerHeight;
+    canvas.width = width * ratio; canvas.height = height * ratio;
+    canvas.style.width = width + "px"; canvas.style.height = height + "px";
+    redraw();
+  }
+  function redraw() {
+    if (!pending) { pending = true; window.requestAnimationFrame(draw); }
+  }
+  function visible(sx, sy, margin) {
+    return sx > -margin && sy > -margin && sx < width + margin && sy < height + margin;
+  }
+
+  function draw() {
+    pending = false;
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, width, height);
+    var e, a, b, ax, ay, bx, by;
+    ctx.lineWidth = 1;
+    ctx.strokeStyle = count > 2000 ? "rgba(120,120,120,0.15)" : "rgba(120,120,120,0.5)";
+    ctx.beginPath();
+    for (e = 0; e < edges.length; e += 2) {
+      a = edges[e]; b = edges[e + 1];
+      ax = xs[a] * scale + offsetX; ay = ys[a] * scale + offsetY;
+      bx = xs[b] * scale + offsetX; by = ys[b] * scale + offsetY;
+      if ((ax < 0 && bx < 0) || (ay < 0 && by < 0) || (ax > width && bx > width) || (ay > height && by > height)) {
+        continue;
+      }
+      ctx.moveTo(ax, ay); ctx.lineTo(bx, by);
+    }
+    ctx.stroke();
+
+    if (selected >= 0) {
+      // Рёбра выбранного узла: зависимости синим, зависящие красным
+      for (e = 0; e < edges.length; e += 2) {
+        a = edges[e]; b = edges[e + 1];
+        if (a !== selected && b !== selected) continue;
+        ctx.strokeStyle = a === selected ? "#1f77b4" : "#d62728";
+        ctx.lineWidth = 1.5;
+        ctx.beginPath();
+        ctx.moveTo(xs[a] * scale + offsetX, ys[a] * scale + offsetY);
+        ctx.lineTo(xs[b] * scale + offsetX, ys[b] * scale + offsetY);
+        ctx.stroke();
+      }
+    }
+
+    var size = Math.max(2, Math.min(8, 3 * Math.sqrt(scale))), shown = [];
+    for (i = 0; i < count; i++) {
+      ax = xs[i] * scale + offsetX; ay = ys[i] * scale + offsetY;
+      if (!visible(ax, ay, size)) continue;
+      ctx.fillStyle = palette[Math.min(data.depth[i], palette.length - 1)];
+      ctx.fillRect(ax - size / 2, ay - size / 2, size, size);
+      if (shown.length <= LABELS) shown.push(i);
+    }
+    ctx.font = "12px sans-serif";
+    ctx.fillStyle = "#222";
+    if (shown.length <= LABELS) {
+      for (i = 0; i < shown.length; i++) {
+        ctx.fillText(data.names[shown[i]], xs[shown[i]] * scale + offsetX + size, ys[shown[i]] * scale + offsetY - size);
+      }
+    }
+    var marked = matches.slice(0, 1000);
+    if (selected >= 0) marked.push(selected);
+    for (i = 0; i < marked.length; i++) {
+      ax = xs[marked[i]] * scale + offsetX; ay = ys[marked[i]] * scale + offsetY;
+      if (!visible(ax, ay, 10)) continue;
+      ctx.strokeStyle = marked[i] === selected ? "#000" : "#ff00aa";
+      ctx.lineWidth = 2;
+      ctx.strokeRect(ax - size, ay - size, 2 * size, 2 * size);
+      ctx.fillText(data.names[marked[i]], ax + size + 2, ay - size - 2);
+    }
+  }
+
+  function nodeAt(sx, sy) {
+    var x = (sx - offsetX) / scale, y = (sy - offsetY) / scale, radius = 6 / scale;
+    var best = -1, bestDistance = radius * radius, cx, cy, dx, dy;
+    var x0 = Math.floor((x - radius - minX) / cellW), x1 = Math.floor((x + radius - minX) / cellW);
+    var y0 = Math.floor((y - radius - minY) / cellH), y1 = Math.floor((y + radius - minY) / cellH);
+    for (cx = Math.max(0, x0); cx <= Math.min(side - 1, x1); cx++) {
+      for (cy = Math.max(0, y0); cy <= Math.min(side - 1, y1); cy++) {
+        var nodes = grid.get(cx * side + cy) || [];
+        for (i = 0; i < nodes.length; i++) {
+          dx = xs[nodes[i]] - x; dy = ys[nodes[i]] - y;
+          if (dx * dx + dy * dy <= bestDistance) { best = nodes[i]; bestDistance = dx * dx + dy * dy; }
+        }
+      }
+    }
+    return best;
+  }
+  function select(node) {
+    selected = node;
+    info.textContent = node < 0 ? "" : label(node) + "\\nглубина: " + data.depth[node] +
+      "\\nзависимостей: " + outgoing[node] + ", зависят: " + incoming[node];
+    redraw();
+  }
+  function focus(node) {
+    scale = Math.max(scale, 2);
+    offsetX = width / 2 - xs[node] * scale;
+    offsetY = height / 2 - ys[node] * scale;
+    select(node);
+  }
+
+  var drag = null;
+  canvas.addEventListener("mousedown", function (event) {
+    drag = {x: event.clientX, y: event.clientY, moved: false};
+    canvas.classList.add("dragging");
+  });
+  window.addEventListener("mouseup", function (event) {
+    if (drag && !drag.moved) select(nodeAt(event.clientX, event.clientY));
+    drag = null;
+    canvas.classList.remove("dragging");
+  });
+  canvas.addEventListener("mousemove", function (event) {
+    if (drag) {
+      offsetX += event.clientX - drag.x; offsetY += event.clientY - drag.y;
+      drag.moved = drag.moved || Math.abs(event.clientX - drag.x) + Math.abs(event.clientY - drag.y) > 0;
+      drag.x = event.clientX; drag.y = event.clientY;
+      tip.style.display = "none";
+      redraw();
+      return;
+    }
+    hovered = nodeAt(event.clientX, event.clientY);
+    if (hovered < 0) { tip.style.display = "none"; return; }
+    tip.textContent = label(hovered);
+    tip.style.left = event.clientX + 12 + "px"; tip.style.top = event.clientY + 12 + "px";
+    tip.style.display = "block";
+  });
+  canvas.addEventListener("wheel", function (event) {
+    event.preventDefault();
+    var factor = Math.exp(-event.deltaY * 0.0015);
+    offsetX = event.clientX - (event.clientX - offsetX) * factor;
+    offsetY = event.clientY - (event.clientY - offsetY) * factor;
+    scale *= factor;
+    redraw();
+  }, {passive: false});
+  canvas.addEventListener("dblclick", function () { fit(); redraw(); });
+
+  search.addEventListener("input", function () {
+    var query = search.value.trim().toLowerCase();
+    matches = [];
+    current = -1;
+    if (query) {
+      for (i = 0; i < count; i++) if (data.names[i].toLowerCase().indexOf(query) >= 0) matches.push(i);
+    }
+    found.textContent = query ? "найдено: " + matches.length : "";
+    redraw();
+  });
+  search.addEventListener("keydown", function (event) {
+    if (event.key === "Enter" && matches.length) {
+      current = (current + 1) %% matches.length;
+      focus(matches[current]);
+      found.textContent = "найдено: " + matches.length + " (" + (current + 1) + ")";
+    } else if (event.key === "Escape") {
+      search.value = ""; matches = []; found.textContent = ""; select(-1);
+    }
+  });
+
+  window.addEventListener("resize", resize);
+  width = window.innerWidth; height = window.innerHeight;
+  fit();
+  resize();
+})();
+</script>
+</body>
+</html>
+"""
+
+
+def write_html(layout, out, versions=None, title=None):
+    """Пишет укладку force_layout в поток как самодостаточную HTML-страницу"""
+    versions = versions or {}
+    data = {
+        "names": layout.names,
+        "versions": [versions.get(name) for name in layout.names],
+        "x": [round(float(value), 1) for value in layout.positions[:, 0]],
+        "y": [round(float(value), 1) for value in layout.positions[:, 1]],
+        "depth": layout.depth.tolist(),
+        "edges": np.stack([layout.sources, layout.targets], axis=1).ravel().tolist(),
+    }
+    # "</" внутри JSON закрыл бы тег <script>; "<\/" - та же строка для JSON.parse
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    title = title or (layout.names[0] if layout.names else "")
+    out.write(_PAGE % {"title": escape(title), "data": payload, "labels": LABEL_LIMIT})
+
+
+def save_html(graph, root_package, path):
+    """Укладывает подграф root_package силовым методом и сохраняет страницу; возвращает укладку"""
+    layout = force_layout(graph, root_package)
+    with profiling.phase("render.html"), open(path, 'w', encoding='utf-8') as f:
+        write_html(layout, f, getattr(graph, 'versions', None), f"Зависимости {root_package}")
+    return layout
@@ -0,0 +1,152 @@
+import gzip
+import http.client
+import ssl
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    from . import profiling
+except ImportError:
+    import profiling
+
+
+Response = namedtuple("Response", ["status", "reason", "headers", "body"])
+
+# Ошибки, при которых переиспользованное соединение считаем закрытым сервером
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError,
+                 BrokenPipeError, http.client.CannotSendRequest)
+
+# Недочитанный остаток ответа меньше этого размера выгоднее дочитать,
+# чем терять соединение и заново проходить TLS-рукопожатие
+DRAIN_LIMIT = 256 * 1024
+
+
+class _CompleteBody:
+    """Тело ответа, для которого обрыв соединения - ошибка, а не конец данных
+
+    HTTPResponse.read(n) при закрытии соединения раньше Content-Length
+    молча возвращает b"", и обрезанный документ выглядит как целый.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def read(self, size=-1):
+        data = self.raw.read() if size is None or size < 0 else self.raw.read(size)
+        if not data and size != 0 and self.raw.length:
+            raise http.client.IncompleteRead(b"", self.raw.length)
+        return data
+
+
+class ConnectionPool:
+    """Пул постоянных (keep-alive) соединений, сгруппированных по хостам"""
+
+    def __init__(self, max_per_host=16, timeout=30, ssl_context=None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl._create_unverified_context()
+        self.connections_opened = 0
+        self._idle = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme, host, port):
+        with self._lock:
+            self.connections_opened += 1
+        profiling.count("http.connections")
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _slot(self, key):
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[key]
+
+    def _take_idle(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            return idle.pop() if idle else None
+
+    def _put_idle(self, key, conn):
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    def request(self, method, url, headers=None):
+        """Выполняет запрос и читает тело ответа целиком"""
+        with self.stream(method, url, headers) as response:
+            return response._replace(body=response.body.read())
+
+    @contextmanager
+    def stream(self, method, url, headers=None):
+        """Выполняет запрос; тело ответа отдаётся как поток (gzip распаковывается)
+
+        После выхода из блока соединение возвращается в пул, если ответ
+        прочитан полностью или его остаток невелик, иначе закрывается.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        slot = self._slot(key)
+        slot.acquire()
+        try:
+            conn = self._take_idle(key)
+            reused = conn is not None
+            profiling.count("http.requests")
+            # Фаза до получения заголовков ответа: соединение, отправка, ожидание сервера
+            with profiling.phase("http.request"):
+                while True:
+                    if conn is None:
+                        conn = self._connect(scheme, parts.hostname, port)
+                    try:
+                        conn.request(method, path, headers=headers or {})
+                        raw = conn.getresponse()
+                        break
+                    except _STALE_ERRORS:
+                        conn.close()
+                        if not reused:
+                            raise
+                        # Сервер закрыл простаивающее соединение - пробуем новое
+                        conn, reused = None, False
+                    except BaseException:
+                        conn.close()
+                        raise
+
+            response_headers = {k.lower(): v for k, v in raw.getheaders()}
+            if response_headers.get("content-length", "").isdigit():
+                profiling.count("http.wire_bytes", int(response_headers["content-length"]))
+            body = _CompleteBody(raw)
+            if response_headers.get("content-encoding") == "gzip":
+                body = gzip.GzipFile(fileobj=body)
+
+            try:
+                yield Response(raw.status, raw.reason, response_headers, body)
+                if not raw.isclosed() and raw.length is not None and raw.length <= DRAIN_LIMIT:
+                    raw.read()
+            except BaseException:
+                conn.close()
+                raise
+
+            if raw.isclosed() and not raw.will_close:
+                self._put_idle(key, conn)
+            else:
+                conn.close()
+        finally:
+            slot.release()
+
+    def close(self):
+        """Закрывает все простаивающие соединения"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
@@ -0,0 +1,249 @@
+"""Послойная укладка графа (метод Сугиямы) без внешних зависимостей"""
+
+from collections import deque
+
+try:
+    from .dependency_graph import DependencyGraph
+    from .exporters import iter_edges
+except ImportError:
+    from dependency_graph import DependencyGraph
+    from exporters import iter_edges
+
+
+class Layout:
+    """Результат укладки: прямоугольники узлов и ломаные рёбер в координатах холста"""
+
+    def __init__(self, nodes, edges, width, height):
+        # nodes: [(имя, x, y, ширина, высота)], edges: [(от, к, [(x, y), ...])]
+        self.nodes = nodes
+        self.edges = edges
+        self.width = width
+        self.height = height
+
+
+def _reachable(csr, root_id):
+    order = [root_id]
+    local = {root_id: 0}
+    queue = deque([root_id])
+    while queue:
+        node = queue.popleft()
+        for target in csr.successors(node):
+            if target not in local:
+                local[target] = len(order)
+                order.append(target)
+                queue.append(target)
+    return order, local
+
+
+def _break_cycles(succ):
+    """Итеративный DFS из корня; обратные рёбра возвращаются как множество (u, v)"""
+    state = [0] * len(succ)  # 0 - не посещён, 1 - в стеке, 2 - обработан
+    back_edges = set()
+    state[0] = 1
+    stack = [(0, iter(succ[0]))]
+    while stack:
+        node, it = stack[-1]
+        target = next(it, None)
+        if target is None:
+            state[node] = 2
+            stack.pop()
+        elif state[target] == 1:
+            back_edges.add((node, target))
+        elif state[target] == 0:
+            state[target] = 1
+            stack.append((target, iter(succ[target])))
+    return back_edges
+
+
+def _longest_path_layers(succ):
+    indegree = [0] * len(succ)
+    for targets in succ:
+        for target in targets:
+            indegree[target] += 1
+    layer = [0] * len(succ)
+    queue = deque(node for node, degree in enumerate(indegree) if degree == 0)
+    while queue:
+        node = queue.popleft()
+        for target in succ[node]:
+            layer[target] = max(layer[target], layer[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    return layer
+
+
+def _order_layers(layers, preds, succs, iterations):
+    """Минимизация пересечений: попеременные проходы по барицентрам соседних слоёв"""
+    position = [0] * (len(preds))
+    for nodes in layers:
+        for i, node in enumerate(nodes):
+            position[node] = i
+
+    for iteration in range(iterations):
+        downward = iteration % 2 == 0
+        indices = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+        neighbours = preds if downward else succs
+        for index in indices:
+            nodes = layers[index]
+            keys = {}
+            for node in nodes:
+                adjacent = neighbours[node]
+                if len(adjacent) == 1:
+                    # Фиктивные узлы и большинство пакетов имеют одного соседа
+                    keys[node] = (position[adjacent[0]], position[node])
+                elif adjacent:
+                    keys[node] = (sum([position[n] for n in adjacent]) / len(adjacent), position[node])
+                else:
+                    keys[node] = (position[node], position[node])
+            nodes.sort(key=keys.__getitem__)
+            for i, node in enumerate(nodes):
+                position[node] = i
+
+
+def _assign_coordinates(layers, preds, succs, heights, gap, passes):
+    """Выравнивает центры узлов по среднему соседей, сохраняя порядок и зазоры в слое"""
+    center = [0.0] * len(heights)
+    for nodes in layers:
+        offset = 0.0
+        for node in nodes:
+            center[node] = offset + heights[node] / 2
+            offset += heights[node] + gap
+
+    for iteration in range(passes):
+        downward = iteration % 2 == 0
+        indices = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+        neighbours = preds if downward else succs
+        for index in indices:
+            nodes = layers[index]
+            desired = []
+            for node in nodes:
+                adjacent = neighbours[node]
+                if len(adjacent) == 1:
+                    desired.append(center[adjacent[0]])
+                elif adjacent:
+                    desired.append(sum([center[n] for n in adjacent]) / len(adjacent))
+                else:
+                    desired.append(center[node])
+            # Минимальные расстояния между центрами соседних узлов слоя
+            spacing = [(heights[a] + heights[b]) / 2 + gap for a, b in zip(nodes, nodes[1:])]
+
+            # Сдвигаем вниз и вверх от желаемых позиций и берём среднее,
+            # затем восстанавливаем минимальные зазоры
+            forward = list(desired)
+            for i, step in enumerate(spacing):
+                if forward[i + 1] < forward[i] + step:
+                    forward[i + 1] = forward[i] + step
+            backward = desired
+            for i in range(len(spacing) - 1, -1, -1):
+                if backward[i] > backward[i + 1] - spacing[i]:
+                    backward[i] = backward[i + 1] - spacing[i]
+            placed = [(a + b) / 2 for a, b in zip(forward, backward)]
+            for i, step in enumerate(spacing):
+                if placed[i + 1] < placed[i] + step:
+                    placed[i + 1] = placed[i] + step
+            for node, value in zip(nodes, placed):
+                center[node] = value
+    return [value - height / 2 for value, height in zip(center, heights)]
+
+
+def layered_layout(graph, root_package, iterations=6, node_height=24, node_gap=12,
+                   layer_gap=60, char_width=7, padding=10):
+    """Укладывает подграф, достижимый из root_package, слева направо по слоям
+
+    Этапы: разрыв циклов (обращение обратных рёбер DFS), слои по длиннейшему
+    пути, фиктивные узлы на длинных рёбрах, упорядочивание слоёв
+    барицентрами и выравнивание координат. Все этапы, кроме сортировок
+    внутри слоёв, линейны по числу узлов и рёбер.
+    """
+    if not hasattr(graph, 'to_csr'):
+        reachable = DependencyGraph(compact=True)
+        reachable.add_package(root_package)
+        for package, dep in iter_edges(graph, root_package):
+            reachable.add_dependency(package, dep)
+        graph = reachable
+    csr = graph.to_csr()
+    if root_package not in csr.ids:
+        csr = DependencyGraph({root_package: []}).to_csr()
+
+    order, local = _reachable(csr, csr.ids[root_package])
+    names = [csr.names[node] for node in order]
+    edges = []
+    for node in order:
+        for target in dict.fromkeys(csr.successors(node)):
+            if target != node:
+                edges.append((local[node], local[target]))
+
+    succ = [[] for _ in names]
+    for source, target in edges:
+        succ[source].append(target)
+    back_edges = _break_cycles(succ)
+
+    dag = [[] for _ in names]
+    oriented = []
+    for source, target in edges:
+        reversed_edge = (source, target) in back_edges
+        if reversed_edge:
+            source, target = target, source
+        dag[source].append(target)
+        oriented.append((source, target, reversed_edge))
+    layer = _longest_path_layers(dag)
+
+    # Длинные рёбра разбиваем фиктивными узлами, чтобы каждое ребро
+    # соединяло соседние слои
+    widths = [len(name) * char_width + 2 * padding for name in names]
+    heights = [node_height] * len(names)
+    preds = [[] for _ in names]
+    succs = [[] for _ in names]
+    chains = []
+    for source, target, reversed_edge in oriented:
+        chain = [source]
+        for step in range(layer[source] + 1, layer[target]):
+            dummy = len(layer)
+            layer.append(step)
+            widths.append(0)
+            heights.append(0)
+            preds.append([])
+            succs.append([])
+            chain.append(dummy)
+        chain.append(target)
+        for a, b in zip(chain, chain[1:]):
+            succs[a].append(b)
+            preds[b].append(a)
+        chains.append((chain, reversed_edge))
+
+    layers = [[] for _ in range(max(layer) + 1)]
+    for node, index in enumerate(layer):
+        layers[index].append(node)
+
+    _order_layers(layers, preds, succs, iterations)
+    y = _assign_coordinates(layers, preds, succs, heights, node_gap, iterations)
+
+    layer_x = []
+    x = padding
+    for nodes in layers:
+        layer_x.append(x)
+        x += max(widths[node] for node in nodes) + layer_gap
+    top = min(y) - padding
+    y = [value - top for value in y]
+
+    result_nodes = [(names[node], layer_x[layer[node]], y[node], widths[node], heights[node])
+                    for node in range(len(names))]
+    result_edges = []
+    for chain, reversed_edge in chains:
+        points = []
+        for i, node in enumerate(chain):
+            left = layer_x[layer[node]]
+            middle = y[node] + heights[node] / 2
+            if i > 0:
+                points.append((left, middle))
+            if i < len(chain) - 1:
+                points.append((left + widths[node], middle))
+        source, target = names[chain[0]], names[chain[-1]]
+        if reversed_edge:
+            source, target = target, source
+            points.reverse()
+        result_edges.append((source, target, points))
+
+    width = x - layer_gap + padding
+    height = max(y[node] + heights[node] for node in range(len(layer))) + padding
+    return Layout(result_nodes, result_edges, width, height)
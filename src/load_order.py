@@ -0,0 +1,194 @@
+"""Компоненты сильной связности и порядок загрузки пакетов волнами"""
+
+from array import array
+
+try:
+    from . import profiling
+    from .dependency_graph import CSRGraph, DependencyGraph
+except ImportError:
+    import profiling
+    from dependency_graph import CSRGraph, DependencyGraph
+
+
+def strongly_connected_components(csr):
+    """Итеративный алгоритм Тарьяна за O(V + E)
+
+    Возвращает (component, count): component[i] - номер компоненты узла i.
+    Компоненты нумеруются в порядке завершения, поэтому рёбра конденсации
+    всегда ведут от большего номера к меньшему (зависимости - раньше).
+    """
+    node_count = csr.node_count
+    offsets, targets = csr.offsets, csr.targets
+    index = [-1] * node_count
+    low = [0] * node_count
+    on_stack = [False] * node_count
+    component = array('i', [-1]) * node_count
+    stack = []
+    counter = count = 0
+
+    for start in range(node_count):
+        if index[start] != -1:
+            continue
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = True
+        # Элементы: (узел, позиция следующего ребра в targets)
+        work = [(start, offsets[start])]
+        while work:
+            node, edge = work[-1]
+            end = offsets[node + 1]
+            descended = False
+            while edge < end:
+                target = targets[edge]
+                edge += 1
+                if index[target] == -1:
+                    work[-1] = (node, edge)
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, offsets[target]))
+                    descended = True
+                    break
+                if on_stack[target] and index[target] < low[node]:
+                    low[node] = index[target]
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = count
+                    if member == node:
+                        break
+                count += 1
+    return component, count
+
+
+def condense(csr, component, count):
+    """DAG конденсации: CSR над номерами компонент без петель и повторных рёбер"""
+    sources = array('i')
+    targets = array('i')
+    seen = set()
+    for node in range(csr.node_count):
+        source = component[node]
+        for target in csr.successors(node):
+            target = component[target]
+            if source != target:
+                code = source << 32 | target
+                if code not in seen:
+                    seen.add(code)
+                    sources.append(source)
+                    targets.append(target)
+    return CSRGraph.from_edges(range(count), sources, targets, ids={})
+
+
+class LoadOrder:
+    """Порядок загрузки: волны пакетов, каждая зависит только от предыдущих
+
+    waves[i] - пакеты i-й волны; пакеты одной волны можно собирать
+    параллельно. cycles - группы взаимозависимых пакетов (компоненты
+    сильной связности из нескольких узлов или с петлёй); такая группа
+    целиком попадает в одну волну.
+    """
+
+    def __init__(self, waves, cycles, root=None):
+        self.waves = waves
+        self.cycles = cycles
+        self.root = root
+
+    @property
+    def order(self):
+        return [package for wave in self.waves for package in wave]
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "packages": sum(len(wave) for wave in self.waves),
+            "waves": self.waves,
+            "cycles": self.cycles,
+        }
+
+
+@profiling.profiled("load_order")
+def load_waves(graph, root_package=None):
+    """Волны Кана по DAG конденсации: сначала пакеты без зависимостей
+
+    Если задан root_package, учитываются только пакеты, достижимые из него.
+    Всё, включая раскладку по волнам, выполняется за O(V + E).
+    """
+    if not hasattr(graph, 'to_csr'):
+        graph = DependencyGraph(graph)
+    csr = graph.to_csr()
+    if root_package is not None and root_package not in csr.ids:
+        return LoadOrder([[root_package]], [], root_package)
+
+    component, count = strongly_connected_components(csr)
+    dag = condense(csr, component, count)
+
+    included = bytearray(count)
+    if root_package is None:
+        included = bytearray(b'\x01') * count
+    else:
+        start = component[csr.ids[root_package]]
+        included[start] = 1
+        queue = [start]
+        for current in queue:
+            for target in dag.successors(current):
+                if not included[target]:
+                    included[target] = 1
+                    queue.append(target)
+
+    # Обратные рёбра: от зависимости к зависящим от неё компонентам
+    dependents = CSRGraph.from_edges(range(count), dag.targets, _edge_sources(dag), ids={})
+    remaining = array('i', [0]) * count
+    wave_of = array('i', [-1]) * count
+    current = []
+    for node in range(count):
+        if included[node]:
+            remaining[node] = dag.offsets[node + 1] - dag.offsets[node]
+            if remaining[node] == 0:
+                wave_of[node] = 0
+                current.append(node)
+    wave = 0
+    while current:
+        upcoming = []
+        for node in current:
+            for dependent in dependents.successors(node):
+                if included[dependent]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        wave_of[dependent] = wave + 1
+                        upcoming.append(dependent)
+        current = upcoming
+        wave += 1
+
+    waves = [[] for _ in range(wave)]
+    groups = {}
+    for node in range(csr.node_count):
+        node_component = component[node]
+        if included[node_component]:
+            name = csr.names[node]
+            waves[wave_of[node_component]].append(name)
+            groups.setdefault(node_component, []).append(name)
+    cycles = [members for node_component, members in groups.items()
+              if len(members) > 1 or _has_self_loop(csr, csr.ids[members[0]])]
+    return LoadOrder(waves, cycles, root_package)
+
+
+def _edge_sources(csr):
+    sources = array('i')
+    for node in range(csr.node_count):
+        sources.extend([node] * (csr.offsets[node + 1] - csr.offsets[node]))
+    return sources
+
+
+def _has_self_loop(csr, node):
+    return node in csr.successors(node)
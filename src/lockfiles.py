@@ -0,0 +1,373 @@
+"""Потоковое чтение lock-файлов npm (v2/v3), yarn (classic и berry) и pnpm
+
+Каждый читатель проходит файл один раз и хранит только сжатое описание
+пакетов (имя, версия, ссылки на зависимости), а не разобранный документ,
+поэтому память ограничена размером графа, а не размером файла. Граф
+собирается в компактном (интернированном) DependencyGraph обходом в
+ширину от корня: первая встреченная версия пакета получает простое имя,
+остальные - узлы вида имя@версия, как и при обходе реестра.
+"""
+
+import json
+import os
+import posixpath
+import re
+import sys
+from collections import deque
+
+try:
+    from . import profiling
+    from .dependency_graph import DependencyGraph
+    from .errors import ConfigError, InvalidURLError
+    from .packument import _StreamReader
+except ImportError:
+    import profiling
+    from dependency_graph import DependencyGraph
+    from errors import ConfigError, InvalidURLError
+    from packument import _StreamReader
+
+
+NPM_LOCKFILES = ("package-lock.json", "npm-shrinkwrap.json")
+YARN_LOCKFILES = ("yarn.lock",)
+PNPM_LOCKFILES = ("pnpm-lock.yaml",)
+
+
+def lockfile_format(path):
+    """'npm', 'yarn', 'pnpm' или None, если путь не похож на lock-файл"""
+    name = os.path.basename(path)
+    if name in NPM_LOCKFILES:
+        return "npm"
+    if name in YARN_LOCKFILES:
+        return "yarn"
+    if name in PNPM_LOCKFILES:
+        return "pnpm"
+    return None
+
+
+@profiling.profiled("lockfile.read")
+def read_lockfile(path, root_package=None, graph=None):
+    """Читает lock-файл в граф; формат определяется по имени файла"""
+    fmt = lockfile_format(path)
+    if fmt is None:
+        raise ConfigError(f"Неизвестный формат lock-файла: {path}")
+    if not os.path.exists(path):
+        raise InvalidURLError(f"Lock-файл не найден: {path}")
+    reader = {"npm": read_package_lock, "yarn": read_yarn_lock, "pnpm": read_pnpm_lock}[fmt]
+    return reader(path, root_package, graph)
+
+
+def _build_graph(packages, root_id, root_package, graph=None):
+    """Собирает граф из {id: (имя, версия, [id зависимостей])} обходом в ширину"""
+    graph = graph if graph is not None else DependencyGraph(compact=True)
+    keys = {}
+    claimed = {}
+    queue = deque()
+
+    def key_for(package_id, name=None):
+        key = keys.get(package_id)
+        if key is None:
+            package_name, version, _ = packages[package_id]
+            if name is None:
+                owner = claimed.setdefault(package_name, version)
+                name = package_name if owner == version else f"{package_name}@{version}"
+            key = keys[package_id] = name
+            graph.add_package(key, version)
+            queue.append(package_id)
+        return key
+
+    key_for(root_id, root_package)
+    claimed[root_package] = packages[root_id][1]
+    # Пакеты, не достижимые из корня (например, другие workspaces), тоже
+    # попадают в граф, но уже после всех достижимых
+    pending = iter(packages)
+    while True:
+        while queue:
+            package_id = queue.popleft()
+            source = keys[package_id]
+            for dep_id in packages[package_id][2]:
+                graph.add_dependency(source, key_for(dep_id))
+        package_id = next((p for p in pending if p not in keys), None)
+        if package_id is None:
+            return graph
+        key_for(package_id)
+
+
+# --- npm: package-lock.json v2/v3 -------------------------------------------
+
+NPM_DEPENDENCY_FIELDS = ("dependencies", "optionalDependencies", "peerDependencies")
+
+
+def _skip(reader):
+    """Пропускает значение, не собирая вложенные объекты целиком"""
+    if reader.peek() == "{":
+        for _ in reader.members():
+            _skip(reader)
+    else:
+        reader.value()
+
+
+def read_package_lock(path, root_package=None, graph=None):
+    """Граф из секции "packages" package-lock.json / npm-shrinkwrap.json
+
+    Записи читаются по одной; устаревшая секция "dependencies" (v2)
+    не разбирается - чтение останавливается сразу после "packages".
+    Зависимости разрешаются по правилам node_modules: ближайший
+    вложенный каталог, затем каталоги выше по дереву.
+    """
+    entries = {}
+    links = {}
+    lock_name = None
+    with open(path, "rb") as f:
+        reader = _StreamReader(f)
+        found = False
+        for key in reader.members():
+            if key == "name":
+                lock_name = reader.value()
+            elif key == "packages":
+                found = True
+                for location in reader.members():
+                    entry = reader.value()
+                    if entry.get("link"):
+                        links[location] = entry.get("resolved", "")
+                        continue
+                    name = entry.get("name") or location.rpartition("node_modules/")[2] or lock_name
+                    fields = NPM_DEPENDENCY_FIELDS
+                    if "node_modules/" not in location:
+                        # Корень и workspaces: devDependencies тоже установлены
+                        fields += ("devDependencies",)
+                    deps = []
+                    for field in fields:
+                        deps.extend(entry.get(field) or ())
+                    entries[location] = (sys.intern(name or "root"), entry.get("version"), deps)
+                break
+            else:
+                _skip(reader)
+    if not found:
+        raise ConfigError("В lock-файле нет секции \"packages\" (нужен lockfileVersion 2 или 3)")
+    if "" not in entries:
+        entries[""] = (lock_name or "root", None, [])
+
+    def resolve(location, dep):
+        base = location
+        while True:
+            candidate = f"{base}/node_modules/{dep}" if base else f"node_modules/{dep}"
+            candidate = links.get(candidate, candidate)
+            if candidate in entries:
+                return candidate
+            if not base:
+                return None
+            base = base.rpartition("/node_modules/")[0]
+
+    packages = {}
+    for location, (name, version, deps) in entries.items():
+        resolved = (resolve(location, dep) for dep in dict.fromkeys(deps))
+        packages[location] = (name, version, [target for target in resolved if target is not None])
+    root_package = root_package or entries[""][0]
+    return _build_graph(packages, "", root_package, graph)
+
+
+# --- yarn.lock (classic v1 и berry) ------------------------------------------
+
+YARN_DEPENDENCY_FIELDS = ("dependencies", "optionalDependencies")
+_YARN_PAIR = re.compile(r'^(?:"((?:[^"\\]|\\.)*)"|([^\s:"]+)):?\s*(.*)$')
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def _split_descriptor(descriptor):
+    """'@scope/name@npm:^1.0.0' -> ('@scope/name', '^1.0.0')"""
+    at = descriptor.find("@", 1)
+    if at < 0:
+        return descriptor, ""
+    name, spec = descriptor[:at], descriptor[at + 1:]
+    if spec.startswith("npm:") and "@" not in spec[4:].lstrip("@"):
+        spec = spec[4:]
+    return name, spec
+
+
+def read_yarn_lock(path, root_package=None, graph=None):
+    """Граф из yarn.lock; корень - workspace "." (berry) или package.json рядом с файлом"""
+    entries = []
+    descriptors = {}
+    workspaces = {}
+    entry = section = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            indent = len(line) - len(line.lstrip(" "))
+            if indent == 0:
+                section = None
+                entry = None
+                if stripped == "__metadata:":
+                    continue
+                entry = [None, None, []]  # имя, версия, [(имя, диапазон)]
+                entries.append(entry)
+                for descriptor in stripped[:-1].split(","):
+                    name, spec = _split_descriptor(descriptor.strip().strip('"'))
+                    entry[0] = sys.intern(name)
+                    descriptors[f"{name}@{spec}"] = len(entries) - 1
+                    if spec.startswith("workspace:"):
+                        workspaces[spec[len("workspace:"):]] = len(entries) - 1
+                        workspaces.setdefault(name, len(entries) - 1)
+                continue
+            if entry is None:
+                continue
+            match = _YARN_PAIR.match(stripped)
+            if match is None:
+                continue
+            key = match.group(1) if match.group(1) is not None else match.group(2)
+            value = _unquote(match.group(3))
+            if indent <= 2:
+                section = key if not value else None
+                if key == "version" and value:
+                    entry[1] = value
+            elif section in YARN_DEPENDENCY_FIELDS and value:
+                entry[2].append((key, value))
+
+    def resolve(name, spec):
+        if spec.startswith("npm:") and "@" not in spec[4:].lstrip("@"):
+            spec = spec[4:]
+        index = descriptors.get(f"{name}@{spec}")
+        if index is None and spec.startswith("workspace:"):
+            index = workspaces.get(name)
+        return index
+
+    packages = {}
+    for index, (name, version, deps) in enumerate(entries):
+        resolved = (resolve(dep, spec) for dep, spec in deps)
+        packages[index] = (name, version, [target for target in resolved if target is not None])
+
+    root_id = workspaces.get(".")
+    if root_id is None:
+        root_id = "root"
+        manifest = os.path.join(os.path.dirname(os.path.abspath(path)), "package.json")
+        if os.path.exists(manifest):
+            with open(manifest, encoding="utf-8") as f:
+                data = json.load(f)
+            deps = {}
+            for field in ("dependencies", "devDependencies", "optionalDependencies"):
+                deps.update(data.get(field) or {})
+            resolved = (resolve(dep, spec) for dep, spec in deps.items())
+            root_deps = [target for target in resolved if target is not None]
+            root_name, root_version = data.get("name"), data.get("version")
+        else:
+            # Без манифеста корнем считаются пакеты, от которых никто не зависит
+            used = {target for _, _, targets in packages.values() for target in targets}
+            root_deps = [index for index in packages if index not in used]
+            root_name = root_version = None
+        packages[root_id] = (root_name or "root", root_version, root_deps)
+    root_package = root_package or packages[root_id][0]
+    return _build_graph(packages, root_id, root_package, graph)
+
+
+# --- pnpm-lock.yaml (v5, v6, v9) ---------------------------------------------
+
+PNPM_IMPORTER_FIELDS = ("dependencies", "devDependencies", "optionalDependencies")
+PNPM_PACKAGE_FIELDS = ("dependencies", "optionalDependencies")
+
+
+def _pnpm_name_version(key, major):
+    base = key.lstrip("/").split("(", 1)[0]
+    if major < 6:
+        name, _, version = base.rpartition("/")
+        return name, version.split("_", 1)[0]
+    at = base.find("@", 1)
+    return base[:at], base[at + 1:]
+
+
+def read_pnpm_lock(path, root_package=None, graph=None):
+    """Граф из pnpm-lock.yaml
+
+    Файл разбирается построчно по отступам: нужны только importers,
+    корневые секции зависимостей, packages и snapshots (v9), а все
+    вложенные поля вроде resolution пропускаются без разбора.
+    """
+    major = 5
+    importers = {}
+    packages_raw = {}
+    snapshots = set()
+    stack = []
+    pending = None  # (список ссылок, имя) для записей вида "имя:\n  version: ..."
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith(("#", "- ")):
+                continue
+            indent = len(line) - len(line.lstrip(" "))
+            key, colon, value = stripped.partition(": ") if ": " in stripped else stripped.partition(":")
+            if not colon:
+                continue
+            key, value = _unquote(key), _unquote(value)
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            keys = [k for _, k in stack] + [key]
+
+            if keys[0] == "lockfileVersion" and value:
+                major = int(float(value.split(".")[0] or 5))
+            elif keys[0] == "importers" and len(keys) == 4 and keys[2] in PNPM_IMPORTER_FIELDS:
+                refs = importers.setdefault(keys[1], [])
+                if value:
+                    refs.append((key, value))
+                else:
+                    pending = (refs, key)
+            elif keys[0] in PNPM_IMPORTER_FIELDS and len(keys) == 2:
+                refs = importers.setdefault(".", [])
+                if value:
+                    refs.append((key, value))
+                else:
+                    pending = (refs, key)
+            elif key == "version" and pending is not None and len(keys) in (3, 5) and value:
+                pending[0].append((pending[1], value))
+                pending = None
+            elif keys[0] in ("packages", "snapshots") and len(keys) == 2:
+                packages_raw.setdefault(key, [])
+                if keys[0] == "snapshots":
+                    snapshots.add(key)
+            elif keys[0] in ("packages", "snapshots") and len(keys) == 4 and keys[2] in PNPM_PACKAGE_FIELDS:
+                if value:
+                    packages_raw[keys[1]].append((key, value))
+
+            if not value:
+                stack.append((indent, key))
+
+    if snapshots:
+        # v9: зависимости лежат в snapshots, а packages - только метаданные
+        packages_raw = {key: refs for key, refs in packages_raw.items() if key in snapshots}
+
+    def resolve(importer, name, ref):
+        if ref.startswith("link:"):
+            target = posixpath.normpath(posixpath.join(importer or ".", ref[len("link:"):]))
+            target = "importer:" + target
+            return target if target in packages else None
+        for candidate in (ref if ref.startswith("/") else None, f"/{name}@{ref}", f"{name}@{ref}",
+                          f"/{name}/{ref}", ref):
+            if candidate in packages_raw:
+                return candidate
+        return None
+
+    packages = {}
+    for key in packages_raw:
+        name, version = _pnpm_name_version(key, major)
+        packages[key] = (sys.intern(name), version, None)
+    importers.setdefault(".", [])
+    for importer in importers:
+        packages["importer:" + importer] = (importer, None, None)
+
+    for key, refs in packages_raw.items():
+        resolved = (resolve(None, name, ref) for name, ref in refs)
+        name, version, _ = packages[key]
+        packages[key] = (name, version, [target for target in resolved if target is not None])
+    for importer, refs in importers.items():
+        resolved = (resolve(importer, name, ref) for name, ref in refs)
+        name, version, _ = packages["importer:" + importer]
+        packages["importer:" + importer] = (name, version, [t for t in resolved if t is not None])
+
+    return _build_graph(packages, "importer:.", root_package or "root", graph)
@@ -0,0 +1,119 @@
+"""Хеши Меркла для узлов графа зависимостей
+
+Хеш узла покрывает всё, что достижимо из него: имя, версию и хеши
+зависимостей (отсортированные, поэтому порядок рёбер не важен). Циклы
+обрабатываются через конденсацию: компонента сильной связности хешируется
+целиком (имена и версии участников, внутренние рёбра, хеши внешних
+зависимостей), а хеш её узла - это хеш компоненты плюс имя узла.
+Компоненты обходятся в порядке нумерации Тарьяна, то есть зависимости
+всегда хешируются раньше зависящих от них пакетов.
+
+Равенство хешей двух узлов означает равенство достижимых из них подграфов,
+поэтому сравнение графов может пропускать такие поддеревья целиком.
+Хеши - BLAKE2b по 16 байт, стабильные между запусками и платформами, и их
+можно хранить (см. snapshot).
+"""
+
+from array import array
+from collections.abc import Sequence
+from hashlib import blake2b
+
+try:
+    from . import profiling
+    from .load_order import strongly_connected_components
+except ImportError:
+    import profiling
+    from load_order import strongly_connected_components
+
+
+DIGEST_SIZE = 16
+
+
+class HashColumn(Sequence):
+    """Хеши узлов поверх непрерывного буфера по DIGEST_SIZE байт"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def __len__(self):
+        return len(self._buffer) // DIGEST_SIZE
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start = i * DIGEST_SIZE
+        return bytes(self._buffer[start:start + DIGEST_SIZE])
+
+
+def _label(name, versions):
+    # Имена и версии не содержат нулевых байтов, поэтому разбор однозначен
+    version = versions.get(name)
+    return f"{name}\0{version or ''}\0".encode("utf-8")
+
+
+@profiling.profiled("merkle.hash")
+def compute_hashes(csr, versions=None):
+    """Список хешей узлов CSR (индекс - номер узла)"""
+    versions = versions or {}
+    node_count = csr.node_count
+    names, offsets, targets = csr.names, csr.offsets, csr.targets
+    component, count = strongly_connected_components(csr)
+
+    # Узлы, сгруппированные по компонентам (сортировка подсчётом)
+    starts = array('q', bytes(8 * (count + 1)))
+    for node_component in component:
+        starts[node_component + 1] += 1
+    for i in range(count):
+        starts[i + 1] += starts[i]
+    cursor = array('q', starts)
+    members = array('i', bytes(4 * node_count))
+    for node in range(node_count):
+        node_component = component[node]
+        members[cursor[node_component]] = node
+        cursor[node_component] += 1
+
+    hashes = [None] * node_count
+    for node_component in range(count):
+        start, end = starts[node_component], starts[node_component + 1]
+        if end - start == 1:
+            node = members[start]
+            children = targets[offsets[node]:offsets[node + 1]]
+            if node not in children:
+                data = b"\0" + _label(names[node], versions) + b"".join(sorted([hashes[t] for t in children]))
+                hashes[node] = blake2b(data, digest_size=DIGEST_SIZE).digest()
+                continue
+
+        group = members[start:end]
+        labels = {node: _label(names[node], versions) for node in group}
+        internal = []
+        external = []
+        for node in group:
+            for target in targets[offsets[node]:offsets[node + 1]]:
+                if target in labels:
+                    internal.append(labels[node] + labels[target])
+                else:
+                    external.append(hashes[target])
+        data = b"\1" + b"".join(sorted(labels.values())) + b"\1" + b"".join(sorted(internal)) + \
+            b"\1" + b"".join(sorted(external))
+        digest = blake2b(data, digest_size=DIGEST_SIZE).digest()
+        for node in group:
+            hashes[node] = blake2b(b"\2" + digest + labels[node], digest_size=DIGEST_SIZE).digest()
+    return hashes
+
+
+def node_hashes(graph):
+    """(csr, хеши узлов) графа; берутся из снимка или кэша графа, если есть"""
+    csr = graph.to_csr()
+    snapshot = getattr(graph, "snapshot", None)
+    if snapshot is not None and snapshot.merkle is not None and snapshot.csr is csr:
+        return csr, snapshot.merkle
+    cached = getattr(graph, "_merkle", None)
+    if cached is not None and cached[0] is csr:
+        return cached
+    hashes = compute_hashes(csr, getattr(graph, "versions", None))
+    if getattr(graph, "compact", False):
+        # CSR компактного графа неизменяем, пока граф не изменят - тогда он пересоздаётся
+        graph._merkle = (csr, hashes)
+    return csr, hashes
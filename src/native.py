@@ -0,0 +1,316 @@
+"""Сравнение нашего графа с выводом штатных инструментов (npm ls, pnpm ls)
+
+Дамп `npm ls --all --json` (или `pnpm ls --json --depth Infinity`) - это
+вложенное дерево: каждый пакет перечисляет свои зависимости, повторные
+вхождения обычно сокращены до одной версии. Дамп читается потоково и
+итеративно (глубина вложенности не ограничена стеком Python); пакеты
+склеиваются по паре (имя, версия), а зависимости повторных вхождений
+объединяются. Граф собирается тем же обходом в ширину, что и lock-файлы.
+
+Для сравнения оба графа отображаются в общее пространство целых
+идентификаторов (имя, версия), после чего узлы сравниваются по битовым
+маскам, а рёбра - как множества чисел; всё сравнение линейно по размеру
+графов.
+"""
+
+import json
+import sys
+
+try:
+    from . import profiling
+    from .errors import ConfigError, InvalidPackageNameError, InvalidURLError
+    from .lockfiles import _build_graph, _skip
+    from .packument import _StreamReader
+except ImportError:
+    import profiling
+    from errors import ConfigError, InvalidPackageNameError, InvalidURLError
+    from lockfiles import _build_graph, _skip
+    from packument import _StreamReader
+
+
+# npm ls кладёт всё в "dependencies", pnpm ls разделяет по типам
+NATIVE_DEPENDENCY_FIELDS = ("dependencies", "devDependencies", "optionalDependencies")
+
+
+class _Entry:
+    __slots__ = ("name", "version", "deps", "members", "children", "missing")
+
+    def __init__(self, name, members):
+        self.name = name
+        self.version = None
+        self.deps = {}
+        self.members = members
+        self.children = None
+        self.missing = False
+
+
+@profiling.profiled("native.read")
+def read_npm_ls(path, root_package=None, graph=None, problems=None):
+    """Граф из сохранённого вывода `npm ls --all --json` или `pnpm ls --json`
+
+    problems - необязательный список, куда попадают неразрешённые
+    зависимости из дампа ("имя" без установленной версии).
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        raise InvalidURLError(f"Вывод штатного инструмента не найден: {path}")
+    packages = {}
+    root_id = None
+    with f:
+        reader = _StreamReader(f)
+        if reader.peek() == "[":
+            # pnpm ls выводит массив проектов; сравниваем первый
+            reader.expect("[")
+            if reader.peek() == "]":
+                raise ConfigError(f"В выводе {path} нет ни одного проекта")
+        root = _Entry(None, reader.members())
+        stack = [root]
+        while stack:
+            entry = stack[-1]
+            if entry.children is not None:
+                name = next(entry.children, None)
+                if name is None:
+                    entry.children = None
+                else:
+                    stack.append(_Entry(sys.intern(name), reader.members()))
+                continue
+
+            key = next(entry.members, None)
+            if key is None:
+                stack.pop()
+                if not stack and entry.name is None:
+                    entry.name = "root"
+                package_id = _package_id(packages, entry)
+                if package_id is None:
+                    if problems is not None:
+                        problems.append(entry.name)
+                elif stack:
+                    stack[-1].deps[package_id] = None
+                else:
+                    root_id = package_id
+            elif key == "name" and entry.name is None:
+                entry.name = reader.value()
+            elif key == "version":
+                entry.version = reader.value()
+            elif key == "missing":
+                entry.missing = reader.value() is True
+            elif key in NATIVE_DEPENDENCY_FIELDS and reader.peek() == "{":
+                entry.children = reader.members()
+            else:
+                _skip(reader)
+
+    if root_id is None:
+        raise ConfigError(f"В выводе {path} нет корневого пакета")
+    root_package = root_package or packages[root_id][0]
+    return _build_graph({package_id: (name, version, list(deps))
+                         for package_id, (name, version, deps) in packages.items()},
+                        root_id, root_package, graph)
+
+
+def _package_id(packages, entry):
+    """Идентификатор "имя@версия"; зависимости повторных вхождений объединяются"""
+    if entry.missing:
+        return None
+    package_id = f"{entry.name}@{entry.version}" if entry.version else entry.name
+    known = packages.get(package_id)
+    if known is None:
+        packages[package_id] = (entry.name, entry.version, entry.deps)
+    else:
+        known[2].update(entry.deps)
+    return package_id
+
+
+def package_name(key, version):
+    """Имя пакета по ключу графа: "имя@версия" дополнительных версий -> "имя" """
+    if version and key.endswith("@" + version) and len(key) > len(version) + 1:
+        return key[:-len(version) - 1]
+    return key
+
+
+def _label(identity):
+    name, version = identity
+    return f"{name}@{version}" if version else name
+
+
+class NativeComparison:
+    """Расхождения нашего графа (ours) с графом штатного инструмента (native)
+
+    Пакет - пара (имя, версия); версии сравниваются, только если они есть в
+    обоих графах (тестовые графы версий не содержат). Пакет, который есть
+    только с одной стороны, но под другой версией, попадает в
+    version_differences, а не в missing_*. Рёбра сравниваются только между
+    пакетами, присутствующими в обоих графах: рёбра отсутствующих пакетов
+    уже учтены через сами пакеты.
+    """
+
+    def __init__(self, package, compare_versions):
+        self.package = package
+        self.compare_versions = compare_versions
+        self.our_packages = 0
+        self.native_packages = 0
+        self.our_edges = 0
+        self.native_edges = 0
+        self.missing_in_native = []
+        self.missing_in_our = []
+        self.version_differences = []
+        self.edges_missing_in_native = []
+        self.edges_missing_in_our = []
+        self.problems = []
+
+    @property
+    def identical(self):
+        return not (self.missing_in_native or self.missing_in_our or self.version_differences or
+                    self.edges_missing_in_native or self.edges_missing_in_our)
+
+    def to_dict(self):
+        return {
+            "package": self.package,
+            "identical": self.identical,
+            "compare_versions": self.compare_versions,
+            "ours": {"packages": self.our_packages, "edges": self.our_edges},
+            "native": {"packages": self.native_packages, "edges": self.native_edges},
+            "differences": {
+                "missing_in_native": self.missing_in_native,
+                "missing_in_our": self.missing_in_our,
+                "version_differences": self.version_differences,
+                "edges_missing_in_native": [list(edge) for edge in self.edges_missing_in_native],
+                "edges_missing_in_our": [list(edge) for edge in self.edges_missing_in_our],
+            },
+            "problems": self.problems,
+        }
+
+
+def _reachable(csr, root):
+    """Узлы, достижимые из root, в порядке обхода в ширину"""
+    seen = bytearray(csr.node_count)
+    seen[root] = 1
+    order = [root]
+    offsets, targets = csr.offsets, csr.targets
+    for node in order:
+        for target in targets[offsets[node]:offsets[node + 1]]:
+            if not seen[target]:
+                seen[target] = 1
+                order.append(target)
+    return order
+
+
+def _has_versions(graph):
+    return any((getattr(graph, "versions", None) or {}).values())
+
+
+@profiling.profiled("native.compare")
+def compare_graphs(ours, native, package, native_root=None):
+    """Сравнивает транзитивные зависимости package в ours с native
+
+    native_root - корень в native (по умолчанию первый узел: так строят
+    граф все читатели); корни сопоставляются друг с другом, даже если
+    имена проекта и пакета различаются.
+    """
+    our_csr, native_csr = ours.to_csr(), native.to_csr()
+    our_root = our_csr.ids.get(package)
+    if our_root is None:
+        raise InvalidPackageNameError(f"Пакет {package} не найден в графе")
+    if native_root is None:
+        if not native_csr.node_count:
+            raise ConfigError("Граф штатного инструмента пуст")
+        native_root = 0
+    else:
+        native_root = native_csr.ids.get(native_root)
+        if native_root is None:
+            raise InvalidPackageNameError(f"Пакет {package} не найден в выводе штатного инструмента")
+
+    compare_versions = _has_versions(ours) and _has_versions(native)
+    result = NativeComparison(package, compare_versions)
+
+    # Общее пространство идентификаторов: 0 - корень обоих графов
+    our_versions = getattr(ours, "versions", None) or {}
+    root_identity = (package_name(package, our_versions.get(package)),
+                     our_versions.get(package) if compare_versions else None)
+    identities = [root_identity]
+    shared = {root_identity: 0}
+
+    def align(csr, versions, root):
+        nodes = _reachable(csr, root)
+        mapping = {root: 0}
+        names = csr.names
+        for node in nodes[1:]:
+            version = versions.get(names[node])
+            identity = (package_name(names[node], version), version if compare_versions else None)
+            shared_id = shared.get(identity)
+            if shared_id is None:
+                shared_id = shared[identity] = len(identities)
+                identities.append(identity)
+            mapping[node] = shared_id
+        return nodes, mapping
+
+    our_nodes, our_map = align(our_csr, our_versions, our_root)
+    native_nodes, native_map = align(native_csr, getattr(native, "versions", None) or {}, native_root)
+
+    size = len(identities)
+    in_ours, in_native = bytearray(size), bytearray(size)
+    for shared_id in our_map.values():
+        in_ours[shared_id] = 1
+    for shared_id in native_map.values():
+        in_native[shared_id] = 1
+    result.our_packages, result.native_packages = sum(in_ours), sum(in_native)
+
+    def edge_set(csr, nodes, mapping):
+        offsets, targets = csr.offsets, csr.targets
+        edges = set()
+        for node in nodes:
+            source = mapping[node] * size
+            edges.update(source + mapping[target] for target in targets[offsets[node]:offsets[node + 1]])
+        return edges
+
+    our_edges = edge_set(our_csr, our_nodes, our_map)
+    native_edges = edge_set(native_csr, native_nodes, native_map)
+    result.our_edges, result.native_edges = len(our_edges), len(native_edges)
+
+    # Пакеты: отсутствующие целиком и отличающиеся версией
+    only_ours = [i for i in range(size) if in_ours[i] and not in_native[i]]
+    only_native = [i for i in range(size) if in_native[i] and not in_ours[i]]
+    our_names = {identities[i][0] for i in range(size) if in_ours[i]}
+    native_names = {identities[i][0] for i in range(size) if in_native[i]}
+    # Узел без версии (например, не разрешённый обходчиком) отличается
+    # версией, но в списке версий его нет
+    versions = {}
+    for i in only_ours:
+        name, version = identities[i]
+        if name in native_names:
+            listed = versions.setdefault(name, ([], []))[0]
+            if version is not None:
+                listed.append(version)
+        else:
+            result.missing_in_native.append(_label(identities[i]))
+    for i in only_native:
+        name, version = identities[i]
+        if name in our_names:
+            listed = versions.setdefault(name, ([], []))[1]
+            if version is not None:
+                listed.append(version)
+        else:
+            result.missing_in_our.append(_label(identities[i]))
+    for name, (our_only, native_only) in sorted(versions.items()):
+        result.version_differences.append({"name": name, "ours": sorted(our_only), "native": sorted(native_only)})
+    result.missing_in_native.sort()
+    result.missing_in_our.sort()
+
+    def edge_labels(edges):
+        pairs = []
+        for edge in edges:
+            source, target = divmod(edge, size)
+            if in_ours[source] and in_native[source] and in_ours[target] and in_native[target]:
+                pairs.append((_label(identities[source]), _label(identities[target])))
+        return sorted(pairs)
+
+    result.edges_missing_in_native = edge_labels(our_edges - native_edges)
+    result.edges_missing_in_our = edge_labels(native_edges - our_edges)
+    return result
+
+
+def write_report(comparison, path):
+    """Сохраняет отчёт о расхождениях в JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(comparison.to_dict(), f, ensure_ascii=False, indent=2)
+        f.write("\n")
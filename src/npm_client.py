@@ -1,50 +1,208 @@
 import json
-import urllib.request
-import ssl
-from urllib.error import URLError, HTTPError
-from errors import *
+import http.client
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote, urlsplit
+
+try:
+    from . import profiling
+    from .errors import *
+    from .dependency_graph import DependencyGraph
+    from .http_pool import ConnectionPool
+    from .packument import scan_packument, scan_dependencies
+    from .scheduler import RequestScheduler, SingleFlight
+    from .semver import VersionIndex, compile_range
+except ImportError:
+    import profiling
+    from errors import *
+    from dependency_graph import DependencyGraph
+    from http_pool import ConnectionPool
+    from packument import scan_packument, scan_dependencies
+    from scheduler import RequestScheduler, SingleFlight
+    from semver import VersionIndex, compile_range
+
+
+# Сокращённые метаданные для установки: только поля, нужные для разрешения
+# зависимостей, - в разы меньше полного пакумента
+ABBREVIATED_ACCEPT = "application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8, */*"
 
 
 class NPMClient:
-    def __init__(self):
-        self.base_url = "https://registry.npmjs.org"
+    def __init__(self, base_url="https://registry.npmjs.org", max_workers=16, pool=None, cache=None,
+                 abbreviated=True, resolved=None, scheduler=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.pool = pool or ConnectionPool(max_per_host=max_workers)
+        # Адаптивный параллелизм, повторы и предохранитель по хостам
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=max_workers)
+        self.cache = cache
+        self.abbreviated = abbreviated
+        # Общий словарь {(имя, диапазон): (версия, зависимости)}; может быть
+        # прокси multiprocessing.Manager, разделяемым несколькими процессами
+        self.resolved = resolved
+        self.verbose = True
+        self.failed = {}
+        self._flights = SingleFlight()
+        self._indexes = {}
+        self._inflight_lock = threading.Lock()
+
+    def package_url(self, package_name):
+        """URL пакумента; '/' в scoped-пакетах (@scope/name) кодируется"""
+        return f"{self.base_url}/{quote(package_name, safe='@')}"
 
     def get_package_info(self, package_name):
         """Получает информацию о пакете из npm реестра"""
-        try:
-            url = f"{self.base_url}/{package_name}"
-            print(f"Запрос к npm: {url}")
+        return self._fetch(package_name, "*", json.load)
 
-            context = ssl._create_unverified_context()
+    def get_version_info(self, package_name, version="latest"):
+        """Возвращает (версия, манифест версии), потоково разбирая пакумент"""
+        def choose(candidate, dist_tags):
+            return candidate == dist_tags.get(version, version)
 
-            with urllib.request.urlopen(url, context=context) as response:
-                data = json.loads(response.read().decode())
-                return data
+        package_info = self._fetch(package_name, version, lambda body: scan_packument(body, choose))
+        return self._select_version(package_name, package_info, version)
 
-        except HTTPError as e:
-            if e.code == 404:
-                raise InvalidPackageNameError(f"Пакет '{package_name}' не найден в npm реестре")
-            else:
-                raise InvalidURLError(f"Ошибка HTTP {e.code}: {e.reason}")
-        except URLError as e:
-            raise InvalidURLError(f"Ошибка подключения: {e.reason}")
-        except Exception as e:
+    def _fetch(self, package_name, selector, parse):
+        """Загружает пакумент с учётом кэша; selector различает выборки одного документа
+
+        Одновременные запросы одного документа выполняются один раз.
+        """
+        url = self.package_url(package_name)
+        cache_key = f"{url}#{'install-v1' if self.abbreviated else 'full'}/{selector}"
+        return self._single_flight(("fetch", cache_key), lambda: self._load(package_name, url, cache_key, parse))
+
+    def _load(self, package_name, url, cache_key, parse):
+        headers = {
+            "Accept": ABBREVIATED_ACCEPT if self.abbreviated else "application/json",
+            "Accept-Encoding": "gzip",
+        }
+
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                self.cache.count("hits")
+                return entry.data
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        if self.verbose:
+            print(f"Запрос к npm: {url}")
+        profiling.count("registry.requests")
+
+        def attempt():
+            with self.pool.stream("GET", url, headers=headers) as response:
+                if response.status == 304 and entry is not None:
+                    return response._replace(body=None)
+                # Тело ответа с ошибкой не разбираем, но и не прерываем чтение
+                # внутри блока, чтобы соединение вернулось в пул
+                data = None
+                if response.status < 400:
+                    with profiling.phase("registry.parse"):
+                        data = parse(profiling.CountingReader(response.body, "registry.bytes"))
+                return response._replace(body=data)
+
+        try:
+            response = self.scheduler.call(urlsplit(url).netloc, attempt)
+        except (OSError, http.client.HTTPException) as e:
+            raise InvalidURLError(f"Ошибка подключения: {e}")
+        except ValueError as e:
             raise ConfigError(f"Ошибка при получении данных: {e}")
 
-    def get_dependencies(self, package_name, version="latest"):
-        """Получает прямые зависимости пакета"""
-        package_info = self.get_package_info(package_name)
+        if response.status == 304 and entry is not None:
+            self.cache.count("revalidated")
+            return self.cache.refresh(entry).data
+        if self.cache:
+            self.cache.count("misses")
+        data = response.body
+        if response.status >= 400:
+            profiling.count("registry.errors")
+        if response.status == 404:
+            raise InvalidPackageNameError(f"Пакет '{package_name}' не найден в npm реестре")
+        if response.status >= 400:
+            raise InvalidURLError(f"Ошибка HTTP {response.status}: {response.reason}")
+
+        if self.cache:
+            self.cache.put(cache_key, data, response.headers.get("etag"), response.headers.get("last-modified"))
+        return data
 
+    def _select_version(self, package_name, package_info, version):
         if version == "latest":
             version = package_info.get("dist-tags", {}).get("latest", "latest")
 
         version_info = package_info.get("versions", {}).get(version)
         if not version_info:
             raise ConfigError(f"Версия '{version}' не найдена для пакета '{package_name}'")
+        return version, version_info
+
+    def get_dependencies(self, package_name, version="latest"):
+        """Получает прямые зависимости пакета (version - версия, тег или диапазон)"""
+        document, _ = self.get_versions(package_name)
+        return document["versions"][self.resolve_version(package_name, version)]
+
+    def get_versions(self, package_name):
+        """Возвращает (сводка {версия: зависимости}, VersionIndex); индекс строится один раз"""
+        with self._inflight_lock:
+            known = self._indexes.get(package_name)
+        if known is not None:
+            return known
 
-        dependencies = version_info.get("dependencies", {})
+        def load():
+            document = self._fetch(package_name, "dependencies", scan_dependencies)
+            known = (document, VersionIndex(document["versions"]))
+            with self._inflight_lock:
+                self._indexes[package_name] = known
+            return known
 
-        return dependencies
+        return self._single_flight(package_name, load)
+
+    def resolve_version(self, package_name, spec="latest"):
+        """Разрешает тег или диапазон semver в конкретную версию"""
+        document, index = self.get_versions(package_name)
+        dist_tags = document["dist-tags"]
+        if spec in dist_tags:
+            return dist_tags[spec]
+
+        compiled = compile_range(spec)
+        if compiled is None:
+            raise ConfigError(f"Не удалось разобрать диапазон '{spec}' для пакета '{package_name}'")
+        # Как и npm, предпочитаем версию с тегом latest, если она подходит
+        latest = dist_tags.get("latest")
+        if latest in document["versions"] and compiled.test(latest):
+            return latest
+        version = compiled.max_satisfying(index)
+        if version is None:
+            raise ConfigError(f"Нет версии пакета '{package_name}', подходящей под '{spec}'")
+        return version
+
+    def fetch_node(self, package_name, spec="latest"):
+        """Возвращает (версия, зависимости) для пакета и диапазона из манифеста"""
+        if self.resolved is None:
+            return self._fetch_node(package_name, spec)
+        node = self.resolved.get((package_name, spec))
+        if node is None:
+            profiling.count("resolved.misses")
+            node = self.resolved[(package_name, spec)] = self._fetch_node(package_name, spec)
+        else:
+            profiling.count("resolved.hits")
+        return node
+
+    def _fetch_node(self, package_name, spec):
+        if spec.startswith("npm:"):
+            # Псевдоним "npm:настоящее-имя@диапазон"
+            target = spec[4:]
+            at = target.rfind("@")
+            package_name, spec = (target[:at], target[at + 1:]) if at > 0 else (target, "latest")
+
+        document, _ = self.get_versions(package_name)
+        version = self.resolve_version(package_name, spec)
+        return version, document["versions"][version]
+
+    def _single_flight(self, key, load):
+        """Одновременные вызовы с одним ключом выполняют load один раз"""
+        return self._flights.do(key, load)
 
     def get_dependencies_test_mode(self, package_name, repo_path):
         """Получает зависимости в тестовом режиме (из файла)"""
@@ -69,12 +227,87 @@ class NPMClient:
         except Exception as e:
             raise ConfigError(f"Ошибка чтения тестового файла: {e}")
 
-    def get_dependencies_recursive(self, package_name, test_mode=False, repo_path=None):
-        """Рекурсивно получает зависимости (основной метод для графа)"""
+    def get_dependencies_recursive(self, package_name, test_mode=False, repo_path=None, graph=None,
+                                   spec="latest"):
+        """Строит полный транзитивный граф зависимостей пакета (обход в ширину)
+
+        Каждое ребро разрешается в конкретную версию. Узел называется именем
+        пакета; если в графе встречаются другие версии того же пакета, они
+        становятся отдельными узлами "имя@версия" (как вложенные node_modules).
+        """
+        if graph is None:
+            graph = DependencyGraph()
+
         if test_mode:
-            return self.get_dependencies_test_mode(package_name, repo_path)
+            complete_graph = self.get_complete_test_graph(repo_path)
+
+            def lookup(name, _):
+                return "1.0.0", complete_graph.get(name, {})
         else:
-            return self.get_dependencies(package_name)
+            with profiling.phase("registry.crawl"):
+                resolved = self._crawl(package_name, spec)
+
+            def lookup(name, dep_spec):
+                return resolved.get((name, dep_spec), (None, {}))
+
+        # Граф собираем последовательно в порядке BFS, чтобы результат
+        # не зависел от порядка завершения параллельных запросов
+        primary = {}
+
+        def node_key(name, version):
+            # Неразрешённая зависимость (версия None) не занимает имя:
+            # оно остаётся за первой найденной версией пакета
+            if version is None:
+                return name
+            primary.setdefault(name, version)
+            return name if primary[name] == version else f"{name}@{version}"
+
+        queue = deque([(package_name, spec)])
+        expanded = set()
+        with profiling.phase("graph.build"):
+            while queue:
+                name, dep_spec = queue.popleft()
+                version, deps = lookup(name, dep_spec)
+                key = node_key(name, version)
+                if key in expanded:
+                    continue
+                graph.add_package(key, version)
+                if version is None:
+                    continue
+                expanded.add(key)
+                for dep, child_spec in deps.items():
+                    graph.add_dependency(key, node_key(dep, lookup(dep, child_spec)[0]))
+                    queue.append((dep, child_spec))
+        return graph
+
+    def _crawl(self, root, spec="latest"):
+        """Параллельно загружает и разрешает всё замыкание зависимостей root
+
+        Возвращает {(имя, диапазон): (версия, зависимости)}.
+        """
+        results = {}
+        self.failed = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self.fetch_node, root, spec): (root, spec)}
+            scheduled = {(root, spec)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        results[item] = future.result()
+                    except ConfigError as e:
+                        if item == (root, spec):
+                            raise
+                        print(f"Пропускаем {item[0]}@{item[1]}: {e}")
+                        self.failed[item[0]] = str(e)
+                        continue
+
+                    for dep in results[item][1].items():
+                        if dep not in scheduled:
+                            scheduled.add(dep)
+                            pending[executor.submit(self.fetch_node, *dep)] = dep
+        return results
 
     def get_complete_test_graph(self, repo_path):
         """Возвращает полный граф зависимостей из тестового файла"""
@@ -91,4 +324,7 @@ class NPMClient:
             return complete_graph
 
         except Exception as e:
-            raise ConfigError(f"Ошибка чтения тестового файла: {e}")
\ No newline at end of file
+            raise ConfigError(f"Ошибка чтения тестового файла: {e}")
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,158 @@
+import codecs
+import json
+import re
+
+try:
+    from .errors import ConfigError
+except ImportError:
+    from errors import ConfigError
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class _StreamReader:
+    """Буфер поверх потока байт; хранит только ещё не разобранный хвост"""
+
+    def __init__(self, stream, chunk_size=64 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=0):
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        data = self.stream.read(max(self.chunk_size, size))
+        if not data:
+            self.eof = True
+            self.buf += self.decoder.decode(b"", final=True)
+            return False
+        self.buf += self.decoder.decode(data)
+        return True
+
+    def peek(self):
+        """Пропускает пробелы и возвращает следующий значащий символ"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ConfigError("Неожиданный конец JSON документа")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ConfigError(f"Ошибка формата JSON: ожидался '{char}', получен '{found}'")
+        self.pos += 1
+
+    def value(self, raw=False):
+        """Разбирает одно JSON-значение; при нехватке данных удваивает буфер"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # Число на границе буфера может быть обрезано - дочитываем
+                if end < len(self.buf) or self.eof:
+                    text = self.buf[self.pos:end] if raw else None
+                    self.pos = end
+                    return text if raw else value
+            except ValueError:
+                if self.eof:
+                    raise ConfigError("Ошибка формата JSON в пакументе")
+            self.fill(len(self.buf) - self.pos)
+
+    def members(self):
+        """Итерирует ключи объекта; значение каждого ключа читает вызывающий"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ConfigError(f"Ошибка формата JSON: неожиданный символ '{separator}'")
+
+
+def scan_packument(stream, choose):
+    """Потоково извлекает из пакумента name, dist-tags и одну выбранную версию
+
+    choose(version, dist_tags) решает, нужна ли версия; из нескольких
+    подходящих остаётся последняя. Остальные версии, readme, time и прочие
+    поля разбираются по одному значению и сразу отбрасываются, поэтому
+    пиковая память ограничена размером самого крупного значения, а не
+    всего документа. Чтение прекращается, как только versions и dist-tags
+    прочитаны.
+    """
+    reader = _StreamReader(stream)
+    result = {"name": None, "dist-tags": None, "versions": {}}
+    deferred = None
+
+    for key in reader.members():
+        if key == "name":
+            result["name"] = reader.value()
+        elif key == "dist-tags":
+            result["dist-tags"] = reader.value()
+        elif key == "versions":
+            deferred = {}
+            for version in reader.members():
+                tags = result["dist-tags"]
+                if tags is None:
+                    # dist-tags идут после versions: откладываем решение,
+                    # сохраняя текст записей без разбора
+                    deferred[version] = reader.value(raw=True)
+                elif choose(version, tags):
+                    result["versions"] = {version: reader.value()}
+                else:
+                    reader.value()
+        else:
+            reader.value()
+
+        if deferred is not None and result["dist-tags"] is not None:
+            break
+
+    tags = result["dist-tags"] or {}
+    for version, text in (deferred or {}).items():
+        if choose(version, tags):
+            result["versions"] = {version: json.loads(text)}
+    result["dist-tags"] = tags
+    return result
+
+
+def scan_dependencies(stream):
+    """Потоково сводит пакумент к {версия: dependencies} для разрешения диапазонов
+
+    От каждой версии остаётся только словарь зависимостей, поэтому
+    результат на порядки меньше документа и дёшево хранится в кэше.
+    """
+    reader = _StreamReader(stream)
+    result = {"name": None, "dist-tags": {}, "versions": {}}
+    remaining = {"dist-tags", "versions"}
+    for key in reader.members():
+        if key == "name":
+            result["name"] = reader.value()
+        elif key == "dist-tags":
+            result["dist-tags"] = reader.value()
+        elif key == "versions":
+            versions = result["versions"]
+            for version in reader.members():
+                versions[version] = reader.value().get("dependencies") or {}
+        else:
+            reader.value()
+
+        remaining.discard(key)
+        if not remaining:
+            break
+    return result
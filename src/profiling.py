@@ -0,0 +1,274 @@
+"""Профилирование по фазам: время, счётчики, кэш и память
+
+Код размечает фазы (phase) и считает события (count) через функции
+модуля. Пока профилировщик не активирован, это почти бесплатные
+заглушки; внутри `with activate(Profiler())` те же вызовы накапливают:
+
+    фазы      число вызовов, суммарное время и процессорное время потока
+              (вложенные фазы учитываются и в родительской; фазы из разных
+              потоков складываются, поэтому время фазы может превышать
+              общее время работы)
+    счётчики  запросы, байты, исходы обращений к кэшу и т.п.
+    память    пиковый RSS процесса и, по желанию, крупнейшие места
+              аллокаций по tracemalloc
+
+Отчёт сохраняется в JSON или в текстовый формат Prometheus (для сбора
+node_exporter textfile collector).
+"""
+
+import contextlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+FORMATS = ("json", "prometheus")
+METRIC_PREFIX = "depviz"
+
+_active = None
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class Profiler:
+    def __init__(self, trace_memory=False, top_allocators=10):
+        self.trace_memory = trace_memory
+        self.top_allocators = top_allocators
+        self.phases = {}
+        self.counters = {}
+        self.allocators = []
+        self.traced_peak = None
+        self.started = self.finished = None
+        self._started_wall = self._started_cpu = self._cpu = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.time()
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.process_time()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return self
+
+    def stop(self):
+        self.finished = time.perf_counter() - self._started_wall
+        self._cpu = time.process_time() - self._started_cpu
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.traced_peak = tracemalloc.get_traced_memory()[1]
+            statistics = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ]).statistics("lineno")
+            tracemalloc.stop()
+            self.allocators = [{
+                "file": stat.traceback[0].filename,
+                "line": stat.traceback[0].lineno,
+                "size_bytes": stat.size,
+                "count": stat.count,
+            } for stat in statistics[:self.top_allocators]]
+        return self
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started, started_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            elapsed, cpu = time.perf_counter() - started, time.thread_time() - started_cpu
+            with self._lock:
+                record = self.phases.get(name)
+                if record is None:
+                    record = self.phases[name] = [0, 0.0, 0.0]
+                record[0] += 1
+                record[1] += elapsed
+                record[2] += cpu
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def cache_hit_ratios(self):
+        """{кэш: доля попаданий} по счётчикам "<кэш>.hits" и "<кэш>.misses"
+
+        Ответ 304 ("<кэш>.revalidated") считается обращением, но не
+        попаданием: тело не скачивалось, но запрос к реестру был.
+        """
+        ratios = {}
+        for name, hits in self.counters.items():
+            if name.endswith(".hits"):
+                cache = name[:-len(".hits")]
+                total = hits + self.counters.get(f"{cache}.misses", 0) + \
+                    self.counters.get(f"{cache}.revalidated", 0)
+                ratios[cache] = hits / total if total else 0.0
+        for name in self.counters:
+            if name.endswith(".misses"):
+                ratios.setdefault(name[:-len(".misses")], 0.0)
+        return ratios
+
+    def report(self):
+        """Отчёт в виде словаря, пригодного для json.dump"""
+        wall = self.finished if self.finished is not None else time.perf_counter() - self._started_wall
+        cpu = self._cpu if self._cpu is not None else time.process_time() - self._started_cpu
+        with self._lock:
+            phases = {name: {"calls": calls, "wall_seconds": round(elapsed, 6), "cpu_seconds": round(used, 6)}
+                      for name, (calls, elapsed, used) in sorted(self.phases.items())}
+            counters = dict(sorted(self.counters.items()))
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "peak_rss_bytes": peak_rss(),
+            "phases": phases,
+            "counters": counters,
+            "cache_hit_ratio": {name: round(ratio, 6) for name, ratio in sorted(self.cache_hit_ratios().items())},
+            "tracemalloc_peak_bytes": self.traced_peak,
+            "top_allocators": self.allocators,
+        }
+
+    def write(self, path, fmt=None, labels=None):
+        """Сохраняет отчёт атомарно; формат по умолчанию - по расширению (.prom - Prometheus)"""
+        fmt = fmt or ("prometheus" if path.endswith(".prom") else "json")
+        if fmt == "json":
+            report = self.report()
+            if labels:
+                report["labels"] = dict(labels)
+            text = json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+        elif fmt == "prometheus":
+            text = to_prometheus(self.report(), labels)
+        else:
+            raise ValueError(f"Неизвестный формат профиля: {fmt} (доступны: {', '.join(FORMATS)})")
+
+        # textfile collector может прочитать файл в любой момент - пишем рядом и заменяем
+        temp_path = f"{path}.tmp{os.getpid()}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        return path
+
+
+def peak_rss():
+    """Пиковый RSS процесса в байтах или None, если платформа его не сообщает"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux сообщает килобайты, macOS - байты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def to_prometheus(report, labels=None):
+    """Отчёт в текстовом формате экспозиции Prometheus"""
+    labels = {key: value for key, value in (labels or {}).items() if value is not None}
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for extra, value in samples:
+            pairs = {**labels, **extra}
+            rendered = ",".join(f'{_metric_name(key)}="{_label_value(val)}"' for key, val in pairs.items())
+            lines.append(f"{full_name}{{{rendered}}} {value}" if rendered else f"{full_name} {value}")
+
+    metric("run_wall_seconds", "gauge", "Wall time of the run", [({}, report["wall_seconds"])])
+    metric("run_cpu_seconds", "gauge", "Process CPU time of the run", [({}, report["cpu_seconds"])])
+    if report["peak_rss_bytes"] is not None:
+        metric("peak_rss_bytes", "gauge", "Peak resident set size", [({}, report["peak_rss_bytes"])])
+    if report["tracemalloc_peak_bytes"] is not None:
+        metric("tracemalloc_peak_bytes", "gauge", "Peak traced Python allocations",
+               [({}, report["tracemalloc_peak_bytes"])])
+
+    phases = report["phases"]
+    for key, name, help_text in (("calls", "phase_calls_total", "Number of times a phase ran"),
+                                 ("wall_seconds", "phase_wall_seconds_total", "Wall time spent in a phase"),
+                                 ("cpu_seconds", "phase_cpu_seconds_total", "Thread CPU time spent in a phase")):
+        if phases:
+            metric(name, "counter", help_text, [({"phase": phase}, record[key]) for phase, record in phases.items()])
+
+    for counter, value in report["counters"].items():
+        metric(f"{_metric_name(counter)}_total", "counter", f"Count of {counter}", [({}, value)])
+    if report["cache_hit_ratio"]:
+        metric("cache_hit_ratio", "gauge", "Cache hits per lookup",
+               [({"cache": cache}, ratio) for cache, ratio in report["cache_hit_ratio"].items()])
+    if report["top_allocators"]:
+        metric("allocator_bytes", "gauge", "Largest live allocations by source line at the end of the run",
+               [({"location": f"{entry['file']}:{entry['line']}"}, entry["size_bytes"])
+                for entry in report["top_allocators"]])
+    return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def activate(profiler):
+    """Активирует profiler для phase/count всего процесса на время блока"""
+    global _active
+    previous, _active = _active, profiler
+    if profiler.started is None:
+        profiler.start()
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        profiler.stop()
+
+
+def active():
+    return _active
+
+
+def phase(name):
+    """Контекст фазы активного профилировщика; без него - пустой контекст"""
+    profiler = _active
+    return _NULL_PHASE if profiler is None else profiler.phase(name)
+
+
+def count(name, amount=1):
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, amount)
+
+
+def profiled(name):
+    """Декоратор: каждый вызов функции - фаза name"""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class CountingReader:
+    """Обёртка потока, считающая прочитанные байты в счётчик name"""
+
+    def __init__(self, stream, name):
+        self.stream = stream
+        self.name = name
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        count(self.name, len(data))
+        return data
+
+    def __getattr__(self, attribute):
+        return getattr(self.stream, attribute)
@@ -0,0 +1,209 @@
+"""Обратный индекс и запросы достижимости: "почему пакет X попал в граф?"
+
+Индекс строится один раз за O(V + E) и дальше отвечает на запросы, не
+обходя граф целиком:
+
+    dependents   обратный CSR: кто напрямую зависит от пакета
+    root masks   транзитивное замыкание от корней по DAG конденсации:
+                 для каждой компоненты - битовое множество (int) корней,
+                 из которых она достижима; считается одним проходом в
+                 топологическом порядке
+    distance     расстояние от ближайшего корня (BFS от всех корней сразу)
+
+Кратчайшие пути ищутся от пакета назад по обратным рёбрам поиском A* с
+точной эвристикой distance, поэтому пути выдаются в порядке длины и
+каждый следующий стоит порядка длины пути, умноженной на число
+зависящих пакетов на нём, а не размера графа.
+"""
+
+import heapq
+from array import array
+
+try:
+    from . import profiling
+    from .dependency_graph import CSRGraph, DependencyGraph
+    from .errors import InvalidPackageNameError
+    from .load_order import _edge_sources, condense, strongly_connected_components
+except ImportError:
+    import profiling
+    from dependency_graph import CSRGraph, DependencyGraph
+    from errors import InvalidPackageNameError
+    from load_order import _edge_sources, condense, strongly_connected_components
+
+
+class ReachabilityIndex:
+    """Индекс обратных зависимостей и достижимости от корней
+
+    roots - имена корней; по умолчанию корнем считается первый узел каждой
+    компоненты конденсации, от которой никто не зависит (обычно это
+    анализируемый пакет).
+    """
+
+    def __init__(self, graph, roots=None):
+        if not hasattr(graph, 'to_csr'):
+            graph = DependencyGraph(graph)
+        with profiling.phase("reachability.build"):
+            csr = self.csr = graph.to_csr()
+            self.dependents = CSRGraph.from_edges(csr.names, csr.targets, _edge_sources(csr), csr.ids)
+            self.component, self.component_count = strongly_connected_components(csr)
+            self.dag = condense(csr, self.component, self.component_count)
+            self.roots = self._default_roots() if roots is None else [self.node(root) for root in roots]
+            self.root_masks = self._root_masks()
+            self.distance = self._distances()
+
+    def _default_roots(self):
+        has_dependents = bytearray(self.component_count)
+        for target in self.dag.targets:
+            has_dependents[target] = 1
+        roots = []
+        seen = bytearray(self.component_count)
+        for node in range(self.csr.node_count):
+            node_component = self.component[node]
+            if not has_dependents[node_component] and not seen[node_component]:
+                seen[node_component] = 1
+                roots.append(node)
+        return roots
+
+    def _root_masks(self):
+        masks = [0] * self.component_count
+        for bit, root in enumerate(self.roots):
+            masks[self.component[root]] |= 1 << bit
+        # Рёбра конденсации ведут от больших номеров к меньшим, поэтому
+        # обход по убыванию номера - топологический порядок
+        offsets, targets = self.dag.offsets, self.dag.targets
+        for node in range(self.component_count - 1, -1, -1):
+            mask = masks[node]
+            if mask:
+                for edge in range(offsets[node], offsets[node + 1]):
+                    target = targets[edge]
+                    masks[target] |= mask
+        return masks
+
+    def _distances(self):
+        distance = array('i', [-1]) * self.csr.node_count
+        queue = []
+        for root in self.roots:
+            if distance[root] < 0:
+                distance[root] = 0
+                queue.append(root)
+        offsets, targets = self.csr.offsets, self.csr.targets
+        for node in queue:
+            step = distance[node] + 1
+            for edge in range(offsets[node], offsets[node + 1]):
+                target = targets[edge]
+                if distance[target] < 0:
+                    distance[target] = step
+                    queue.append(target)
+        return distance
+
+    def node(self, package):
+        node_id = self.csr.ids.get(package)
+        if node_id is None:
+            raise InvalidPackageNameError(f"Пакет '{package}' не найден в графе")
+        return node_id
+
+    def dependents_of(self, package):
+        """Пакеты, напрямую зависящие от package"""
+        names = self.csr.names
+        return [names[node] for node in self.dependents.successors(self.node(package))]
+
+    def roots_of(self, package):
+        """Корни, из которых достижим package (в порядке roots)"""
+        mask = self.root_masks[self.component[self.node(package)]]
+        names = self.csr.names
+        found = []
+        while mask:
+            low = mask & -mask
+            found.append(names[self.roots[low.bit_length() - 1]])
+            mask ^= low
+        return found
+
+    def reaches(self, source, target):
+        """Достижим ли target из source"""
+        source_component = self.component[self.node(source)]
+        target_component = self.component[self.node(target)]
+        if source_component == target_component:
+            return True
+        # Компонента с меньшим номером не может вести к большему
+        if source_component < target_component:
+            return False
+        seen = {source_component}
+        stack = [source_component]
+        while stack:
+            for successor in self.dag.successors(stack.pop()):
+                if successor == target_component:
+                    return True
+                if successor > target_component and successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        return False
+
+    def shortest_path(self, package):
+        """Кратчайший путь от корня до package или None, если он недостижим"""
+        paths = self.paths(package, 1)
+        return paths[0] if paths else None
+
+    def paths(self, package, k=1):
+        """До k кратчайших простых путей от корней до package, короткие первыми
+
+        A* от package по обратным рёбрам с точной оценкой distance. При
+        равной оценке первым раскрывается более длинный префикс, поэтому
+        путь находится за его длину, а не перебором всех равных префиксов
+        (в графе из "ромбов" их число растёт экспоненциально). Каждый узел
+        раскрывается не больше k раз: k кратчайших путей до корня проходят
+        через k его кратчайших префиксов.
+        """
+        target = self.node(package)
+        distance = self.distance
+        if distance[target] < 0 or k < 1:
+            return []
+        offsets, sources = self.dependents.offsets, self.dependents.targets
+        names = self.csr.names
+
+        # Элементы кучи: (оценка длины, -длина от package, порядковый номер, путь);
+        # путь - связный список (узел, продолжение) от корня к package
+        found = []
+        seen = set()
+        expanded = {}
+        counter = 0
+        heap = [(distance[target], 0, counter, (target, None))]
+        while heap and len(found) < k:
+            _, length, _, link = heapq.heappop(heap)
+            length = -length
+            node = link[0]
+            if expanded.get(node, 0) >= k:
+                continue
+            expanded[node] = expanded.get(node, 0) + 1
+            if distance[node] == 0:
+                path = []
+                while link is not None:
+                    path.append(names[link[0]])
+                    link = link[1]
+                key = tuple(path)
+                if key not in seen:
+                    seen.add(key)
+                    found.append(path)
+                continue
+            on_path = set()
+            rest = link
+            while rest is not None:
+                on_path.add(rest[0])
+                rest = rest[1]
+            for edge in range(offsets[node], offsets[node + 1]):
+                dependent = sources[edge]
+                if distance[dependent] >= 0 and dependent not in on_path:
+                    counter += 1
+                    heapq.heappush(heap, (length + 1 + distance[dependent], -(length + 1), counter,
+                                          (dependent, link)))
+        return found
+
+    def explain(self, package, k=1):
+        """Ответ на "почему package в графе" в виде словаря для JSON"""
+        node = self.node(package)
+        return {
+            "package": package,
+            "distance": self.distance[node] if self.distance[node] >= 0 else None,
+            "roots": self.roots_of(package),
+            "dependents": self.dependents_of(package),
+            "paths": self.paths(package, k),
+        }
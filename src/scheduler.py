@@ -0,0 +1,284 @@
+"""Планировщик запросов к реестру: адаптивный параллелизм, повторы, предохранитель
+
+Для каждого хоста планировщик держит:
+
+* AdaptiveLimit - предел одновременных запросов по схеме AIMD: после
+  успешного ответа предел растёт на 1/предел (то есть на единицу за "окно"),
+  а при 429/503 или росте задержки выше latency_tolerance от лучшей
+  наблюдавшейся - умножается на decrease. Снижение не чаще раза за
+  сглаженную задержку, чтобы пачка 429 от уже отправленных запросов не
+  обрушила предел до минимума. Retry-After приостанавливает весь хост.
+* CircuitBreaker - после failure_threshold подряд неудач (ошибки
+  соединения и 5xx, кроме 503 - это сигнал перегрузки, а не отказа)
+  хост считается недоступным на reset_timeout секунд: запросы сразу
+  завершаются RegistryUnavailableError, затем пропускается один пробный
+  запрос.
+
+Повторы - экспоненциальная задержка с полным джиттером (случайная от нуля
+до base_delay * 2^попытка), чтобы повторы разных потоков не шли волной.
+"""
+
+import http.client
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+
+try:
+    from . import profiling
+    from .errors import RegistryUnavailableError
+except ImportError:
+    import profiling
+    from errors import RegistryUnavailableError
+
+
+# Ответы, означающие "слишком много запросов": снижаем параллелизм
+THROTTLE_STATUSES = frozenset((429, 503))
+# Ответы, которые имеет смысл повторить
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Сбои соединения, которые имеет смысл повторить
+RETRY_ERRORS = (OSError, http.client.HTTPException)
+
+
+def parse_retry_after(value, now=None):
+    """Секунды ожидания из Retry-After (число секунд или HTTP-дата); None, если нет"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+
+class AdaptiveLimit:
+    """Предел одновременных запросов к хосту (AIMD)"""
+
+    def __init__(self, maximum=16, minimum=1, initial=None, decrease=0.5, latency_decrease=0.9,
+                 latency_tolerance=3.0, latency_floor=0.05, clock=time.monotonic):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(initial if initial is not None else maximum)
+        self.decrease = decrease
+        self.latency_decrease = latency_decrease
+        self.latency_tolerance = latency_tolerance
+        # Рост задержки меньше этого порога - шум (особенно на локальном
+        # реестре с задержкой в доли миллисекунды), а не перегрузка
+        self.latency_floor = latency_floor
+        self.clock = clock
+        self.inflight = 0
+        self.paused_until = 0.0
+        self.min_latency = None
+        self.latency = None
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                wait = self.paused_until - self.clock()
+                if wait > 0:
+                    self._condition.wait(wait)
+                elif self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return
+                else:
+                    self._condition.wait()
+
+    def release(self, latency=None, throttled=False, retry_after=None):
+        """Возвращает место; latency - задержка успешного ответа, throttled - 429/503"""
+        with self._condition:
+            self.inflight -= 1
+            now = self.clock()
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if throttled:
+                self._decrease(now, self.decrease)
+            elif latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+                if self.latency > self.latency_tolerance * max(self.min_latency, self.latency_floor):
+                    self._decrease(now, self.latency_decrease)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self, now, factor):
+        if now - self._last_decrease >= (self.latency or 0.0):
+            self.limit = max(self.minimum, self.limit * factor)
+            self._last_decrease = now
+
+
+class CircuitBreaker:
+    """Предохранитель хоста: closed -> open после серии неудач -> half-open"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        """Пропускает запрос или сразу отказывает, пока хост считается недоступным"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        profiling.count("scheduler.rejected")
+        raise RegistryUnavailableError(f"Реестр {host} недоступен: слишком много ошибок подряд")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    profiling.count("scheduler.circuit_opened")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+            self._probing = False
+
+
+class RequestScheduler:
+    """Выполняет запросы к хостам с адаптивным пределом, повторами и предохранителем
+
+    call(host, attempt) вызывает attempt() - один HTTP-запрос, который
+    возвращает объект со status и headers (например, http_pool.Response).
+    Ответы из RETRY_STATUSES и ошибки RETRY_ERRORS повторяются до
+    max_attempts раз; последний ответ возвращается как есть, последняя
+    ошибка пробрасывается.
+    """
+
+    def __init__(self, max_concurrency=16, min_concurrency=1, max_attempts=5, base_delay=0.25, max_delay=30.0,
+                 max_retry_after=120.0, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic,
+                 sleep=time.sleep, rng=None):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.retries = 0
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, host):
+        """(AdaptiveLimit, CircuitBreaker) хоста; создаются при первом обращении"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = (
+                    AdaptiveLimit(self.max_concurrency, self.min_concurrency, clock=self.clock),
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout, self.clock),
+                )
+            return state
+
+    def backoff(self, attempt):
+        """Задержка перед повтором номер attempt (с нуля): полный джиттер"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, host, attempt):
+        limit, breaker = self.host(host)
+        for number in range(self.max_attempts):
+            breaker.allow(host)
+            limit.acquire()
+            started = self.clock()
+            try:
+                response = attempt()
+            except RETRY_ERRORS:
+                limit.release()
+                breaker.record_failure()
+                if number + 1 == self.max_attempts:
+                    raise
+                retry_after = None
+            except BaseException:
+                limit.release()
+                breaker.record_success()
+                raise
+            else:
+                status = response.status
+                retry_after = None
+                if status in THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    if retry_after is not None:
+                        retry_after = min(retry_after, self.max_retry_after)
+                    profiling.count("scheduler.throttled")
+                    limit.release(throttled=True, retry_after=retry_after)
+                else:
+                    limit.release(latency=self.clock() - started)
+                if status >= 500 and status not in THROTTLE_STATUSES:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if status not in RETRY_STATUSES or number + 1 == self.max_attempts:
+                    return response
+
+            with self._lock:
+                self.retries += 1
+            profiling.count("scheduler.retries")
+            # Retry-After уже приостановил хост в limit.acquire; джиттер
+            # разносит повторы, накопившиеся за время паузы
+            self.sleep(self.backoff(number))
+
+    def describe(self):
+        """Состояние хостов: предел, запросы в работе, состояние предохранителя"""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: {"limit": round(limit.limit, 2), "inflight": limit.inflight, "circuit": breaker.state}
+                for host, (limit, breaker) in hosts.items()}
+
+
+class SingleFlight:
+    """Одновременные вызовы do() с одним ключом выполняют load один раз"""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, load):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            profiling.count("single_flight.shared")
+            return future.result()
+
+        try:
+            result = load()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
@@ -0,0 +1,234 @@
+"""Разбор версий и диапазонов npm (semver) и поиск максимальной подходящей версии"""
+
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+
+_VERSION = re.compile(
+    r"^v?(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+_PARTIAL = re.compile(
+    r"^v?(\d+|[xX*])?(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+_COMPARATOR = re.compile(r"^(<=|>=|<|>|=|~>|~|\^)?(.*)$")
+_OPERATOR_SPACE = re.compile(r"(<=|>=|<|>|=|~>|~|\^)\s+")
+_HYPHEN = re.compile(r"^(\S+)\s+-\s+(\S+)$")
+
+_RELEASE = (1,)
+_MIN_PRERELEASE = (0, ())
+
+
+def _prerelease_key(prerelease):
+    if not prerelease:
+        return _RELEASE
+    return (0, tuple((0, int(part)) if part.isdigit() else (1, part)
+                     for part in prerelease.split(".")))
+
+
+@lru_cache(maxsize=65536)
+def parse_version(text):
+    """Возвращает ключ сортировки версии или None, если это не semver"""
+    match = _VERSION.match(text.strip().lstrip("=").strip())
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return int(major), int(minor), int(patch), _prerelease_key(prerelease)
+
+
+def is_prerelease(key):
+    return key[3][0] == 0
+
+
+class _Interval:
+    """Множество версий low <= v < high (включённость границ настраивается)"""
+
+    __slots__ = ("low", "low_inclusive", "high", "high_inclusive", "prerelease_tuples")
+
+    def __init__(self):
+        self.low = None
+        self.low_inclusive = True
+        self.high = None
+        self.high_inclusive = False
+        self.prerelease_tuples = set()
+
+    def restrict_low(self, key, inclusive):
+        if self.low is None or key > self.low or (key == self.low and not inclusive):
+            self.low, self.low_inclusive = key, inclusive
+
+    def restrict_high(self, key, inclusive):
+        if self.high is None or key < self.high or (key == self.high and not inclusive):
+            self.high, self.high_inclusive = key, inclusive
+
+    def contains(self, key):
+        if self.low is not None and (key < self.low or (key == self.low and not self.low_inclusive)):
+            return False
+        if self.high is not None and (key > self.high or (key == self.high and not self.high_inclusive)):
+            return False
+        # Пре-релизы подходят, только если диапазон явно упоминает их major.minor.patch
+        return not is_prerelease(key) or key[:3] in self.prerelease_tuples
+
+    def max_satisfying(self, index):
+        if self.prerelease_tuples:
+            keys, versions = index.keys, index.versions
+        else:
+            keys, versions = index.release_keys, index.release_versions
+
+        if self.high is None:
+            position = len(keys)
+        elif self.high_inclusive:
+            position = bisect_right(keys, self.high)
+        else:
+            position = bisect_left(keys, self.high)
+
+        for i in range(position - 1, -1, -1):
+            key = keys[i]
+            if self.low is not None and (key < self.low or (key == self.low and not self.low_inclusive)):
+                return None
+            if not is_prerelease(key) or key[:3] in self.prerelease_tuples:
+                return versions[i]
+        return None
+
+
+def _parse_partial(text):
+    """'1.2' -> ([1, 2], None): числа до первого x/*/пропуска и пре-релиз"""
+    match = _PARTIAL.match(text)
+    if not match:
+        raise ValueError(text)
+    parts = []
+    for part in match.groups()[:3]:
+        if part is None or part in ("x", "X", "*"):
+            break
+        parts.append(int(part))
+    prerelease = match.group(4) if len(parts) == 3 else None
+    return parts, prerelease
+
+
+def _key(parts, prerelease=None):
+    padded = list(parts) + [0] * (3 - len(parts))
+    return padded[0], padded[1], padded[2], _prerelease_key(prerelease)
+
+
+def _bump(parts, position):
+    """Наименьшая версия, следующая за частичной версией на разряде position"""
+    bumped = list(parts[:position + 1])
+    bumped[position] += 1
+    return _key(bumped, None)[:3] + (_MIN_PRERELEASE,)
+
+
+def _apply(interval, operator, text):
+    if text in ("", "x", "X", "*"):
+        if operator in ("<", ">"):
+            interval.restrict_high((0, 0, 0, _MIN_PRERELEASE), False)
+        return
+
+    parts, prerelease = _parse_partial(text)
+    if prerelease:
+        interval.prerelease_tuples.add(tuple(parts))
+    if not parts:
+        return
+    exact = len(parts) == 3
+    low = _key(parts, prerelease)
+
+    if operator in (None, "="):
+        interval.restrict_low(low, True)
+        if exact:
+            interval.restrict_high(low, True)
+        else:
+            interval.restrict_high(_bump(parts, len(parts) - 1), False)
+    elif operator in ("~", "~>"):
+        interval.restrict_low(low, True)
+        interval.restrict_high(_bump(parts, min(1, len(parts) - 1)), False)
+    elif operator == "^":
+        interval.restrict_low(low, True)
+        # Фиксирован первый ненулевой разряд, а если все нули - последний указанный
+        position = next((i for i, part in enumerate(parts) if part != 0), len(parts) - 1)
+        interval.restrict_high(_bump(parts, position), False)
+    elif operator == ">=":
+        interval.restrict_low(low, True)
+    elif operator == ">":
+        if exact:
+            interval.restrict_low(low, False)
+        else:
+            interval.restrict_low(_bump(parts, len(parts) - 1), True)
+    elif operator == "<":
+        interval.restrict_high(low if exact else low[:3] + (_MIN_PRERELEASE,), False)
+    elif operator == "<=":
+        if exact:
+            interval.restrict_high(low, True)
+        else:
+            interval.restrict_high(_bump(parts, len(parts) - 1), False)
+
+
+def _compile_set(text):
+    interval = _Interval()
+    hyphen = _HYPHEN.match(text)
+    if hyphen:
+        _apply(interval, ">=", hyphen.group(1))
+        _apply(interval, "<=", hyphen.group(2))
+        return interval
+    for token in text.split():
+        operator, version = _COMPARATOR.match(token).groups()
+        _apply(interval, operator, version)
+    return interval
+
+
+class Range:
+    """Скомпилированный диапазон: объединение интервалов (части через '||')"""
+
+    def __init__(self, text, intervals):
+        self.text = text
+        self.intervals = intervals
+
+    def test(self, version):
+        key = parse_version(version) if isinstance(version, str) else version
+        return key is not None and any(interval.contains(key) for interval in self.intervals)
+
+    def max_satisfying(self, index):
+        """Наибольшая подходящая версия из VersionIndex: бинарный поиск по каждому интервалу"""
+        best = None
+        for interval in self.intervals:
+            found = interval.max_satisfying(index)
+            if found is not None and (best is None or index.key(found) > index.key(best)):
+                best = found
+        return best
+
+    def __repr__(self):
+        return f"Range({self.text!r})"
+
+
+@lru_cache(maxsize=65536)
+def compile_range(text):
+    """Компилирует диапазон npm; для тегов, git- и file-ссылок возвращает None"""
+    normalized = _OPERATOR_SPACE.sub(r"\1", text.strip())
+    try:
+        return Range(text, [_compile_set(part.strip()) for part in normalized.split("||")])
+    except ValueError:
+        return None
+
+
+class VersionIndex:
+    """Отсортированный список версий пакета для бинарного поиска"""
+
+    def __init__(self, versions):
+        parsed = sorted((key, version) for version in versions
+                        for key in (parse_version(version),) if key is not None)
+        self.keys = [key for key, _ in parsed]
+        self.versions = [version for _, version in parsed]
+        self.release_keys = [key for key in self.keys if not is_prerelease(key)]
+        self.release_versions = [version for key, version in parsed if not is_prerelease(key)]
+        self._keys = dict(zip(self.versions, self.keys))
+
+    def key(self, version):
+        return self._keys[version]
+
+    def __len__(self):
+        return len(self.versions)
+
+
+def max_satisfying(index, range_text):
+    compiled = compile_range(range_text)
+    return compiled.max_satisfying(index) if compiled else None
+
+
+def satisfies(version, range_text):
+    compiled = compile_range(range_text)
+    return compiled is not None and compiled.test(version)
@@ -0,0 +1,502 @@
+"""Долгоживущий сервер запросов: графы загружаются один раз и живут в памяти
+
+Сервер говорит по HTTP/1.1 (keep-alive) через локальный TCP-порт или
+Unix-сокет и обрабатывает запросы параллельно в потоках. Все запросы -
+GET с параметрами в строке запроса:
+
+    source   файл графа (тестовый JSON, lock-файл, снимок) или URL реестра;
+             по умолчанию - источник, заданный при запуске сервера
+    root     корневой пакет источника (для lock-файлов и реестра)
+    package  пакет, о котором спрашивают (по умолчанию root)
+
+    /health                          состояние сервера и загруженные графы
+    /subtree?depth=N                 подграф package в JSON {пакет: [зависимости]}
+    /ascii?max_depth=&max_nodes=     ASCII-дерево
+    /export?format=plantuml|dot|...  выгрузка подграфа в текстовый формат
+    /svg                             SVG встроенной укладкой
+    /html                            интерактивная страница с силовой укладкой
+    /order                           порядок загрузки волнами (JSON)
+    /why?target=&k=                  почему target в графе package (JSON)
+    /summary?max_nodes=&top_k=&min_size=&depth=&expand=a,b
+                                     сводка графа package с агрегатами (JSON);
+                                     размеры поддеревьев считаются один раз
+    /reload                          принудительная перезагрузка источника
+
+Перед каждым запросом сервер сверяет mtime, размер и inode файла
+источника и при изменении перечитывает граф; производные структуры
+(индексы, волны, отрисовки) пересчитываются лениво для новой версии.
+"""
+
+import http.client
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+try:
+    from . import profiling
+    from .ascii_tree import write_ascii_tree
+    from .dependency_graph import DependencyGraph
+    from .errors import ConfigError, InvalidPackageNameError
+    from .exporters import EXPORTERS, export_graph, graph_from_json, is_json_export
+    from .load_order import load_waves
+    from .lockfiles import lockfile_format, read_lockfile
+    from .reachability import ReachabilityIndex
+    from .snapshot import is_snapshot, open_snapshot
+    from .svg_renderer import write_svg
+    from .layout import layered_layout
+    from .html_viewer import write_html
+    from .force_layout import force_layout
+    from .summary import DEFAULT_MAX_NODES, DEFAULT_TOP_K, Summarizer
+except ImportError:
+    import profiling
+    from ascii_tree import write_ascii_tree
+    from dependency_graph import DependencyGraph
+    from errors import ConfigError, InvalidPackageNameError
+    from exporters import EXPORTERS, export_graph, graph_from_json, is_json_export
+    from load_order import load_waves
+    from lockfiles import lockfile_format, read_lockfile
+    from reachability import ReachabilityIndex
+    from snapshot import is_snapshot, open_snapshot
+    from svg_renderer import write_svg
+    from layout import layered_layout
+    from html_viewer import write_html
+    from force_layout import force_layout
+    from summary import DEFAULT_MAX_NODES, DEFAULT_TOP_K, Summarizer
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RENDER_CACHE_SIZE = 64
+
+
+def parse_address(address):
+    """("unix", путь) для "unix:/путь", иначе ("tcp", (хост, порт))"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    parts = urlsplit(address if "://" in address else f"http://{address}")
+    return "tcp", (parts.hostname or DEFAULT_HOST, parts.port or DEFAULT_PORT)
+
+
+def _is_url(source):
+    return source.startswith(("http://", "https://"))
+
+
+def read_graph(source, root=None):
+    """Граф из источника без диагностического вывода анализатора"""
+    if _is_url(source):
+        try:
+            from .npm_client import NPMClient
+            from .cache import PackumentCache
+        except ImportError:
+            from npm_client import NPMClient
+            from cache import PackumentCache
+        if not root:
+            raise ConfigError("Для реестра нужен параметр root")
+        client = NPMClient(source, cache=PackumentCache.default())
+        client.verbose = False
+        try:
+            return client.get_dependencies_recursive(root)
+        finally:
+            client.close()
+    if not os.path.exists(source):
+        raise ConfigError(f"Источник графа не найден: {source}")
+    if lockfile_format(source):
+        return read_lockfile(source, root)
+    if is_snapshot(source):
+        return open_snapshot(source).graph
+    try:
+        with open(source, encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError as e:
+        raise ConfigError(f"Ошибка формата JSON в файле {source}: {e}")
+    return graph_from_json(data) if is_json_export(data) else DependencyGraph(data)
+
+
+def _signature(source):
+    if _is_url(source):
+        return None
+    stat = os.stat(source)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class GraphEntry:
+    """Загруженный граф и лениво построенные производные структуры"""
+
+    def __init__(self, source, root, graph, signature):
+        self.source = source
+        self.root = root
+        self.graph = graph
+        self.signature = signature
+        self.indexes = {}
+        self.waves = {}
+        self.summarizers = {}
+        self.renders = OrderedDict()
+        self.lock = threading.Lock()
+
+    def cached(self, table, key, build):
+        with self.lock:
+            value = table.get(key)
+        if value is None:
+            value = build()
+            with self.lock:
+                table[key] = value
+                if table is self.renders:
+                    while len(table) > RENDER_CACHE_SIZE:
+                        table.popitem(last=False)
+        return value
+
+    def index(self, root):
+        """Индекс достижимости от root; None - от всех корней графа"""
+        roots = None if root is None else [root]
+        return self.cached(self.indexes, root, lambda: ReachabilityIndex(self.graph, roots))
+
+    def summarizer(self, root):
+        """Остовное дерево и размеры поддеревьев от root для сводок"""
+        return self.cached(self.summarizers, root, lambda: Summarizer(self.graph, root))
+
+
+class GraphStore:
+    """Графы по (источник, корень); перечитываются при изменении файла"""
+
+    def __init__(self, default_source=None):
+        self.default_source = default_source
+        self.loads = 0
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key(self, source, root):
+        source = source or self.default_source
+        if not source:
+            raise ConfigError("Не задан источник графа (параметр source)")
+        if not _is_url(source):
+            source = os.path.abspath(source)
+        # Тестовые файлы и снимки хранят граф целиком, корень на него не влияет
+        keyed_by_root = _is_url(source) or lockfile_format(source)
+        return source, (root if keyed_by_root else None)
+
+    def get(self, source=None, root=None, force=False):
+        key = self._key(source, root)
+        with self._lock:
+            entry = self._entries.get(key)
+            lock = self._locks.setdefault(key, threading.Lock())
+        if entry is not None and not force and entry.signature == self._current(key[0], entry):
+            return entry
+
+        # Один поток загружает, остальные ждут его результата
+        with lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            signature = self._current(key[0], entry) if entry is not None else None
+            if entry is None or force or entry.signature != signature:
+                try:
+                    signature = _signature(key[0])
+                except OSError:
+                    signature = None
+                with profiling.phase("serve.load"):
+                    entry = GraphEntry(key[0], root, read_graph(key[0], root), signature)
+                with self._lock:
+                    self._entries[key] = entry
+                    self.loads += 1
+            return entry
+
+    @staticmethod
+    def _current(source, entry):
+        try:
+            return _signature(source)
+        except OSError:
+            return entry.signature
+
+    def describe(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return [{"source": entry.source, "root": entry.root, "nodes": entry.graph.to_csr().node_count}
+                for entry in entries]
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _subtree(graph, package, depth=None):
+    """{пакет: [зависимости]} для узлов, достижимых из package не глубже depth"""
+    dependencies = graph.dependencies
+    if package not in dependencies:
+        raise InvalidPackageNameError(f"Пакет '{package}' не найден в графе")
+    result = {}
+    level = [package]
+    distance = 0
+    seen = {package}
+    while level and (depth is None or distance <= depth):
+        upcoming = []
+        for node in level:
+            deps = list(dependencies.get(node, []))
+            result[node] = deps if depth is None or distance < depth else []
+            if depth is None or distance < depth:
+                for dep in deps:
+                    if dep not in seen:
+                        seen.add(dep)
+                        upcoming.append(dep)
+        level = upcoming
+        distance += 1
+    return result
+
+
+class QueryService:
+    """Обработка запросов без привязки к транспорту: (статус, тип, тело)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def handle(self, endpoint, params):
+        with self._lock:
+            self.requests += 1
+        method = getattr(self, "do_" + endpoint.strip("/").replace("-", "_"), None)
+        if method is None or not endpoint.strip("/"):
+            return 404, "application/json", json.dumps({"error": f"Неизвестный запрос: {endpoint}"})
+        try:
+            with profiling.phase(f"serve{endpoint.replace('/', '.')}"):
+                return method(params)
+        except InvalidPackageNameError as e:
+            return 404, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False)
+        except (ValueError, ConfigError) as e:
+            return 400, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False)
+        except Exception as e:
+            return 500, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False)
+
+    def _entry(self, params):
+        root = params.get("root") or params.get("package")
+        return self.store.get(params.get("source"), root), params.get("package") or root
+
+    @staticmethod
+    def _integer(params, name):
+        value = params.get(name)
+        if value in (None, ""):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise BadRequest(f"Параметр {name} должен быть целым числом")
+
+    @staticmethod
+    def _require(package):
+        if not package:
+            raise BadRequest("Не задан пакет (параметр package)")
+        return package
+
+    @staticmethod
+    def _json(value):
+        return 200, "application/json", json.dumps(value, ensure_ascii=False)
+
+    def _render(self, entry, key, render):
+        return 200, key[1], entry.cached(entry.renders, key, render)
+
+    def do_health(self, params):
+        return self._json({"status": "ok", "requests": self.requests, "loads": self.store.loads,
+                           "graphs": self.store.describe()})
+
+    def do_reload(self, params):
+        entry = self.store.get(params.get("source"), params.get("root") or params.get("package"), force=True)
+        return self._json({"source": entry.source, "nodes": entry.graph.to_csr().node_count})
+
+    def do_subtree(self, params):
+        entry, package = self._entry(params)
+        return self._json(_subtree(entry.graph, self._require(package), self._integer(params, "depth")))
+
+    def do_ascii(self, params):
+        entry, package = self._entry(params)
+        max_depth, max_nodes = self._integer(params, "max_depth"), self._integer(params, "max_nodes")
+
+        def render():
+            out = io.StringIO()
+            write_ascii_tree(entry.graph, package, out, max_depth=max_depth, max_nodes=max_nodes)
+            return out.getvalue()
+        return self._render(entry, ("ascii", "text/plain; charset=utf-8", self._require(package),
+                                    max_depth, max_nodes), render)
+
+    def do_export(self, params):
+        entry, package = self._entry(params)
+        fmt = params.get("format", "plantuml")
+        if fmt not in EXPORTERS:
+            raise BadRequest(f"Неизвестный формат: {fmt} (доступны: {', '.join(EXPORTERS)})")
+
+        def render():
+            out = io.StringIO()
+            export_graph(entry.graph, package, fmt, out)
+            return out.getvalue()
+        return self._render(entry, ("export", "text/plain; charset=utf-8", self._require(package), fmt), render)
+
+    def do_svg(self, params):
+        entry, package = self._entry(params)
+
+        def render():
+            out = io.StringIO()
+            write_svg(layered_layout(entry.graph, package), out, getattr(entry.graph, "versions", None))
+            return out.getvalue()
+        return self._render(entry, ("svg", "image/svg+xml", self._require(package)), render)
+
+    def do_html(self, params):
+        entry, package = self._entry(params)
+
+        def render():
+            out = io.StringIO()
+            write_html(force_layout(entry.graph, package), out, getattr(entry.graph, "versions", None),
+                       f"Зависимости {package}")
+            return out.getvalue()
+        return self._render(entry, ("html", "text/html; charset=utf-8", self._require(package)), render)
+
+    def do_order(self, params):
+        entry, package = self._entry(params)
+        waves = entry.cached(entry.waves, package, lambda: load_waves(entry.graph, package))
+        return self._json(waves.to_dict())
+
+    def do_why(self, params):
+        entry, package = self._entry(params)
+        target = params.get("target")
+        if not target:
+            raise BadRequest("Не задан пакет target")
+        k = self._integer(params, "k") or 1
+        root = None if params.get("all_roots") else self._require(package)
+        return self._json(entry.index(root).explain(target, k))
+
+    def do_summary(self, params):
+        entry, package = self._entry(params)
+        summarizer = entry.summarizer(self._require(package))
+        max_nodes = self._integer(params, "max_nodes")
+        top_k = self._integer(params, "top_k")
+        expand = [name for name in params.get("expand", "").split(",") if name]
+        summary = summarizer.summarize(DEFAULT_MAX_NODES if max_nodes is None else max_nodes,
+                                       DEFAULT_TOP_K if top_k is None else top_k,
+                                       self._integer(params, "min_size") or 1, self._integer(params, "depth"),
+                                       expand)
+        return self._json(summary.to_dict())
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        status, content_type, body = self.server.service.handle(parts.path, dict(parse_qsl(parts.query)))
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        # У клиентов Unix-сокета нет адреса
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixQueryServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(address, service):
+    """Создаёт (но не запускает) сервер по адресу "хост:порт" или "unix:путь" """
+    kind, target = parse_address(address)
+    if kind == "unix":
+        if not hasattr(socket, "AF_UNIX"):
+            raise ConfigError("Unix-сокеты не поддерживаются на этой платформе")
+        if os.path.exists(target):
+            # Остаток от завершившегося сервера; живой сервер не трогаем
+            try:
+                DaemonClient(address, timeout=1).get("health")
+            except ConfigError:
+                os.remove(target)
+            else:
+                raise ConfigError(f"Сервер уже запущен: {address}")
+        server = UnixQueryServer(target, QueryHandler)
+    else:
+        server = ThreadingHTTPServer(target, QueryHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def server_address(server):
+    if isinstance(server, UnixQueryServer):
+        return f"unix:{server.server_address}"
+    host, port = server.server_address[:2]
+    return f"{host}:{port}"
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonClient:
+    """Тонкий клиент сервера запросов; одно keep-alive соединение на клиента"""
+
+    def __init__(self, address, timeout=30):
+        self.address = address
+        self.timeout = timeout
+        self._conn = None
+
+    def _connect(self):
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            return _UnixConnection(target, self.timeout)
+        return http.client.HTTPConnection(*target, timeout=self.timeout)
+
+    def get(self, endpoint, **params):
+        """Тело ответа как текст; ошибки сервера - ConfigError с его сообщением"""
+        query = urlencode({key: value for key, value in params.items() if value is not None})
+        path = "/" + endpoint.strip("/") + (f"?{query}" if query else "")
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = self._connect()
+            try:
+                self._conn.request("GET", path)
+                response = self._conn.getresponse()
+                body = response.read().decode("utf-8")
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                # Повтор только для соединения, которое сервер успел закрыть
+                if attempt or isinstance(e, (ConnectionRefusedError, FileNotFoundError, socket.timeout)):
+                    raise ConfigError(f"Сервер depviz недоступен ({self.address}): {e}")
+
+        if response.status >= 400:
+            try:
+                message = json.loads(body)["error"]
+            except (ValueError, KeyError, TypeError):
+                message = body
+            if response.status == 404:
+                raise InvalidPackageNameError(message)
+            raise ConfigError(f"Ошибка сервера ({response.status}): {message}")
+        return body
+
+    def json(self, endpoint, **params):
+        return json.loads(self.get(endpoint, **params))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
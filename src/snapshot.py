@@ -0,0 +1,317 @@
+"""Двоичный снимок разрешённого графа, открываемый через mmap без копирования
+
+Формат (little-endian, все секции выровнены на 8 байт):
+
+    заголовок  MAGIC, версия формата, флаги, число узлов, рёбер и строк,
+               затем таблица секций (смещение, длина) в порядке SECTIONS
+               и необязательных секций, отмеченных флагами
+    strings    смещения строк (int64, строк + 1) и UTF-8 данные: сначала
+               имена узлов (строка i - имя узла i), затем различные версии
+    offsets    CSR-смещения (int64, узлов + 1)
+    targets    CSR-цели (int32, рёбер)
+    versions   номер строки версии для каждого узла (int32, -1 - нет)
+    index      хеш-таблица имя -> узел (int32, открытая адресация, crc32)
+    metadata   JSON: корень, источник, время создания и т.п.
+    merkle     хеши Меркла узлов по 16 байт (флаг FLAG_MERKLE; см. merkle);
+               читатели без поддержки флага просто не видят эту секцию
+
+При открытии массивы - это memoryview поверх отображённого файла, поэтому
+загрузка не зависит от размера графа, а несколько процессов делят одни и
+те же страницы памяти.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections.abc import Mapping, Sequence
+
+try:
+    from . import profiling
+    from .dependency_graph import CSRGraph, DependencyGraph
+    from .errors import ConfigError
+    from .merkle import DIGEST_SIZE, HashColumn, node_hashes
+except ImportError:
+    import profiling
+    from dependency_graph import CSRGraph, DependencyGraph
+    from errors import ConfigError
+    from merkle import DIGEST_SIZE, HashColumn, node_hashes
+
+
+MAGIC = b"DEPVIZSN"
+FORMAT_VERSION = 1
+SECTIONS = ("string_offsets", "string_data", "offsets", "targets", "versions", "index", "metadata")
+FLAG_MERKLE = 1
+_HEADER = struct.Struct("<8sIIQQQ")
+_SECTION = struct.Struct("<QQ")
+HEADER_SIZE = _HEADER.size + _SECTION.size * len(SECTIONS)
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _slot(name_bytes, mask):
+    return zlib.crc32(name_bytes) & mask
+
+
+class StringTable(Sequence):
+    """Строки снимка; декодируются из отображённого файла при обращении"""
+
+    def __init__(self, offsets, data, count):
+        self._offsets = offsets
+        self._data = data
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def raw(self, i):
+        return self._data[self._offsets[i]:self._offsets[i + 1]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return str(self.raw(i), "utf-8")
+
+
+class NameIndex(Mapping):
+    """Поиск узла по имени через хеш-таблицу снимка, без построения словаря"""
+
+    def __init__(self, table, names, node_count):
+        self._table = table
+        self._names = names
+        self._node_count = node_count
+        self._mask = len(table) - 1
+
+    def __getitem__(self, name):
+        encoded = name.encode("utf-8")
+        slot = _slot(encoded, self._mask)
+        while True:
+            node = self._table[slot]
+            if node < 0:
+                raise KeyError(name)
+            if self._names.raw(node) == encoded:
+                return node
+            slot = (slot + 1) & self._mask
+
+    def __iter__(self):
+        return (self._names[i] for i in range(self._node_count))
+
+    def __len__(self):
+        return self._node_count
+
+
+class VersionColumn(Mapping):
+    """Версии узлов снимка: {имя: версия} поверх столбца номеров строк"""
+
+    def __init__(self, column, strings, ids):
+        self._column = column
+        self._strings = strings
+        self._ids = ids
+        self._count = None
+
+    def __getitem__(self, name):
+        string_id = self._column[self._ids[name]]
+        if string_id < 0:
+            raise KeyError(name)
+        return self._strings[string_id]
+
+    def __iter__(self):
+        # Имена узлов - первые строки таблицы
+        return (self._strings[node] for node, string_id in enumerate(self._column) if string_id >= 0)
+
+    def __len__(self):
+        if self._count is None:
+            self._count = sum(1 for string_id in self._column if string_id >= 0)
+        return self._count
+
+
+@profiling.profiled("snapshot.save")
+def save_snapshot(graph, path, metadata=None):
+    """Сохраняет граф в снимок; возвращает (узлов, рёбер)
+
+    Файл пишется во временный и атомарно заменяет целевой, чтобы
+    процессы, открывшие старый снимок, продолжали читать его страницы.
+    """
+    if not hasattr(graph, 'to_csr'):
+        graph = DependencyGraph(graph)
+    csr, hashes = node_hashes(graph)
+    node_count = csr.node_count
+    versions = getattr(graph, 'versions', None) or {}
+
+    strings = [name.encode("utf-8") for name in csr.names]
+    version_ids = {}
+    version_column = array('i', [-1]) * node_count
+    for node, name in enumerate(csr.names):
+        version = versions.get(name)
+        if version is not None:
+            string_id = version_ids.get(version)
+            if string_id is None:
+                string_id = version_ids[version] = len(strings)
+                strings.append(version.encode("utf-8"))
+            version_column[node] = string_id
+
+    string_offsets = array('q', [0])
+    total = 0
+    for encoded in strings:
+        total += len(encoded)
+        string_offsets.append(total)
+
+    size = 8
+    while size < 2 * node_count:
+        size *= 2
+    index = array('i', [-1]) * size
+    mask = size - 1
+    for node in range(node_count):
+        slot = _slot(strings[node], mask)
+        while index[slot] >= 0:
+            slot = (slot + 1) & mask
+        index[slot] = node
+
+    info = {"format": FORMAT_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+    info.update(metadata or {})
+    payloads = [
+        _little_endian(string_offsets).tobytes(),
+        b"".join(strings),
+        _little_endian(array('q', csr.offsets)).tobytes(),
+        _little_endian(array('i', csr.targets)).tobytes(),
+        _little_endian(version_column).tobytes(),
+        _little_endian(index).tobytes(),
+        json.dumps(info, ensure_ascii=False).encode("utf-8"),
+        b"".join(hashes),
+    ]
+
+    table = []
+    offset = _aligned(HEADER_SIZE + _SECTION.size)
+    for payload in payloads:
+        table.append((offset, len(payload)))
+        offset = _aligned(offset + len(payload))
+
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_MERKLE, node_count, csr.edge_count, len(strings)))
+        for entry in table:
+            f.write(_SECTION.pack(*entry))
+        for (start, _), payload in zip(table, payloads):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(payload)
+    os.replace(temp_path, path)
+    return node_count, csr.edge_count
+
+
+class Snapshot:
+    """Открытый снимок: graph - компактный DependencyGraph поверх mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            raise ConfigError(f"Снимок не найден: {path}")
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                raise ConfigError(f"Файл слишком мал для снимка: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with profiling.phase("snapshot.open"):
+                self._load()
+        except Exception:
+            self.close()
+            raise
+
+    def _load(self):
+        buffer = memoryview(self._mmap)
+        magic, version, flags, node_count, edge_count, string_count = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ConfigError(f"Не снимок графа depviz: {self.path}")
+        if version != FORMAT_VERSION:
+            raise ConfigError(f"Неподдерживаемая версия снимка {version} (ожидалась {FORMAT_VERSION})")
+
+        sections = {}
+        section_names = SECTIONS + (("merkle",) if flags & FLAG_MERKLE else ())
+        if len(buffer) < _HEADER.size + _SECTION.size * len(section_names):
+            raise ConfigError(f"Файл слишком мал для снимка: {self.path}")
+        for i, name in enumerate(section_names):
+            start, length = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+            if start + length > len(buffer):
+                raise ConfigError(f"Снимок повреждён: секция {name} выходит за конец файла")
+            sections[name] = buffer[start:start + length]
+        self._views = sections
+
+        def column(name, typecode):
+            view = sections[name]
+            if sys.byteorder != "little":
+                values = array(typecode, view.tobytes())
+                values.byteswap()
+                return values
+            return view.cast(typecode)
+
+        string_offsets = column("string_offsets", "q")
+        if len(string_offsets) != string_count + 1:
+            raise ConfigError("Снимок повреждён: таблица строк не согласована с заголовком")
+        strings = StringTable(string_offsets, sections["string_data"], string_count)
+        names = StringTable(string_offsets, sections["string_data"], node_count)
+        ids = NameIndex(column("index", "i"), names, node_count)
+
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.metadata = json.loads(bytes(sections["metadata"]).decode("utf-8"))
+        self.merkle = None
+        if "merkle" in sections:
+            if len(sections["merkle"]) != node_count * DIGEST_SIZE:
+                raise ConfigError("Снимок повреждён: хеши не согласованы с числом узлов")
+            self.merkle = HashColumn(sections["merkle"])
+        self.csr = CSRGraph(names, column("offsets", "q"), column("targets", "i"), ids)
+        self.graph = DependencyGraph.from_csr(self.csr, VersionColumn(column("versions", "i"), strings, ids))
+        # Граф держит ссылку на снимок, чтобы отображение жило не меньше графа
+        self.graph.snapshot = self
+
+    def close(self):
+        views = getattr(self, "_views", {})
+        self._views = {}
+        self.csr = self.graph = self.merkle = None
+        for view in views.values():
+            view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Кто-то ещё держит срезы буфера - отображение закроет сборщик мусора
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_snapshot(path):
+    """Начинается ли файл с сигнатуры снимка"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def open_snapshot(path):
+    return Snapshot(path)
+
+
+def load_graph(path):
+    """Граф из снимка; отображение файла живёт, пока жив граф"""
+    return Snapshot(path).graph
@@ -0,0 +1,346 @@
+"""Общее хранилище разрешённых графов многих проектов (SQLite)
+
+Графы проектов загружаются в одну базу, после чего вопросы по всему
+парку ("какие сервисы тянут lodash ниже 4.17.21", "кто зависит от
+этой версии") решаются индексными запросами за миллисекунды, без
+повторного разрешения зависимостей каждого проекта.
+
+Схема:
+
+    projects          проект: имя, корневой пакет, источник, время загрузки
+    packages          имена пакетов (общий словарь всех проектов)
+    versions          (пакет, версия); версия "" - неизвестна
+    project_versions  какие версии входят в граф проекта и на какой глубине
+    edges             рёбра графа проекта между версиями
+
+Обратные запросы идут по индексам project_versions(version_id) и
+edges(target_id); таблицы связей хранятся без rowid, поэтому индекс
+первичного ключа и есть сами данные. Загрузка проекта - одна транзакция:
+старые строки проекта удаляются, новые вставляются executemany пачками
+по BATCH_SIZE через временную таблицу узлов.
+"""
+
+import os
+import sqlite3
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    from . import profiling
+    from .errors import ConfigError
+    from .native import package_name
+    from .semver import compile_range, parse_version
+except ImportError:
+    import profiling
+    from errors import ConfigError
+    from native import package_name
+    from semver import compile_range, parse_version
+
+
+DEFAULT_PATH = "depviz.db"
+BATCH_SIZE = 10000
+# Параметров в одном запросе: у старых сборок SQLite предел - 999
+PARAMETER_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    root TEXT NOT NULL,
+    source TEXT,
+    ingested_at REAL NOT NULL,
+    package_count INTEGER NOT NULL,
+    edge_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    package_id INTEGER NOT NULL REFERENCES packages(id),
+    version TEXT NOT NULL,
+    UNIQUE (package_id, version)
+);
+CREATE TABLE IF NOT EXISTS project_versions (
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    version_id INTEGER NOT NULL REFERENCES versions(id),
+    depth INTEGER,
+    PRIMARY KEY (project_id, version_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS project_versions_by_version ON project_versions(version_id, project_id, depth);
+CREATE TABLE IF NOT EXISTS edges (
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    source_id INTEGER NOT NULL REFERENCES versions(id),
+    target_id INTEGER NOT NULL REFERENCES versions(id),
+    PRIMARY KEY (project_id, source_id, target_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_by_target ON edges(target_id, project_id, source_id);
+"""
+
+
+def default_path():
+    return os.environ.get("DEPVIZ_STORE") or DEFAULT_PATH
+
+
+def _chunks(rows, size=BATCH_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _depths(csr, root):
+    """Расстояния от корня в рёбрах обходом в ширину; None - узел недостижим"""
+    depths = [None] * csr.node_count
+    depths[root] = 0
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        for target in csr.successors(node):
+            if depths[target] is None:
+                depths[target] = depths[node] + 1
+                queue.append(target)
+    return depths
+
+
+def _version_order(version):
+    """Ключ сортировки версий: semver по возрастанию, нераспознанные - в конце"""
+    key = parse_version(version) if version else None
+    return (key is None, key or (), version)
+
+
+class Store:
+    """База разрешённых графов; ingest() загружает проект, остальные методы - запросы"""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        # Транзакциями управляем сами (BEGIN/COMMIT), без неявных от модуля sqlite3
+        self.db = sqlite3.connect(self.path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=OFF")
+        self.db.executescript(SCHEMA)
+        self._depth = 0
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Транзакция; вложенные блоки входят во внешнюю"""
+        if self._depth:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+        self.db.execute("BEGIN IMMEDIATE")
+        self._depth = 1
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        else:
+            self.db.execute("COMMIT")
+        finally:
+            self._depth = 0
+
+    @profiling.profiled("store.ingest")
+    def ingest(self, project, graph, root=None, source=None):
+        """Загружает (или заменяет) граф проекта; возвращает (узлов, рёбер)
+
+        root - корневой пакет графа (по умолчанию первый узел); глубина
+        узлов считается от него.
+        """
+        csr = graph.to_csr()
+        if not csr.node_count:
+            raise ConfigError(f"Пустой граф проекта {project}")
+        if root is None:
+            root = csr.names[0]
+        if root not in csr.ids:
+            raise ConfigError(f"Корневой пакет {root} не найден в графе проекта {project}")
+        versions = getattr(graph, "versions", None) or {}
+        depths = _depths(csr, csr.ids[root])
+
+        with self.transaction():
+            db = self.db
+            db.execute("INSERT INTO projects (name, root, source, ingested_at, package_count, edge_count) "
+                       "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET root = excluded.root, "
+                       "source = excluded.source, ingested_at = excluded.ingested_at, "
+                       "package_count = excluded.package_count, edge_count = excluded.edge_count",
+                       (project, root, source, time.time(), csr.node_count, csr.edge_count))
+            project_id = db.execute("SELECT id FROM projects WHERE name = ?", (project,)).fetchone()[0]
+            db.execute("DELETE FROM edges WHERE project_id = ?", (project_id,))
+            db.execute("DELETE FROM project_versions WHERE project_id = ?", (project_id,))
+
+            # Узлы проекта - во временную таблицу, затем словари пакетов и
+            # версий пополняются одним INSERT ... SELECT каждый
+            db.execute("CREATE TEMP TABLE IF NOT EXISTS staging "
+                       "(node INTEGER PRIMARY KEY, name TEXT NOT NULL, version TEXT NOT NULL, depth INTEGER)")
+            db.execute("DELETE FROM staging")
+            with profiling.phase("store.nodes"):
+                nodes = ((node, package_name(key, versions.get(key)), versions.get(key) or "", depths[node])
+                         for node, key in enumerate(csr.names))
+                for chunk in _chunks(nodes):
+                    db.executemany("INSERT INTO staging VALUES (?, ?, ?, ?)", chunk)
+                db.execute("INSERT OR IGNORE INTO packages (name) SELECT DISTINCT name FROM staging")
+                db.execute("INSERT OR IGNORE INTO versions (package_id, version) "
+                           "SELECT DISTINCT p.id, s.version FROM staging s JOIN packages p ON p.name = s.name")
+                rows = db.execute("SELECT s.node, v.id, s.depth FROM staging s "
+                                  "JOIN packages p ON p.name = s.name "
+                                  "JOIN versions v ON v.package_id = p.id AND v.version = s.version").fetchall()
+                version_ids = [0] * csr.node_count
+                for node, version_id, _ in rows:
+                    version_ids[node] = version_id
+                # Два ключа графа могут указывать на одну версию: берём меньшую глубину
+                membership = {}
+                for _, version_id, depth in rows:
+                    known = membership.get(version_id)
+                    if version_id not in membership or known is None or (depth is not None and depth < known):
+                        membership[version_id] = depth
+                for chunk in _chunks((project_id, version_id, depth) for version_id, depth in membership.items()):
+                    db.executemany("INSERT INTO project_versions VALUES (?, ?, ?)", chunk)
+                db.execute("DELETE FROM staging")
+
+            with profiling.phase("store.edges"):
+                edges = ((project_id, version_ids[source], version_ids[target])
+                         for source in range(csr.node_count) for target in csr.successors(source))
+                for chunk in _chunks(edges):
+                    db.executemany("INSERT OR IGNORE INTO edges VALUES (?, ?, ?)", chunk)
+        profiling.count("store.nodes", csr.node_count)
+        profiling.count("store.edges", csr.edge_count)
+        return csr.node_count, csr.edge_count
+
+    def remove(self, project):
+        """Удаляет проект; False, если его не было"""
+        with self.transaction():
+            row = self.db.execute("SELECT id FROM projects WHERE name = ?", (project,)).fetchone()
+            if row is None:
+                return False
+            for table in ("edges", "project_versions"):
+                self.db.execute(f"DELETE FROM {table} WHERE project_id = ?", row)
+            self.db.execute("DELETE FROM projects WHERE id = ?", row)
+        return True
+
+    def projects(self):
+        rows = self.db.execute("SELECT name, root, source, ingested_at, package_count, edge_count "
+                               "FROM projects ORDER BY name")
+        return [{"project": name, "root": root, "source": source, "ingested_at": ingested_at,
+                 "packages": packages, "edges": edges}
+                for name, root, source, ingested_at, packages, edges in rows]
+
+    def _matching_versions(self, package, spec=None):
+        """{id версии: версия} пакета, подходящих под диапазон spec (все, если его нет)
+
+        Версий одного пакета немного, поэтому диапазон npm проверяется
+        semver.compile_range по списку, а не переводится в SQL.
+        """
+        compiled = None
+        if spec:
+            compiled = compile_range(spec)
+            if compiled is None:
+                raise ConfigError(f"Неверный диапазон версий: {spec}")
+        rows = self.db.execute("SELECT v.id, v.version FROM versions v JOIN packages p ON p.id = v.package_id "
+                               "WHERE p.name = ?", (package,))
+        return {version_id: version for version_id, version in rows
+                if compiled is None or compiled.test(version)}
+
+    def _in_versions(self, column, versions):
+        """Условия "column IN (...)" пачками по PARAMETER_LIMIT: (условие, параметры)"""
+        for chunk in _chunks(versions, PARAMETER_LIMIT):
+            yield f"{column} IN ({','.join('?' * len(chunk))})", chunk
+
+    def reach(self, package, spec=None):
+        """Проекты, в граф которых входит package (версии из диапазона spec)
+
+        Список {"project", "version", "depth"} по проектам и версиям.
+        """
+        versions = self._matching_versions(package, spec)
+        if not versions:
+            return []
+        result = []
+        for condition, parameters in self._in_versions("pv.version_id", versions):
+            rows = self.db.execute("SELECT p.name, pv.version_id, pv.depth FROM project_versions pv "
+                                   f"JOIN projects p ON p.id = pv.project_id WHERE {condition}", parameters)
+            result.extend({"project": name, "version": versions[version_id], "depth": depth}
+                          for name, version_id, depth in rows)
+        result.sort(key=lambda row: (row["project"], _version_order(row["version"])))
+        return result
+
+    def versions(self, package):
+        """Версии package по всему парку: {"version", "projects"} по возрастанию версии"""
+        rows = self.db.execute("SELECT v.version, COUNT(pv.project_id) FROM versions v "
+                               "JOIN packages p ON p.id = v.package_id "
+                               "JOIN project_versions pv ON pv.version_id = v.id "
+                               "WHERE p.name = ? GROUP BY v.id", (package,))
+        result = [{"version": version, "projects": count} for version, count in rows]
+        result.sort(key=lambda row: _version_order(row["version"]))
+        return result
+
+    def dependents(self, package, spec=None, project=None):
+        """Прямые зависимые пакета по обратным рёбрам: {"project", "package", "version", "dependency"}"""
+        versions = self._matching_versions(package, spec)
+        if not versions:
+            return []
+        result = []
+        for condition, parameters in self._in_versions("e.target_id", versions):
+            if project is not None:
+                condition += " AND p.name = ?"
+                parameters.append(project)
+            rows = self.db.execute("SELECT p.name, sp.name, sv.version, e.target_id FROM edges e "
+                                   "JOIN projects p ON p.id = e.project_id "
+                                   "JOIN versions sv ON sv.id = e.source_id "
+                                   "JOIN packages sp ON sp.id = sv.package_id "
+                                   f"WHERE {condition}", parameters)
+            result.extend({"project": name, "package": source, "version": version, "dependency": versions[target]}
+                          for name, source, version, target in rows)
+        result.sort(key=lambda row: (row["project"], row["package"], _version_order(row["version"])))
+        return result
+
+    def summary(self):
+        """Размер базы: число проектов, пакетов, версий и рёбер"""
+        counts = {}
+        for table in ("projects", "packages", "versions", "edges"):
+            counts[table] = self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
+
+
+def ingest_batch(store, manifest, output_dir):
+    """Загружает в хранилище графы успешных заданий пакетного режима
+
+    Проект называется по пакету задания; если пакет уже встречался в
+    пакете заданий (другой реестр или версия), проект называется по
+    каталогу задания, чтобы графы не затирали друг друга. Все задания -
+    одна транзакция. Возвращает число загруженных проектов.
+    """
+    try:
+        from .server import read_graph
+    except ImportError:
+        from server import read_graph
+
+    loaded = 0
+    names = set()
+    with store.transaction():
+        for job in manifest["jobs"]:
+            if job["status"] != "ok":
+                continue
+            project = job["package"] if job["package"] not in names else job["directory"]
+            names.add(project)
+            path = os.path.join(output_dir, job["directory"], job["outputs"]["graph"])
+            store.ingest(project, read_graph(path), job["package"], job["repository_url"])
+            loaded += 1
+    return loaded
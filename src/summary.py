@@ -0,0 +1,246 @@
+"""Сводка большого графа для отрисовки: свёрнутые поддеревья с подсчётом узлов
+
+Стоит между DependencyGraph и визуализаторами. Summarizer один раз
+строит остовное дерево обхода в ширину от корня (каждый пакет
+принадлежит первому, кто его подтянул) и запоминает размеры поддеревьев
+этого дерева одним проходом в обратном порядке обхода. Размеры разбивают
+граф без пересечений, поэтому счётчики агрегатов в сумме дают весь граф.
+
+summarize() раскрывает ветви от корня, каждый раз выбирая самую тяжёлую
+из ещё свёрнутых (куча по размеру поддерева), пока видимых пакетов
+меньше max_nodes. У одного узла раскрывается не больше top_k ветвей,
+ветви меньше min_size и узлы глубже max_depth не раскрываются. Всё
+нераскрытое под видимым узлом сворачивается в один агрегат
+"… +N (родитель)". Рёбра исходного графа переносятся на видимых
+представителей концов (пакет или агрегат, в который он свёрнут); по
+умолчанию - только рёбра между видимыми пакетами, иначе ромбы большого
+графа сводят читаемость на нет.
+
+Результат - обычный DependencyGraph, его рисуют те же ASCII, PlantUML,
+DOT и SVG. expand раскрывает выбранные пакеты полностью (вместе с путём
+к ним от корня) - так делаются уточняющие запросы к той же сводке без
+пересчёта размеров.
+"""
+
+import heapq
+from array import array
+
+try:
+    from . import profiling
+    from .dependency_graph import CSRGraph, DependencyGraph
+    from .errors import InvalidPackageNameError
+except ImportError:
+    import profiling
+    from dependency_graph import CSRGraph, DependencyGraph
+    from errors import InvalidPackageNameError
+
+
+DEFAULT_MAX_NODES = 100
+DEFAULT_TOP_K = 8
+LINKS = ("visible", "all", None)
+
+
+def aggregate_name(parent, count):
+    return f"… +{count} ({parent})"
+
+
+class GraphSummary:
+    """Сводный граф и описание агрегатов
+
+    aggregates - {имя агрегата: {"parent", "packages", "members"}}: родитель,
+    число свёрнутых пакетов и корни свёрнутых ветвей (их можно раскрыть).
+    """
+
+    def __init__(self, graph, root, aggregates, total):
+        self.graph = graph
+        self.root = root
+        self.aggregates = aggregates
+        self.total = total
+
+    @property
+    def visible(self):
+        """Число видимых пакетов (без агрегатов)"""
+        return len(self.graph.get_graph()) - len(self.aggregates)
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "total": self.total,
+            "visible": self.visible,
+            "aggregates": self.aggregates,
+            "graph": self.graph.to_dict(),
+            "versions": self.graph.versions,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Сводка из to_dict() (например, ответа сервера /summary)"""
+        graph = DependencyGraph(data["graph"])
+        graph.versions = dict(data.get("versions") or {})
+        return cls(graph, data["root"], data["aggregates"], data["total"])
+
+
+class Summarizer:
+    """Остовное дерево и размеры поддеревьев графа от root; summarize() - сводки"""
+
+    def __init__(self, graph, root):
+        with profiling.phase("summary.build"):
+            csr = self.csr = graph.to_csr()
+            self.versions = getattr(graph, "versions", None) or {}
+            self.root = root
+            root_id = csr.ids.get(root)
+            if root_id is None:
+                raise InvalidPackageNameError(f"Пакет '{root}' не найден в графе")
+            self.root_id = root_id
+
+            parent = array('i', [-1]) * csr.node_count
+            depth = array('i', [-1]) * csr.node_count
+            depth[root_id] = 0
+            order = [root_id]
+            for node in order:
+                step = depth[node] + 1
+                for target in csr.successors(node):
+                    if depth[target] < 0:
+                        depth[target] = step
+                        parent[target] = node
+                        order.append(target)
+            self.order, self.parent, self.depth = order, parent, depth
+
+            # Обратный порядок обхода: дети раньше родителей
+            size = array('i', [0]) * csr.node_count
+            for node in reversed(order):
+                size[node] += 1
+                if node != root_id:
+                    size[parent[node]] += size[node]
+            self.sizes = size
+            self.tree = CSRGraph.from_edges(csr.names, [parent[node] for node in order[1:]], order[1:])
+
+    @property
+    def total(self):
+        return len(self.order)
+
+    def node(self, package):
+        node = self.csr.ids.get(package)
+        if node is None or self.depth[node] < 0:
+            raise InvalidPackageNameError(f"Пакет '{package}' не найден в графе {self.root}")
+        return node
+
+    def size(self, package):
+        """Число пакетов в поддереве package (включая его)"""
+        return self.sizes[self.node(package)]
+
+    def _choose(self, max_nodes, top_k, min_size, max_depth, expand):
+        """Маска видимых узлов: обязательные, затем самые тяжёлые ветви в пределах бюджета"""
+        size, depth, parent, tree = self.sizes, self.depth, self.parent, self.tree
+        visible = bytearray(self.csr.node_count)
+        kept = {}
+        heap = []
+        shown = 0
+
+        def reveal(node):
+            nonlocal shown
+            visible[node] = 1
+            shown += 1
+            if node != self.root_id:
+                kept[parent[node]] = kept.get(parent[node], 0) + 1
+            for child in tree.successors(node):
+                heapq.heappush(heap, (-size[child], child))
+
+        # Раскрытые пакеты, путь к ним от корня и все их прямые зависимости
+        expanded = [self.node(package) for package in expand]
+        forced = {self.root_id}
+        for node in expanded:
+            while node >= 0 and node not in forced:
+                forced.add(node)
+                node = parent[node]
+        for node in sorted(forced, key=lambda node: depth[node]):
+            reveal(node)
+        for node in expanded:
+            for child in tree.successors(node):
+                if not visible[child]:
+                    reveal(child)
+
+        while heap and shown < max_nodes:
+            weight, node = heapq.heappop(heap)
+            if -weight < min_size:
+                break
+            if visible[node] or kept.get(parent[node], 0) >= top_k:
+                continue
+            if max_depth is not None and depth[node] > max_depth:
+                continue
+            reveal(node)
+        return visible
+
+    @profiling.profiled("summary")
+    def summarize(self, max_nodes=DEFAULT_MAX_NODES, top_k=DEFAULT_TOP_K, min_size=1, max_depth=None, expand=(),
+                  links="visible"):
+        """Сводный граф не больше чем из max_nodes видимых пакетов (плюс раскрытые expand)
+
+        links - какие рёбра вне остовного дерева переносить в сводку:
+        "visible" - только между видимыми пакетами, "all" - ещё и из/в
+        агрегаты, None - никаких (остаётся дерево).
+        """
+        if links not in LINKS:
+            raise ValueError(f"Неизвестный режим рёбер: {links} (доступны: {', '.join(map(str, LINKS))})")
+        visible = self._choose(max_nodes, top_k, min_size, max_depth, expand)
+        names, size, parent, tree = self.csr.names, self.sizes, self.parent, self.tree
+        spare = max_nodes - sum(visible)
+
+        result = DependencyGraph()
+        aggregates = {}
+        # Представитель узла в сводке: его имя или имя агрегата
+        representative = [None] * self.csr.node_count
+        root = names[self.root_id]
+        representative[self.root_id] = root
+        result.add_package(root, self.versions.get(root))
+        queue = [self.root_id]
+        for node in queue:
+            children = tree.successors(node)
+            if not children:
+                continue
+            shown = sorted((child for child in children if visible[child]), key=lambda child: -size[child])
+            hidden = [child for child in children if not visible[child]]
+            if len(hidden) == 1 and size[hidden[0]] == 1 and spare > 0:
+                # Агрегат из одного листа ничего не экономит
+                shown.append(hidden.pop())
+                spare -= 1
+
+            for child in shown:
+                key = names[child]
+                representative[child] = key
+                result.add_package(key, self.versions.get(key))
+                result.add_dependency(names[node], key)
+                queue.append(child)
+            if hidden:
+                count = sum(size[child] for child in hidden)
+                name = aggregate_name(names[node], count)
+                aggregates[name] = {"parent": names[node], "packages": count,
+                                    "members": [names[child] for child in hidden]}
+                result.add_package(name)
+                result.add_dependency(names[node], name)
+                for child in hidden:
+                    representative[child] = name
+
+        # Свёрнутые узлы наследуют представителя от родителя в дереве
+        for node in self.order:
+            if representative[node] is None:
+                representative[node] = representative[parent[node]]
+
+        if links:
+            offsets, targets = self.csr.offsets, self.csr.targets
+            for node in self.order:
+                source = representative[node]
+                if links == "visible" and source in aggregates:
+                    continue
+                for edge in range(offsets[node], offsets[node + 1]):
+                    target = representative[targets[edge]]
+                    if target != source and (links == "all" or target not in aggregates):
+                        result.add_dependency(source, target)
+        profiling.count("summary.visible", len(queue))
+        return GraphSummary(result, self.root, aggregates, self.total)
+
+
+def summarize(graph, root, max_nodes=DEFAULT_MAX_NODES, top_k=DEFAULT_TOP_K, min_size=1, max_depth=None,
+              expand=(), links="visible"):
+    """Сводка графа за один вызов (без повторного использования размеров)"""
+    return Summarizer(graph, root).summarize(max_nodes, top_k, min_size, max_depth, expand, links)
@@ -0,0 +1,44 @@
+"""Отрисовка послойной укладки в SVG"""
+
+from xml.sax.saxutils import escape
+
+try:
+    from . import profiling
+    from .layout import layered_layout
+except ImportError:
+    import profiling
+    from layout import layered_layout
+
+
+def write_svg(layout, out, versions=None):
+    """Пишет укладку в поток как самодостаточный SVG-документ"""
+    versions = versions or {}
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+              f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width:.0f}" '
+              f'height="{layout.height:.0f}" viewBox="0 0 {layout.width:.0f} {layout.height:.0f}" '
+              'font-family="monospace" font-size="12">\n'
+              '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" '
+              'markerHeight="8" orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="#555"/></marker></defs>\n'
+              '<g fill="none" stroke="#555" stroke-width="1">\n')
+    for _, _, points in layout.edges:
+        path = " L".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        out.write(f'<path d="M{path}" marker-end="url(#arrow)"/>\n')
+    out.write('</g>\n<g>\n')
+
+    for name, x, y, width, height in layout.nodes:
+        title = name if name not in versions else f"{name}@{versions[name]}"
+        out.write(f'<g><title>{escape(title)}</title>'
+                  f'<rect x="{x:.1f}" y="{y:.1f}" width="{width:.1f}" height="{height:.1f}" rx="4" '
+                  'fill="#f4f4f4" stroke="#333"/>'
+                  f'<text x="{x + width / 2:.1f}" y="{y + height / 2 + 4:.1f}" text-anchor="middle">'
+                  f'{escape(name)}</text></g>\n')
+    out.write('</g>\n</svg>\n')
+
+
+def save_svg(graph, root_package, path):
+    """Укладывает подграф root_package и сохраняет его в SVG; возвращает укладку"""
+    with profiling.phase("render.layout"):
+        layout = layered_layout(graph, root_package)
+    with profiling.phase("render.svg"), open(path, 'w', encoding='utf-8') as f:
+        write_svg(layout, f, getattr(graph, 'versions', None))
+    return layout
@@ -0,0 +1,205 @@
+"""Детерминированный генератор синтетических графов зависимостей
+
+Граф строится от корня "root" в порядке обхода в ширину: каждый узел
+получает случайное число новых зависимостей (распределение задаётся),
+так что все узлы достижимы из корня. Затем с вероятностью diamond_density
+узел получает ещё столько же зависимостей на случайные пакеты ниже по
+порядку - это ромбы, общие поддеревья; при нулевой плотности граф -
+дерево. Без циклов граф ацикличен; cycles - число добавляемых обратных
+рёбер, каждое из которых замыкает цикл. Это не число циклов в
+результате: циклы с общими узлами сливаются в одну сильно связную
+компоненту, так что компонент может получиться меньше cycles. Один и
+тот же seed всегда даёт один и тот же граф.
+"""
+
+import json
+import math
+import random
+from array import array
+
+try:
+    from .dependency_graph import CSRGraph, DependencyGraph
+except ImportError:
+    from dependency_graph import CSRGraph, DependencyGraph
+
+
+ROOT = "root"
+FANOUT_DISTRIBUTIONS = ("poisson", "geometric", "powerlaw", "fixed")
+MAX_FANOUT = 1000
+
+
+def package_name(index):
+    return ROOT if index == 0 else f"pkg-{index}"
+
+
+def package_version(index):
+    return f"{index % 5}.{index % 11}.{index % 7}"
+
+
+def _fanout_sampler(rng, distribution, mean):
+    if distribution == "fixed":
+        count = max(0, round(mean))
+        return lambda: count
+    if distribution == "poisson":
+        limit = math.exp(-mean)
+
+        def poisson():
+            # Алгоритм Кнута; для типичных средних (до ~30) достаточно быстр
+            count, product = 0, rng.random()
+            while product > limit:
+                count += 1
+                product *= rng.random()
+            return count
+        return poisson
+    if distribution == "geometric":
+        p = 1.0 / (mean + 1)
+        log_q = math.log(1 - p)
+        return lambda: int(math.log(1.0 - rng.random()) / log_q)
+    if distribution == "powerlaw":
+        # Парето с показателем 2: много листьев и немного "тяжёлых" пакетов,
+        # среднее примерно равно mean
+        scale = (mean + 1) / 2
+        return lambda: min(MAX_FANOUT, int(scale * (1.0 - rng.random()) ** -0.5) - 1)
+    raise ValueError(f"Неизвестное распределение: {distribution} (доступны: {', '.join(FANOUT_DISTRIBUTIONS)})")
+
+
+def generate_edges(size, fanout=3.0, distribution="poisson", diamond_density=0.3, cycles=0, seed=0):
+    """(sources, targets) синтетического графа из size узлов; узел 0 - корень
+
+    cycles - число обратных рёбер (по одному на цикл; в графе почти из
+    одних листьев за cycles * 20 попыток их может найтись меньше);
+    пересекающиеся циклы образуют общую компоненту, поэтому компонент
+    может быть меньше.
+    """
+    if size < 1:
+        raise ValueError("Размер графа должен быть положительным")
+    rng = random.Random(seed)
+    sample = _fanout_sampler(rng, distribution, fanout)
+    sources = array('i')
+    targets = array('i')
+    fresh = 1  # следующий ещё не подключённый узел
+    for node in range(size):
+        children = sample()
+        if children == 0 and node == fresh - 1 and fresh < size:
+            # Граница обхода исчерпана: без ребра оставшиеся узлы станут недостижимы
+            children = 1
+        children = min(children, size - fresh)
+        sources.extend([node] * children)
+        targets.extend(range(fresh, fresh + children))
+        fresh += children
+
+        # Ромбы: дополнительные зависимости на любые пакеты ниже по порядку
+        extra = sample() if node < size - 1 and rng.random() < diamond_density else 0
+        chosen = set(range(fresh - children, fresh))
+        for _ in range(extra):
+            target = rng.randrange(node + 1, size)
+            if target not in chosen:
+                chosen.add(target)
+                sources.append(node)
+                targets.append(target)
+
+    if cycles:
+        dag = CSRGraph.from_edges(range(size), sources, targets, ids={})
+        added = 0
+        attempts = 0
+        while added < cycles and attempts < cycles * 20:
+            attempts += 1
+            start = rng.randrange(size)
+            node = start
+            for _ in range(rng.randint(1, 8)):
+                successors = dag.successors(node)
+                if not successors:
+                    break
+                node = successors[rng.randrange(len(successors))]
+            if node == start:
+                continue
+            # node достижим из start, значит ребро node -> start замыкает цикл
+            sources.append(node)
+            targets.append(start)
+            added += 1
+    return sources, targets
+
+
+def generate_graph(size, fanout=3.0, distribution="poisson", diamond_density=0.3, cycles=0, seed=0,
+                   compact=True):
+    """Синтетический DependencyGraph с версиями; корень называется ROOT
+
+    В компактном режиме CSR строится сразу из массивов рёбер, без
+    поштучного add_dependency, - так граф на миллион узлов создаётся за
+    секунды.
+    """
+    sources, targets = generate_edges(size, fanout, distribution, diamond_density, cycles, seed)
+    names = [package_name(i) for i in range(size)]
+    if compact:
+        graph = DependencyGraph.from_csr(CSRGraph.from_edges(names, sources, targets))
+        graph.versions = {}
+    else:
+        graph = DependencyGraph({name: [] for name in names})
+        for source, target in zip(sources, targets):
+            graph.add_dependency(names[source], names[target])
+    graph.versions.update((name, package_version(i)) for i, name in enumerate(names))
+    return graph
+
+
+def write_test_graph(graph, path):
+    """Сохраняет граф в формате тестовых файлов {пакет: [зависимости]}"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (package, deps) in enumerate(graph.dependencies.items()):
+            f.write((",\n" if i else "\n") + json.dumps(package) + ": " + json.dumps(list(deps)))
+        f.write("\n}\n")
+
+
+def write_package_lock(graph, path, root=ROOT):
+    """Сохраняет граф как плоский package-lock.json v3 (все пакеты в node_modules)"""
+    versions = graph.versions
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"name": %s, "lockfileVersion": 3, "packages": {' % json.dumps(root))
+        for i, (package, deps) in enumerate(graph.dependencies.items()):
+            location = "" if package == root else f"node_modules/{package}"
+            entry = {"name": package, "version": versions.get(package, "0.0.0"),
+                     "dependencies": {dep: "*" for dep in deps}}
+            f.write((",\n" if i else "\n") + json.dumps(location) + ": " + json.dumps(entry))
+        f.write("\n}}\n")
+
+
+def write_npm_ls(graph, path, root=ROOT):
+    """Сохраняет граф как вывод `npm ls --all --json`
+
+    Зависимости пакета раскрываются при первом вхождении, повторные
+    вхождения сокращены до версии - как у npm для "deduped" пакетов.
+    Обход итеративный, поэтому глубина вложенности не ограничена.
+    """
+    csr = graph.to_csr()
+    versions = graph.versions
+    names = csr.names
+    seen = bytearray(csr.node_count)
+
+    def header(node):
+        return '"version": %s' % json.dumps(versions.get(names[node], "0.0.0"))
+
+    node = csr.ids[root]
+    seen[node] = 1
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"name": %s, %s' % (json.dumps(root), header(node)))
+        stack = []
+        children = iter(csr.successors(node))
+        first = True
+        while True:
+            child = next(children, None)
+            if child is None:
+                f.write("}" if first else "}}")
+                if not stack:
+                    break
+                children, first = stack.pop()
+                continue
+            f.write(', "dependencies": {' if first else ", ")
+            first = False
+            f.write("%s: {%s" % (json.dumps(names[child]), header(child)))
+            if seen[child]:
+                f.write("}")
+                continue
+            seen[child] = 1
+            stack.append((children, first))
+            children, first = iter(csr.successors(child)), True
+        f.write("\n")
@@ -1,60 +1,64 @@
-import os
-import subprocess
-from typing import Dict, Set
+import io
+
+try:
+    from . import profiling
+    from .exporters import PlantUMLExporter
+    from .native import compare_graphs, read_npm_ls
+    from .svg_renderer import save_svg
+    from .html_viewer import save_html
+except ImportError:
+    import profiling
+    from exporters import PlantUMLExporter
+    from native import compare_graphs, read_npm_ls
+    from svg_renderer import save_svg
+    from html_viewer import save_html
 
 
 class DependencyVisualizer:
     def __init__(self, dependency_graph):
         self.graph = dependency_graph
 
-    def generate_plantuml(self, root_package: str) -> str:
-        lines = ["@startuml", "skinparam monochrome true", "left to right direction"]
-
-        visited = set()
+    def write_plantuml(self, root_package: str, out) -> int:
+        """Пишет PlantUML в поток по мере обхода графа; возвращает число рёбер"""
+        exporter = PlantUMLExporter(out, getattr(self.graph, 'versions', None))
+        with profiling.phase("render.plantuml"):
+            return exporter.export(self.graph, root_package)
 
-        def add_dependencies(pkg: str, depth: int = 0):
-            if pkg in visited or depth > 10:
-                return
-            visited.add(pkg)
+    def generate_plantuml(self, root_package: str) -> str:
+        output = io.StringIO()
+        self.write_plantuml(root_package, output)
+        return output.getvalue()
 
-            if hasattr(self.graph, 'dependencies') and pkg in self.graph.dependencies:
-                for dep in self.graph.dependencies[pkg]:
-                    lines.append(f'["{pkg}"] --> ["{dep}"]')
-                    add_dependencies(dep, depth + 1)
-            elif hasattr(self.graph, 'get_graph'):
-                deps = self.graph.get_graph().get(pkg, [])
-                for dep in deps:
-                    lines.append(f'["{pkg}"] --> ["{dep}"]')
-                    add_dependencies(dep, depth + 1)
+    def save_svg(self, root_package: str, output_path: str):
+        """Рисует граф встроенной послойной укладкой, без сервера PlantUML"""
+        layout = save_svg(self.graph, root_package, output_path)
+        print(f"SVG сохранен: {output_path} ({len(layout.nodes)} узлов)")
+        return output_path
 
-        add_dependencies(root_package)
-        lines.append("@enduml")
-        return "\n".join(lines)
+    def save_html(self, root_package: str, output_path: str):
+        """Силовая укладка в интерактивной HTML-странице (canvas, сдвиг, масштаб, поиск)"""
+        layout = save_html(self.graph, root_package, output_path)
+        print(f"HTML сохранен: {output_path} ({len(layout)} узлов)")
+        return output_path
 
     def save_plantuml_image(self, root_package: str, output_path: str):
-        plantuml_code = self.generate_plantuml(root_package)
+        if output_path.endswith('.svg'):
+            return self.save_svg(root_package, output_path)
         puml_file = output_path.replace('.png', '.puml')
-        with open(puml_file, 'w') as f:
-            f.write(plantuml_code)
+        with open(puml_file, 'w', encoding='utf-8') as f:
+            self.write_plantuml(root_package, f)
         print(f"PlantUML код сохранен: {puml_file}")
-        print("Для создания PNG используйте: https://www.plantuml.com/plantuml/uml/")
-
-    def compare_with_native_tools(self, root_package: str) -> Dict:
-        our_deps = set()
-
-        if hasattr(self.graph, 'dependencies') and root_package in self.graph.dependencies:
-            our_deps = set(self.graph.dependencies[root_package])
-        elif hasattr(self.graph, 'get_graph'):
-            graph_data = self.graph.get_graph()
-            our_deps = set(graph_data.get(root_package, []))
-
-        return {
-            'package': root_package,
-            'our_dependencies': our_deps,
-            'native_dependencies': set(),
-            'differences': {
-                'missing_in_native': list(our_deps),
-                'missing_in_our': [],
-                'version_differences': []
-            }
-        }
\ No newline at end of file
+        svg_file = puml_file.rsplit('.', 1)[0] + '.svg'
+        return self.save_svg(root_package, svg_file)
+
+    def compare_with_native_tools(self, root_package: str, native):
+        """Сравнивает граф с выводом `npm ls --all --json` (путь) или готовым графом
+
+        Возвращает NativeComparison; to_dict() - машиночитаемый отчёт.
+        """
+        problems = []
+        if isinstance(native, str):
+            native = read_npm_ls(native, problems=problems)
+        comparison = compare_graphs(self.graph, native, root_package)
+        comparison.problems = problems
+        return comparison
@@ -0,0 +1,51 @@
+import io
+import unittest
+
+from src.ascii_tree import generate_ascii_tree, write_ascii_tree
+from src.dependency_graph import DependencyGraph
+
+
+class TestAsciiTree(unittest.TestCase):
+    def test_layout(self):
+        graph = {"react": ["prop-types", "loose-envify"], "loose-envify": ["js-tokens"]}
+        self.assertEqual(generate_ascii_tree(graph, "react"), (
+            "└── react\n"
+            "    ├── prop-types\n"
+            "    └── loose-envify\n"
+            "        └── js-tokens\n"
+        ))
+
+    def test_cycle_is_marked(self):
+        graph = {"A": ["B", "C"], "B": ["C", "D"], "C": ["E"], "D": ["A"], "E": []}
+        tree = generate_ascii_tree(DependencyGraph(graph), "A")
+        self.assertIn("└── A (цикл)", tree)
+        self.assertIn("└── C (см. выше)", tree)
+        self.assertEqual(tree.count("\n"), 7)
+
+    def test_diamonds_render_in_linear_time(self):
+        # 40 уровней ромбов: без пометок дерево имело бы 2^40 строк
+        graph = {}
+        for level in range(40):
+            graph[f"n{level}"] = [f"l{level}", f"r{level}"]
+            graph[f"l{level}"] = [f"n{level + 1}"]
+            graph[f"r{level}"] = [f"n{level + 1}"]
+        out = io.StringIO()
+        written = write_ascii_tree(graph, "n0", out)
+        self.assertEqual(written, 161)
+
+    def test_deep_chain_does_not_recurse(self):
+        # Глубина больше предела рекурсии Python
+        graph = {f"p{i}": [f"p{i + 1}"] for i in range(3000)}
+        written = write_ascii_tree(graph, "p0", io.StringIO())
+        self.assertEqual(written, 3001)
+
+    def test_budgets(self):
+        graph = {f"p{i}": [f"p{i + 1}"] for i in range(100)}
+        self.assertIn("p3 (...)", generate_ascii_tree(graph, "p0", max_depth=3))
+        tree = generate_ascii_tree(graph, "p0", max_nodes=5)
+        self.assertEqual(tree.count("\n"), 6)
+        self.assertTrue(tree.endswith("(вывод ограничен 5 узлами)\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+
+from src.audit import AdvisoryIndex, audit_graph, graph_packages, load_advisories
+from src.dependency_graph import DependencyGraph
+from src.errors import InvalidURLError
+from src.synthetic import generate_graph, package_version
+
+
+def osv(advisory_id, name, events=(), versions=(), severity="HIGH", ecosystem="npm"):
+    affected = {"package": {"ecosystem": ecosystem, "name": name}, "versions": list(versions)}
+    if events:
+        affected["ranges"] = [{"type": "SEMVER", "events": list(events)}]
+    return {"id": advisory_id, "summary": f"{advisory_id} in {name}", "affected": [affected],
+            "database_specific": {"severity": severity}}
+
+
+def matches(index, name, version):
+    return [index.advisories[i].id for i in index.match(name, version)]
+
+
+class TestAdvisoryIndex(unittest.TestCase):
+    def test_osv_events(self):
+        index = AdvisoryIndex()
+        index.add(osv("A", "lodash", [{"introduced": "0"}, {"fixed": "4.17.21"}]))
+        index.add(osv("B", "lodash", [{"introduced": "4.0.0"}, {"last_affected": "4.17.5"},
+                                      {"introduced": "4.17.10"}]))
+        index.add(osv("C", "lodash", versions=["3.10.1"]))
+        index.add(osv("D", "lodash", [{"introduced": "1.0.0"}, {"fixed": "1.2.0"}], ecosystem="PyPI"))
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(matches(index, "lodash", "3.10.1"), ["A", "C"])
+        self.assertEqual(matches(index, "lodash", "4.0.0"), ["A", "B"])
+        self.assertEqual(matches(index, "lodash", "4.17.5"), ["A", "B"])
+        self.assertEqual(matches(index, "lodash", "4.17.6"), ["A"])
+        self.assertEqual(matches(index, "lodash", "4.17.21"), ["B"])
+        self.assertEqual(matches(index, "lodash", "4.17.21-beta.1"), ["A", "B"])
+        self.assertEqual(matches(index, "lodash", "5.0.0"), ["B"])
+        self.assertEqual(matches(index, "express", "1.0.0"), [])
+        self.assertEqual(index.advisories[0].fixed, {"lodash": ["4.17.21"]})
+
+    def test_github_format(self):
+        index = AdvisoryIndex()
+        index.add({"ghsa_id": "GHSA-1", "cve_id": "CVE-1", "summary": "Pollution", "severity": "critical",
+                   "vulnerabilities": [
+                       {"package": {"ecosystem": "npm", "name": "minimist"},
+                        "vulnerable_version_range": ">= 1.0.0, < 1.2.6",
+                        "first_patched_version": {"identifier": "1.2.6"}},
+                       {"package": {"ecosystem": "npm", "name": "minimist"},
+                        "vulnerable_version_range": "< 0.2.4 || = 0.2.5"},
+                   ]})
+        index.add({"ghsa_id": "GHSA-2", "withdrawn_at": "2023-01-01", "vulnerabilities": [
+            {"package": {"ecosystem": "npm", "name": "minimist"}, "vulnerable_version_range": "*"}]})
+        self.assertEqual(len(index), 1)
+        for version, expected in (("1.2.5", ["GHSA-1"]), ("1.2.6", []), ("0.2.4", []), ("0.2.5", ["GHSA-1"]),
+                                  ("0.0.1", ["GHSA-1"])):
+            self.assertEqual(matches(index, "minimist", version), expected, version)
+        advisory = index.advisories[0]
+        self.assertEqual((advisory.severity, advisory.aliases, advisory.fixed),
+                         ("critical", ["CVE-1"], {"minimist": ["1.2.6"]}))
+
+    def test_dump_formats(self):
+        documents = [osv("A", "a", [{"introduced": "0"}]), osv("B", "b", [{"introduced": "0"}])]
+        with tempfile.TemporaryDirectory() as directory:
+            nested = os.path.join(directory, "tree", "2024", "01")
+            os.makedirs(nested)
+            for document in documents:
+                with open(os.path.join(nested, document["id"] + ".json"), "w") as f:
+                    json.dump(document, f)
+            archive = os.path.join(directory, "all.zip")
+            with zipfile.ZipFile(archive, "w") as f:
+                for document in documents:
+                    f.writestr(document["id"] + ".json", json.dumps(document))
+            lines = os.path.join(directory, "advisories.jsonl")
+            with open(lines, "w") as f:
+                f.write("\n".join(json.dumps(document) for document in documents) + "\n")
+            array = os.path.join(directory, "advisories.json")
+            with open(array, "w") as f:
+                json.dump(documents, f)
+
+            for path in (os.path.join(directory, "tree"), archive, lines, array):
+                index = load_advisories(path)
+                self.assertEqual([advisory.id for advisory in index.advisories], ["A", "B"], path)
+            with self.assertRaises(InvalidURLError):
+                load_advisories(os.path.join(directory, "missing.json"))
+
+
+class TestAuditGraph(unittest.TestCase):
+    def test_findings_with_paths(self):
+        graph = DependencyGraph({"app": ["express", "utils"], "express": ["qs", "debug"], "utils": ["qs@6.5.0"],
+                                 "qs": [], "qs@6.5.0": [], "debug": []})
+        graph.versions = {"app": "1.0.0", "express": "4.17.0", "utils": "1.0.0", "qs": "6.11.0",
+                          "qs@6.5.0": "6.5.0", "debug": "2.6.8"}
+        index = AdvisoryIndex()
+        index.add(osv("QS", "qs", [{"introduced": "6.0.0"}, {"fixed": "6.5.3"}], severity="HIGH"))
+        index.add(osv("DEBUG", "debug", [{"introduced": "0"}, {"fixed": "2.6.9"}], severity="LOW"))
+
+        report = audit_graph(graph, index, "app", paths=2)
+        self.assertEqual([(f["node"], f["depth"]) for f in report.findings], [("qs@6.5.0", 2), ("debug", 2)])
+        self.assertEqual(report.findings[0]["paths"], [["app", "utils", "qs@6.5.0"]])
+        self.assertEqual((report.checked, report.unversioned), (6, 0))
+        data = report.to_dict()
+        self.assertEqual(data["findings"][0]["advisories"], ["QS"])
+        self.assertEqual(set(data["advisories"]), {"QS", "DEBUG"})
+
+        self.assertEqual([f["package"] for f in audit_graph(graph, index, "app", min_severity="high").findings],
+                         ["qs"])
+
+        only_debug = AdvisoryIndex({"debug"})
+        only_debug.add(osv("QS", "qs", [{"introduced": "0"}]))
+        only_debug.add(osv("DEBUG", "debug", [{"introduced": "0"}]))
+        self.assertEqual([advisory.id for advisory in only_debug.advisories], ["DEBUG"])
+
+    def test_large_graph_is_fast(self):
+        graph = generate_graph(20000, seed=3)
+        index = AdvisoryIndex(graph_packages(graph))
+        for i in range(20000):
+            name = f"pkg-{i}"
+            index.add(osv(f"ADV-{i}", name, [{"introduced": "0"}, {"fixed": "0.0.0"}]))
+            index.add(osv(f"HIT-{i}", name, [{"introduced": package_version(i)}, {"last_affected": "9.0.0"}])
+                      if i % 1000 == 1 else osv(f"MISS-{i}", name, versions=["9.9.9"]))
+        started = time.perf_counter()
+        report = audit_graph(graph, index, "root")
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(len(report.findings), 20)
+        self.assertTrue(all(finding["paths"][0][0] == "root" for finding in report.findings))
+
+
+if __name__ == "__main__":
+    unittest.main()
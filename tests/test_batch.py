@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.batch import run_batch
+from src.config import Config, load_configs
+from tests.test_npm_client import ROOT, LocalRegistry, make_packument
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_dir = os.path.join(self.tmp.name, "out")
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmp.name, "config.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("package_name,repository_url,test_mode,ascii_tree_output\n")
+            for row in rows:
+                f.write(",".join(row) + "\n")
+        return path
+
+    def test_every_row_is_loaded(self):
+        path = self.write_csv([("A", "repo.json", "true", "false"), ("B", "x", "false", "true"), ("", "", "", "")])
+        configs = load_configs(path)
+        self.assertEqual([c.package_name for c in configs], ["A", "B"])
+        self.assertEqual([c.test_mode for c in configs], [True, False])
+        config = Config()
+        config.load_from_csv(path)
+        self.assertEqual(config.package_name, "A")
+
+    def test_jobs_write_outputs_and_manifest(self):
+        packuments = {
+            "svc1": make_packument("svc1", "1.0.0", {"shared": "^1.0.0"}),
+            "svc2": make_packument("svc2", "1.0.0", {"shared": "^1.0.0"}),
+            "shared": make_packument("shared", "1.0.0", {"leaf": "*"}),
+            "leaf": make_packument("leaf", "1.0.0", {}),
+        }
+        registry = LocalRegistry(packuments)
+        with registry:
+            path = self.write_csv([
+                ("A", os.path.join(ROOT, "test_repository.json"), "true", "true"),
+                ("svc1", registry.url, "false", "false"),
+                ("svc2", registry.url, "false", "false"),
+                ("broken", os.path.join(self.tmp.name, "missing", "package-lock.json"), "false", "false"),
+            ])
+            manifest = run_batch(load_configs(path), self.output_dir, workers=2,
+                                 cache_dir=os.path.join(self.tmp.name, "cache"), progress=None)
+
+        with open(os.path.join(self.output_dir, "manifest.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), manifest)
+        self.assertEqual([job["row"] for job in manifest["jobs"]], [1, 2, 3, 4])
+        self.assertEqual(manifest["failed"], 1)
+        self.assertIn("InvalidURLError", manifest["jobs"][3]["error"])
+
+        first = manifest["jobs"][0]
+        self.assertEqual(first["nodes"], 5)
+        self.assertEqual(set(first["outputs"]), {"log", "graph", "load_order", "ascii_tree"})
+        directory = os.path.join(self.output_dir, first["directory"])
+        with open(os.path.join(directory, "load_order.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["cycles"], [["A", "B", "D"]])
+
+        self.assertEqual(manifest["jobs"][1]["nodes"], 3)
+        # Разрешённые узлы общие для всех процессов: svc1, svc2, shared, leaf
+        self.assertEqual(manifest["resolved_nodes"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import pickle
+import stat
+import tempfile
+import unittest
+
+from src.cache import PackumentCache
+
+
+class TestPackumentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_roundtrip_keeps_validators(self):
+        PackumentCache(self.tmp.name).put("http://r/a", {"name": "a"}, etag='"1"', last_modified="Mon")
+        entry = PackumentCache(self.tmp.name).get("http://r/a")
+        self.assertEqual(entry.data, {"name": "a"})
+        self.assertEqual(entry.etag, '"1"')
+        self.assertEqual(entry.last_modified, "Mon")
+
+    def test_entries_are_json(self):
+        directory = os.path.join(self.tmp.name, "cache")
+        # Права задаёт сам кэш, а не umask процесса
+        umask = os.umask(0)
+        try:
+            cache = PackumentCache(directory)
+        finally:
+            os.umask(umask)
+        cache.put("http://r/a", {"name": "a", "versions": {"1.0.0": {"b": "^2.0.0"}}})
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+        with open(cache._path("http://r/a"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["data"]["versions"], {"1.0.0": {"b": "^2.0.0"}})
+
+    def test_pickle_is_never_loaded(self):
+        cache = PackumentCache(self.tmp.name, memory_entries=0)
+        entry = cache.put("http://r/a", {"name": "a"})
+        with open(cache._path("http://r/a"), "wb") as f:
+            pickle.dump(entry, f)
+        self.assertIsNone(cache.get("http://r/a"))
+        # Файлы старого формата не читаются, но очищаются
+        legacy = os.path.join(self.tmp.name, "0" * 40 + ".pickle")
+        with open(legacy, "wb") as f:
+            pickle.dump(entry, f)
+        cache.clear()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_ttl(self):
+        cache = PackumentCache(self.tmp.name, ttl=60)
+        entry = cache.put("http://r/a", {})
+        self.assertTrue(cache.is_fresh(entry))
+        self.assertFalse(cache.is_fresh(entry._replace(stored_at=entry.stored_at - 61)))
+
+    def test_lru_eviction_respects_size_cap(self):
+        cache = PackumentCache(self.tmp.name, max_bytes=4000, memory_entries=0)
+        payload = {"blob": "x" * 900}
+        for i in range(3):
+            cache.put(f"http://r/{i}", payload)
+        # Запись 1 - самая давно использованная
+        os.utime(cache._path("http://r/1"), (0, 0))
+        for i in range(3, 6):
+            cache.put(f"http://r/{i}", payload)
+
+        self.assertLessEqual(cache._total_bytes, 4000)
+        self.assertIsNone(cache.get("http://r/1"))
+        self.assertIsNotNone(cache.get("http://r/5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from src.cli import cli
+from src.synthetic import ROOT
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "cli.py")
+
+
+class TestDemoVisualization(unittest.TestCase):
+    def test_native_comparison(self):
+        with tempfile.TemporaryDirectory() as directory:
+            native_dir = os.path.join(directory, "native")
+            os.makedirs(native_dir)
+            with open(os.path.join(native_dir, "WebApp.json"), "w", encoding="utf-8") as f:
+                json.dump({"name": "WebApp", "version": "1.0.0",
+                           "dependencies": {"React": {"version": "18.2.0"}, "Lodash": {"version": "4.17.21"}}}, f)
+            output_dir = os.path.join(directory, "out")
+
+            result = CliRunner().invoke(cli, ["demo-visualization", "-o", output_dir, "--native-dir", native_dir])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertNotIn("Ошибка", result.output)
+            with open(os.path.join(output_dir, "WebApp_comparison.json"), encoding="utf-8") as f:
+                report = json.load(f)
+            self.assertEqual(report["differences"]["missing_in_our"], ["Lodash"])
+            with open(os.path.join(output_dir, "react_comparison.txt"), encoding="utf-8") as f:
+                self.assertIn("сравнение не выполнялось", f.read())
+
+
+class TestFakeRegistry(unittest.TestCase):
+    def test_advertised_command_works(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DEPVIZ_CACHE_DIR=directory)
+            process = subprocess.Popen([sys.executable, "-u", CLI, "fake-registry", "--synthetic", "30", "--port", "0"],
+                                       stdout=subprocess.PIPE, text=True, env=env)
+            self.addCleanup(process.wait)
+            self.addCleanup(process.kill)
+            self.addCleanup(process.stdout.close)
+            for line in process.stdout:
+                if line.startswith("Клиенты:"):
+                    break
+            command = re.search(r"depviz (.+?) \(", line).group(1).replace("PACKAGE", ROOT).split()
+
+            result = CliRunner(env={"DEPVIZ_CACHE_DIR": directory}).invoke(cli, command + ["--json"])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertNotIn("Ошибка", result.output)
+            self.assertEqual(command[0], "order")
+            self.assertEqual(json.loads(result.stdout)["packages"], 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
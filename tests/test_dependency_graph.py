@@ -0,0 +1,72 @@
+import unittest
+
+from src.dependency_graph import DependencyGraph
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            "react": ["prop-types", "loose-envify"],
+            "prop-types": ["loose-envify"],
+            "loose-envify": ["js-tokens"],
+            "js-tokens": [],
+        }
+
+    def test_duplicate_edges_are_ignored(self):
+        for compact in (False, True):
+            with self.subTest(compact=compact):
+                graph = DependencyGraph(compact=compact)
+                for _ in range(3):
+                    graph.add_dependency("a", "b")
+                    graph.add_dependency("a", "c")
+                self.assertEqual(graph.get_dependencies("a"), ["b", "c"])
+
+    def test_compact_mode_keeps_dict_api(self):
+        graph = DependencyGraph(self.data, compact=True)
+        self.assertEqual(graph.get_dependencies("react"), ["prop-types", "loose-envify"])
+        self.assertEqual(graph.get_dependencies("unknown"), [])
+        self.assertIn("js-tokens", graph.dependencies)
+        self.assertEqual(graph.dependencies["loose-envify"], ["js-tokens"])
+        self.assertEqual(graph.to_dict(), self.data)
+        self.assertEqual(len(graph.get_graph()), 4)
+
+    def test_csr_layout(self):
+        csr = DependencyGraph(self.data, compact=True).to_csr()
+        self.assertEqual(csr.names, ["react", "prop-types", "loose-envify", "js-tokens"])
+        self.assertEqual(list(csr.offsets), [0, 2, 3, 4, 4])
+        self.assertEqual(list(csr.targets), [1, 2, 2, 3])
+        # Обычный режим даёт то же CSR-представление
+        plain = DependencyGraph(self.data).to_csr()
+        self.assertEqual(list(plain.targets), list(csr.targets))
+
+    def test_adding_after_freeze(self):
+        graph = DependencyGraph(self.data, compact=True)
+        graph.freeze()
+        graph.add_dependency("react", "prop-types")
+        graph.add_dependency("js-tokens", "scheduler")
+        self.assertEqual(graph.get_dependencies("react"), ["prop-types", "loose-envify"])
+        self.assertEqual(graph.get_dependencies("js-tokens"), ["scheduler"])
+
+    def test_add_package_after_freeze(self):
+        graph = DependencyGraph(compact=True)
+        graph.add_dependency("a", "b")
+        self.assertEqual(graph.get_dependencies("a"), ["b"])
+        graph.add_package("c", "1.0.0")
+        self.assertEqual(graph.get_dependencies("c"), [])
+        self.assertEqual(graph.to_dict(), {"a": ["b"], "b": [], "c": []})
+        self.assertEqual(graph.to_csr().node_count, 3)
+
+    @unittest.skipIf(numpy is None, "NumPy не установлен")
+    def test_numpy_view(self):
+        offsets, targets = DependencyGraph(self.data, compact=True).to_csr().as_numpy()
+        self.assertEqual(offsets.tolist(), [0, 2, 3, 4, 4])
+        self.assertEqual(targets.tolist(), [1, 2, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
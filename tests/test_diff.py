@@ -0,0 +1,110 @@
+import os
+import struct
+import tempfile
+import time
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.diff import diff_graphs
+from src.merkle import compute_hashes, node_hashes
+from src.snapshot import open_snapshot, save_snapshot
+from src.synthetic import generate_graph
+
+
+def graph_of(dependencies, versions=None):
+    graph = DependencyGraph(dependencies)
+    graph.versions = dict(versions or {})
+    return graph
+
+
+class TestMerkleHashes(unittest.TestCase):
+    def hashes(self, graph):
+        csr, hashes = node_hashes(graph)
+        return {name: hashes[i] for i, name in enumerate(csr.names)}
+
+    def test_edge_order_does_not_matter(self):
+        first = self.hashes(graph_of({"app": ["a", "b"], "a": [], "b": []}))
+        second = self.hashes(graph_of({"app": ["b", "a"], "b": [], "a": []}))
+        self.assertEqual(first, second)
+
+    def test_changes_propagate_to_ancestors_only(self):
+        before = self.hashes(graph_of({"app": ["a", "b"], "a": ["c"], "b": [], "c": []}, {"c": "1.0.0"}))
+        after = self.hashes(graph_of({"app": ["a", "b"], "a": ["c"], "b": [], "c": []}, {"c": "1.0.1"}))
+        self.assertEqual([name for name in before if before[name] != after[name]], ["app", "a", "c"])
+
+    def test_cycles(self):
+        cyclic = {"app": ["a"], "a": ["b"], "b": ["a", "c"], "c": []}
+        hashes = self.hashes(graph_of(cyclic))
+        self.assertNotEqual(hashes["a"], hashes["b"])
+        self.assertEqual(hashes, self.hashes(graph_of(dict(cyclic))))
+        changed = self.hashes(graph_of({**cyclic, "c": ["d"], "d": []}))
+        self.assertNotEqual(hashes["a"], changed["a"])
+        self.assertNotEqual(hashes["b"], changed["b"])
+
+
+class TestGraphDiff(unittest.TestCase):
+    def test_identical(self):
+        graph = {"app": ["a"], "a": []}
+        result = diff_graphs(graph_of(graph), graph_of(graph))
+        self.assertTrue(result.identical)
+        self.assertEqual(result.compared, 0)
+
+    def test_reports_packages_versions_and_edges(self):
+        old = graph_of({"app": ["a", "b"], "a": ["c"], "b": ["c"], "c": [], "gone": []},
+                       {"app": "1.0.0", "a": "1.0.0", "b": "1.0.0", "c": "1.0.0"})
+        old.add_dependency("b", "gone")
+        new = graph_of({"app": ["a", "b"], "a": ["c"], "b": ["c", "d"], "c": [], "d": []},
+                       {"app": "1.0.0", "a": "1.0.0", "b": "1.1.0", "c": "1.0.0", "d": "0.1.0"})
+        result = diff_graphs(old, new, "app")
+        self.assertFalse(result.identical)
+        self.assertEqual(result.added, [("d", "0.1.0")])
+        self.assertEqual(result.removed, [("gone", None)])
+        self.assertEqual(result.changed, [("b", "1.0.0", "1.1.0")])
+        self.assertEqual(result.edges_added, [("b", "d")])
+        self.assertEqual(result.edges_removed, [("b", "gone")])
+        # a и c не изменились - их поддерево отсечено по хешу
+        self.assertEqual(result.compared, 4)
+        self.assertEqual(result.to_dict()["packages"]["version_changed"], [{"name": "b", "from": "1.0.0", "to": "1.1.0"}])
+
+    def test_snapshots_store_hashes_and_diff_in_milliseconds(self):
+        old = generate_graph(100000, seed=7)
+        new = generate_graph(100000, seed=7)
+        new.versions = dict(new.versions)
+        new.versions["pkg-4242"] = "9.9.9"
+        new.add_dependency("pkg-90000", "brand-new")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            old_path, new_path = os.path.join(tmp, "old.snap"), os.path.join(tmp, "new.snap")
+            save_snapshot(old, old_path)
+            save_snapshot(new, new_path)
+            old_snapshot, new_snapshot = open_snapshot(old_path), open_snapshot(new_path)
+            self.addCleanup(old_snapshot.close)
+            self.addCleanup(new_snapshot.close)
+            self.assertEqual(list(old_snapshot.merkle), node_hashes(old)[1])
+
+            started = time.perf_counter()
+            result = diff_graphs(old_snapshot.graph, new_snapshot.graph)
+            self.assertLess(time.perf_counter() - started, 0.5)
+
+        self.assertEqual(result.root, "root")
+        self.assertEqual(result.changed, [("pkg-4242", "2.7.0", "9.9.9")])
+        self.assertEqual(result.added, [("brand-new", None)])
+        self.assertEqual(result.edges_added, [("pkg-90000", "brand-new")])
+        self.assertLess(result.compared, 1000)
+
+    def test_snapshots_without_hashes_are_still_readable(self):
+        graph = graph_of({"app": ["a"], "a": []})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.snap")
+            save_snapshot(graph, path)
+            with open(path, "r+b") as f:
+                f.seek(12)
+                f.write(struct.pack("<I", 0))
+            with open_snapshot(path) as snapshot:
+                self.assertIsNone(snapshot.merkle)
+                self.assertEqual(snapshot.graph.to_dict(), graph.to_dict())
+                self.assertEqual(node_hashes(snapshot.graph)[1], compute_hashes(graph.to_csr()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from src.dependency_graph import DependencyGraph
+from src.exporters import export_graph, export_to_file, iter_edges
+
+
+class TestExporters(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph({"A": ["B", "C"], "B": ["C", "D"], "C": ["E"], "D": ["A"], "E": []})
+        self.graph.versions = {"A": "1.0.0", "B": "2.0.0"}
+
+    def export(self, fmt, graph=None, root="A"):
+        out = io.StringIO()
+        edges = export_graph(graph or self.graph, root, fmt, out)
+        return edges, out.getvalue()
+
+    def test_edges_follow_depth_first_order(self):
+        self.assertEqual(list(iter_edges(self.graph, "A")), [
+            ("A", "B"), ("B", "C"), ("C", "E"), ("B", "D"), ("D", "A"), ("A", "C")])
+
+    def test_no_depth_cutoff(self):
+        chain = DependencyGraph({f"p{i}": [f"p{i + 1}"] for i in range(5000)})
+        edges, text = self.export("plantuml", chain, "p0")
+        self.assertEqual(edges, 5000)
+        self.assertIn('["p4999"] --> ["p5000"]', text)
+
+    def test_plantuml(self):
+        edges, text = self.export("plantuml")
+        self.assertEqual(edges, 6)
+        self.assertTrue(text.startswith("@startuml\n"))
+        self.assertTrue(text.endswith("@enduml\n"))
+
+    def test_dot(self):
+        _, text = self.export("dot")
+        self.assertIn('"D" -> "A";', text)
+        self.assertIn('"A" [tooltip="1.0.0"];', text)
+
+    def test_graphml(self):
+        _, text = self.export("graphml")
+        ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+        root = ET.fromstring(text.encode("utf-8"))
+        self.assertEqual(len(root.findall(".//g:node", ns)), 5)
+        self.assertEqual(len(root.findall(".//g:edge", ns)), 6)
+
+    def test_json(self):
+        _, text = self.export("json")
+        document = json.loads(text)
+        self.assertEqual(document["root"], "A")
+        self.assertEqual(len(document["edges"]), 6)
+        self.assertEqual(document["nodes"][0], {"name": "A", "version": "1.0.0"})
+
+    def test_ndjson(self):
+        _, text = self.export("ndjson")
+        records = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(sum(r["type"] == "node" for r in records), 5)
+        self.assertEqual(sum(r["type"] == "edge" for r in records), 6)
+
+    def test_gzip_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.ndjson.gz")
+            export_to_file(self.graph, "A", "ndjson", path)
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import http.client
+import os
+import tempfile
+import time
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.fake_registry import DirectorySource, FakeRegistry, FaultInjector, GraphSource, RecordingSource, \
+    running_registry
+from src.http_pool import ConnectionPool
+from src.npm_client import NPMClient
+from src.scheduler import RequestScheduler
+from src.synthetic import generate_graph
+
+
+def crawl(url, root, **kwargs):
+    client = NPMClient(url, **kwargs)
+    client.verbose = False
+    try:
+        return client.get_dependencies_recursive(root), client
+    finally:
+        client.close()
+
+
+class TestGraphSource(unittest.TestCase):
+    def test_crawl_reproduces_graph(self):
+        graph = DependencyGraph({"app": ["a", "@scope/b"], "a": ["c"], "@scope/b": ["c@2.0.0"], "c": [],
+                                 "c@2.0.0": ["a"]})
+        graph.versions = {"app": "1.0.0", "a": "1.1.0", "@scope/b": "0.2.0", "c": "1.0.0", "c@2.0.0": "2.0.0"}
+        registry = FakeRegistry(GraphSource(graph))
+        with running_registry(registry) as url:
+            result, _ = crawl(url, "app")
+        self.assertEqual(result.to_dict(), graph.to_dict())
+        self.assertEqual(result.versions, graph.versions)
+        self.assertEqual(registry.stats["served"], 4)
+
+    def test_missing_package(self):
+        registry = FakeRegistry(GraphSource(DependencyGraph({"app": []})))
+        with running_registry(registry) as url:
+            response = ConnectionPool().request("GET", f"{url}/nope")
+        self.assertEqual(response.status, 404)
+        self.assertEqual(registry.stats["not_found"], 1)
+
+
+class TestFaults(unittest.TestCase):
+    def test_crawl_survives_injected_faults(self):
+        graph = generate_graph(300, seed=4)
+        faults = FaultInjector(throttle_rate=0.05, error_rate=0.05, truncate_rate=0.05, retry_after=0, seed=1)
+        registry = FakeRegistry(GraphSource(graph), faults)
+        with running_registry(registry) as url:
+            result, client = crawl(url, "root", scheduler=RequestScheduler(base_delay=0.01, max_attempts=8))
+        self.assertEqual(result.to_dict(), graph.to_dict())
+        self.assertEqual(client.failed, {})
+        stats = registry.stats
+        faulted = stats["throttled"] + stats["errors"] + stats["truncated"]
+        self.assertGreater(stats["truncated"], 0)
+        self.assertEqual(client.scheduler.retries, faulted)
+        self.assertEqual(stats["requests"], 300 + faulted)
+
+    def test_truncated_body_is_an_error(self):
+        registry = FakeRegistry(GraphSource(DependencyGraph({"app": ["a" * 100 + str(i) for i in range(50)]})),
+                                FaultInjector(truncate_rate=1.0))
+        with running_registry(registry) as url:
+            for encoding in ("identity", "gzip"):
+                with self.assertRaises(http.client.IncompleteRead):
+                    ConnectionPool().request("GET", f"{url}/app", {"Accept-Encoding": encoding})
+
+    def test_rate_limit_and_latency(self):
+        now = [0.0]
+        faults = FaultInjector(rate_limit=2, clock=lambda: now[0])
+        self.assertEqual([faults.plan()[1] for _ in range(3)], [None, None, ("throttle", 1)])
+        now[0] += 0.5
+        self.assertIsNone(faults.plan()[1])
+
+        registry = FakeRegistry(GraphSource(DependencyGraph({"app": []})), FaultInjector(latency=0.1))
+        with running_registry(registry) as url:
+            started = time.perf_counter()
+            ConnectionPool().request("GET", f"{url}/app")
+            self.assertGreaterEqual(time.perf_counter() - started, 0.1)
+
+
+class TestRecording(unittest.TestCase):
+    def test_record_then_replay_offline(self):
+        graph = generate_graph(40, seed=2)
+        with tempfile.TemporaryDirectory() as directory:
+            upstream = FakeRegistry(GraphSource(graph))
+            with running_registry(upstream) as upstream_url:
+                recorder = RecordingSource(directory, upstream_url)
+                with running_registry(FakeRegistry(recorder)) as url:
+                    recorded, _ = crawl(url, "root")
+                    crawl(url, "root")
+            self.assertEqual(recorder.recorded, 40)
+            self.assertEqual(upstream.stats["served"], 40)
+            self.assertEqual(len(os.listdir(directory)), 40)
+
+            with running_registry(FakeRegistry(DirectorySource(directory))) as url:
+                replayed, _ = crawl(url, "root")
+        self.assertEqual(recorded.to_dict(), graph.to_dict())
+        self.assertEqual(replayed.to_dict(), graph.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import json
+import time
+import unittest
+
+import numpy as np
+
+from src.dependency_graph import DependencyGraph
+from src.force_layout import _repulsion, force_layout
+from src.html_viewer import write_html
+from src.synthetic import generate_graph
+
+
+class TestForceLayout(unittest.TestCase):
+    def test_repulsion_matches_direct_sum(self):
+        positions = np.random.default_rng(1).normal(size=(1500, 2)) * 100
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = (delta * delta).sum(axis=2)
+        np.fill_diagonal(distance, np.inf)
+        exact = (delta / distance[..., None]).sum(axis=1)
+        error = np.linalg.norm(_repulsion(positions, 0.5, 1.0) - exact, axis=1) / np.linalg.norm(exact, axis=1)
+        self.assertLess(np.median(error), 0.03)
+
+    def test_small_graph(self):
+        graph = DependencyGraph({"app": ["a", "b", "app"], "a": ["c"], "b": ["c"], "c": ["a"], "other": ["app"]})
+        layout = force_layout(graph, "app")
+        self.assertEqual(layout.names[0], "app")
+        self.assertEqual(set(layout.names), {"app", "a", "b", "c"})
+        self.assertEqual(layout.depth.tolist(), [0, 1, 1, 2])
+        self.assertEqual(len(layout.sources), 5)
+        self.assertTrue(np.isfinite(layout.positions).all())
+        # Узлы не слипаются
+        delta = layout.positions[:, None, :] - layout.positions[None, :, :]
+        distance = np.sqrt((delta * delta).sum(axis=2)) + np.eye(len(layout)) * 1e9
+        self.assertGreater(distance.min(), 5)
+        self.assertEqual(force_layout(graph, "missing").names, ["missing"])
+
+    def test_html_is_self_contained(self):
+        graph = DependencyGraph({"app": ["</script><b>"], "</script><b>": []})
+        graph.versions = {"app": "1.0.0"}
+        out = io.StringIO()
+        write_html(force_layout(graph, "app"), out, graph.versions)
+        page = out.getvalue()
+        self.assertEqual(page.count("</script>"), 2)
+        self.assertNotIn("http", page)
+        payload = page[page.index('id="graph-data">') + 16:page.index("</script>")]
+        data = json.loads(payload)
+        self.assertEqual(data["names"], ["app", "</script><b>"])
+        self.assertEqual((data["versions"], data["edges"], data["depth"]), (["1.0.0", None], [0, 1], [0, 1]))
+
+    def test_large_graph_is_fast(self):
+        graph = generate_graph(10000, fanout=3, seed=1)
+        started = time.perf_counter()
+        layout = force_layout(graph, "root", iterations=20)
+        self.assertLess(time.perf_counter() - started, 10)
+        self.assertEqual(len(layout), 10000)
+        self.assertTrue(np.isfinite(layout.positions).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import io
+import random
+import time
+import unittest
+import xml.etree.ElementTree as ET
+
+from src.dependency_graph import DependencyGraph
+from src.layout import layered_layout
+from src.svg_renderer import write_svg
+
+
+class TestLayeredLayout(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph({"A": ["B", "C"], "B": ["C", "D"], "C": ["E"], "D": ["A"], "E": []})
+
+    def boxes(self, layout):
+        return {name: (x, y, w, h) for name, x, y, w, h in layout.nodes}
+
+    def test_edges_point_left_to_right_except_cycles(self):
+        layout = layered_layout(self.graph, "A")
+        boxes = self.boxes(layout)
+        self.assertEqual(set(boxes), {"A", "B", "C", "D", "E"})
+        self.assertEqual(len(layout.edges), 6)
+        for source, target, points in layout.edges:
+            if (source, target) == ("D", "A"):
+                self.assertGreater(points[0][0], points[-1][0])
+            else:
+                self.assertLess(boxes[source][0], boxes[target][0])
+                self.assertEqual(points[0][0], boxes[source][0] + boxes[source][2])
+                self.assertEqual(points[-1][0], boxes[target][0])
+
+    def test_long_edges_bend_through_dummy_layers(self):
+        layout = layered_layout(self.graph, "A")
+        long_edge = next(points for source, target, points in layout.edges if (source, target) == ("A", "C"))
+        self.assertEqual(len(long_edge), 4)
+
+    def test_nodes_in_layer_do_not_overlap(self):
+        graph = DependencyGraph({"root": [f"p{i}" for i in range(30)]})
+        boxes = sorted(self.boxes(layered_layout(graph, "root")).values())
+        column = [box for box in boxes if box[0] == boxes[-1][0]]
+        for upper, lower in zip(column, column[1:]):
+            self.assertGreaterEqual(lower[1], upper[1] + upper[3])
+
+    def test_barycenter_removes_crossings(self):
+        # Порядок детей во втором слое обратен порядку родителей
+        graph = DependencyGraph({"r": ["a", "b"], "a": ["y"], "b": ["x"], "x": [], "y": []})
+        graph.dependencies["r"].extend(["x", "y"])
+        boxes = self.boxes(layered_layout(graph, "r"))
+        self.assertEqual(boxes["a"][1] < boxes["b"][1], boxes["y"][1] < boxes["x"][1])
+
+    def test_accepts_plain_dict_and_unknown_root(self):
+        layout = layered_layout({"A": ["B"], "B": []}, "A")
+        self.assertEqual(len(layout.nodes), 2)
+        self.assertEqual(len(layered_layout({}, "missing").nodes), 1)
+
+    def test_svg_is_well_formed(self):
+        self.graph.versions = {"A": "1.0.0"}
+        out = io.StringIO()
+        write_svg(layered_layout(self.graph, "A"), out, self.graph.versions)
+        root = ET.fromstring(out.getvalue().encode("utf-8"))
+        ns = "{http://www.w3.org/2000/svg}"
+        self.assertEqual(len(root.findall(f".//{ns}rect")), 5)
+        self.assertEqual(len(root.findall(f".//{ns}path")), 7)  # 6 рёбер + наконечник
+        self.assertIn("A@1.0.0", [title.text for title in root.iter(f"{ns}title")])
+
+    def test_five_thousand_nodes(self):
+        rng = random.Random(7)
+        graph = DependencyGraph(compact=True)
+        for i in range(1, 5000):
+            graph.add_dependency(f"p{rng.randrange(i)}", f"p{i}")
+            for _ in range(2):
+                graph.add_dependency(f"p{rng.randrange(i)}", f"p{rng.randrange(i, 5000)}")
+        started = time.perf_counter()
+        layout = layered_layout(graph, "p0")
+        self.assertEqual(len(layout.nodes), 5000)
+        self.assertLess(time.perf_counter() - started, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
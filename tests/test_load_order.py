@@ -0,0 +1,75 @@
+import random
+import time
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.load_order import condense, load_waves, strongly_connected_components
+
+
+class TestLoadOrder(unittest.TestCase):
+    def setUp(self):
+        # Тот же граф, что и в test_repository.json: цикл A -> B -> D -> A
+        self.graph = DependencyGraph({"A": ["B", "C"], "B": ["C", "D"], "C": ["E"], "D": ["A"], "E": []})
+
+    def assert_dependencies_first(self, graph, waves):
+        wave_of = {package: i for i, wave in enumerate(waves) for package in wave}
+        for package, deps in graph.dependencies.items():
+            for dep in deps:
+                self.assertLessEqual(wave_of[dep], wave_of[package])
+
+    def test_components(self):
+        csr = self.graph.to_csr()
+        component, count = strongly_connected_components(csr)
+        self.assertEqual(count, 3)
+        self.assertEqual(len({component[csr.ids[name]] for name in "ABD"}), 1)
+        dag = condense(csr, component, count)
+        self.assertEqual(dag.edge_count, 2)
+        for node in range(count):
+            for target in dag.successors(node):
+                self.assertLess(target, node)
+
+    def test_cycle_is_one_group(self):
+        result = load_waves(self.graph, "A")
+        self.assertEqual(result.waves, [["E"], ["C"], ["A", "B", "D"]])
+        self.assertEqual(result.cycles, [["A", "B", "D"]])
+        self.assertEqual(self.graph.get_load_order(), ["E", "C", "A", "B", "D"])
+
+    def test_independent_packages_share_a_wave(self):
+        graph = DependencyGraph({"app": ["x", "y"], "x": ["z"], "y": ["z"], "z": [], "other": ["z"]})
+        result = load_waves(graph, "app")
+        self.assertEqual(result.waves, [["z"], ["x", "y"], ["app"]])
+        self.assertEqual(result.to_dict()["packages"], 4)
+        self.assertEqual(load_waves(graph).waves, [["z"], ["x", "y", "other"], ["app"]])
+
+    def test_self_loop_and_unknown_root(self):
+        graph = DependencyGraph({"a": ["a", "b"], "b": []})
+        self.assertEqual(load_waves(graph).cycles, [["a"]])
+        self.assertEqual(load_waves(graph, "missing").waves, [["missing"]])
+
+    def test_plain_dict(self):
+        self.assertEqual(load_waves({"a": ["b"]}).order, ["b", "a"])
+
+    def test_hundred_thousand_nodes(self):
+        rng = random.Random(3)
+        graph = DependencyGraph(compact=True)
+        size = 100000
+        for i in range(size):
+            graph.add_package(f"p{i}")
+            for _ in range(3):
+                graph.add_dependency(f"p{i}", f"p{rng.randrange(size)}")
+        started = time.perf_counter()
+        result = load_waves(graph)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(sum(len(wave) for wave in result.waves), size)
+        self.assert_dependencies_first(graph, result.waves)
+        self.assertLess(elapsed, 30)
+
+    def test_deep_chain_does_not_recurse(self):
+        graph = DependencyGraph({f"p{i}": [f"p{i + 1}"] for i in range(50000)})
+        order = graph.get_load_order("p0")
+        self.assertEqual(order[0], "p50000")
+        self.assertEqual(order[-1], "p0")
+
+
+if __name__ == "__main__":
+    unittest.main()
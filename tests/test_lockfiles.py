@@ -0,0 +1,273 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.errors import ConfigError
+from src.lockfiles import lockfile_format, read_lockfile
+
+
+PACKAGE_LOCK = {
+    "name": "app",
+    "version": "1.0.0",
+    "lockfileVersion": 3,
+    "requires": True,
+    "packages": {
+        "": {"name": "app", "version": "1.0.0", "dependencies": {"a": "^1.0.0", "b": "^1.0.0"},
+             "devDependencies": {"lib": "*"}},
+        "node_modules/a": {"version": "1.0.0", "dependencies": {"c": "^1.0.0"}},
+        "node_modules/b": {"version": "1.1.0", "dependencies": {"c": "^2.0.0"}},
+        "node_modules/b/node_modules/c": {"version": "2.0.0"},
+        "node_modules/c": {"version": "1.0.0", "optionalDependencies": {"missing": "*"}},
+        "node_modules/lib": {"resolved": "packages/lib", "link": True},
+        "packages/lib": {"name": "lib", "version": "0.1.0", "dependencies": {"a": "^1.0.0"}},
+    },
+    "dependencies": {"a": {"version": "1.0.0"}},
+}
+
+YARN_V1 = """\
+# THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
+# yarn lockfile v1
+
+
+"@scope/a@^1.0.0", "@scope/a@^1.2.0":
+  version "1.2.3"
+  resolved "https://registry.yarnpkg.com/@scope/a/-/a-1.2.3.tgz"
+  dependencies:
+    c "^1.0.0"
+
+b@^1.0.0:
+  version "1.1.0"
+  dependencies:
+    c "^2.0.0"
+  optionalDependencies:
+    fsevents "~2.1.2"
+
+c@^1.0.0:
+  version "1.0.0"
+
+c@^2.0.0:
+  version "2.0.0"
+"""
+
+YARN_BERRY = """\
+__metadata:
+  version: 6
+  cacheKey: 8
+
+"app@workspace:.":
+  version: 0.0.0-use.local
+  resolution: "app@workspace:."
+  dependencies:
+    b: ^1.0.0
+    lib: "workspace:*"
+  languageName: unknown
+  linkType: soft
+
+"b@npm:^1.0.0":
+  version: 1.1.0
+  resolution: "b@npm:1.1.0"
+  dependencies:
+    c: ^1.0.0
+  languageName: node
+  linkType: hard
+
+"c@npm:^1.0.0, c@npm:^1.0.1":
+  version: 1.0.1
+  languageName: node
+  linkType: hard
+
+"lib@workspace:packages/lib":
+  version: 0.0.0-use.local
+  dependencies:
+    c: ^1.0.1
+  languageName: unknown
+  linkType: soft
+"""
+
+PNPM_V6 = """\
+lockfileVersion: '6.0'
+
+importers:
+
+  .:
+    dependencies:
+      a:
+        specifier: ^1.0.0
+        version: 1.0.0
+      lib:
+        specifier: workspace:*
+        version: link:packages/lib
+
+  packages/lib:
+    dependencies:
+      '@scope/b':
+        specifier: ^2.0.0
+        version: 2.0.0(a@1.0.0)
+
+packages:
+
+  /a@1.0.0:
+    resolution: {integrity: sha512-aaa}
+    dependencies:
+      c: 1.0.0
+    dev: false
+
+  /@scope/b@2.0.0(a@1.0.0):
+    resolution: {integrity: sha512-bbb}
+    dependencies:
+      a: 1.0.0
+      c: 2.0.0
+    dev: false
+
+  /c@1.0.0:
+    resolution: {integrity: sha512-ccc}
+    dev: false
+
+  /c@2.0.0:
+    resolution: {integrity: sha512-ddd}
+    dev: false
+"""
+
+PNPM_V5 = """\
+lockfileVersion: 5.4
+
+specifiers:
+  a: ^1.0.0
+
+dependencies:
+  a: 1.0.0
+
+packages:
+
+  /a/1.0.0:
+    resolution: {integrity: sha512-aaa}
+    dependencies:
+      c: 1.0.0_a@1.0.0
+    dev: false
+
+  /c/1.0.0_a@1.0.0:
+    resolution: {integrity: sha512-ccc}
+    dev: false
+"""
+
+PNPM_V9 = """\
+lockfileVersion: '9.0'
+
+importers:
+
+  .:
+    dependencies:
+      a:
+        specifier: ^1.0.0
+        version: 1.0.0
+
+packages:
+
+  a@1.0.0:
+    resolution: {integrity: sha512-aaa}
+
+  c@1.0.0:
+    resolution: {integrity: sha512-ccc}
+
+snapshots:
+
+  a@1.0.0:
+    dependencies:
+      c: 1.0.0
+
+  c@1.0.0: {}
+"""
+
+
+class TestLockfiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_format_detection(self):
+        self.assertEqual(lockfile_format("/x/package-lock.json"), "npm")
+        self.assertEqual(lockfile_format("yarn.lock"), "yarn")
+        self.assertEqual(lockfile_format("pnpm-lock.yaml"), "pnpm")
+        self.assertIsNone(lockfile_format("test_complex.json"))
+
+    def test_package_lock_resolves_nested_node_modules(self):
+        graph = read_lockfile(self.write("package-lock.json", json.dumps(PACKAGE_LOCK)))
+        self.assertTrue(graph.compact)
+        self.assertEqual(graph.to_dict(), {
+            "app": ["a", "b", "lib"],
+            "a": ["c"],
+            "b": ["c@2.0.0"],
+            "lib": ["a"],
+            "c": [],
+            "c@2.0.0": [],
+        })
+        self.assertEqual(graph.versions["c@2.0.0"], "2.0.0")
+        self.assertEqual(graph.versions["lib"], "0.1.0")
+
+    def test_package_lock_v1_is_rejected(self):
+        path = self.write("package-lock.json", json.dumps({"lockfileVersion": 1, "dependencies": {}}))
+        with self.assertRaises(ConfigError):
+            read_lockfile(path)
+
+    def test_yarn_classic_with_manifest(self):
+        path = self.write("yarn.lock", YARN_V1)
+        self.write("package.json", json.dumps({"name": "app", "dependencies": {"@scope/a": "^1.2.0"},
+                                               "devDependencies": {"b": "^1.0.0"}}))
+        graph = read_lockfile(path, "project")
+        self.assertEqual(graph.to_dict(), {
+            "project": ["@scope/a", "b"],
+            "@scope/a": ["c"],
+            "b": ["c@2.0.0"],
+            "c": [],
+            "c@2.0.0": [],
+        })
+        self.assertEqual(graph.versions["@scope/a"], "1.2.3")
+
+    def test_yarn_classic_without_manifest_roots_unused_packages(self):
+        graph = read_lockfile(self.write("yarn.lock", YARN_V1))
+        self.assertEqual(graph.get_dependencies("root"), ["@scope/a", "b"])
+
+    def test_yarn_berry_workspaces(self):
+        graph = read_lockfile(self.write("yarn.lock", YARN_BERRY))
+        self.assertEqual(graph.to_dict(), {"app": ["b", "lib"], "b": ["c"], "lib": ["c"], "c": []})
+        self.assertEqual(graph.versions["c"], "1.0.1")
+
+    def test_pnpm_v6_importers_and_peer_suffixes(self):
+        graph = read_lockfile(self.write("pnpm-lock.yaml", PNPM_V6), "app")
+        self.assertEqual(graph.to_dict(), {
+            "app": ["a", "packages/lib"],
+            "a": ["c"],
+            "packages/lib": ["@scope/b"],
+            "c": [],
+            "@scope/b": ["a", "c@2.0.0"],
+            "c@2.0.0": [],
+        })
+        self.assertEqual(graph.versions["@scope/b"], "2.0.0")
+
+    def test_pnpm_v5_and_v9(self):
+        v5 = read_lockfile(self.write("pnpm-lock.yaml", PNPM_V5), "app")
+        self.assertEqual(v5.to_dict(), {"app": ["a"], "a": ["c"], "c": []})
+        self.assertEqual(v5.versions["c"], "1.0.0")
+        os.remove(os.path.join(self.tmp.name, "pnpm-lock.yaml"))
+        v9 = read_lockfile(self.write("pnpm-lock.yaml", PNPM_V9), "app")
+        self.assertEqual(v9.to_dict(), {"app": ["a"], "a": ["c"], "c": []})
+
+    def test_large_package_lock(self):
+        packages = {"": {"name": "big", "dependencies": {f"p{i}": "*" for i in range(20000)}}}
+        for i in range(20000):
+            packages[f"node_modules/p{i}"] = {"version": "1.0.0",
+                                              "dependencies": {f"p{(i * 7 + 1) % 20000}": "*"}}
+        graph = read_lockfile(self.write("package-lock.json", json.dumps({"packages": packages})))
+        self.assertEqual(graph.freeze().node_count, 20001)
+        self.assertEqual(graph.freeze().edge_count, 40000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import time
+import unittest
+
+import numpy as np
+
+from src.dependency_graph import DependencyGraph
+from src.errors import InvalidPackageNameError
+from src.metrics import compute_metrics
+from src.synthetic import generate_graph
+
+
+GRAPH = {"app": ["a", "b"], "a": ["c"], "b": ["c"], "c": ["d"], "d": ["c"], "e": []}
+
+
+def reachable(graph, package):
+    seen = {package}
+    stack = [package]
+    while stack:
+        for dependency in graph.get_dependencies(stack.pop()):
+            if dependency not in seen:
+                seen.add(dependency)
+                stack.append(dependency)
+    return seen - {package}
+
+
+class TestMetrics(unittest.TestCase):
+    def test_small_graph(self):
+        metrics = compute_metrics(DependencyGraph(GRAPH), "app", samples=100)
+        rows = {row["package"]: row for row in metrics.rows()}
+        self.assertEqual([(rows[name]["in_degree"], rows[name]["out_degree"], rows[name]["depth"])
+                          for name in ("app", "c", "e")], [(0, 2, 0), (3, 1, 2), (0, 0, -1)])
+        self.assertEqual({name: (row["dependencies"], row["dependents"]) for name, row in rows.items()},
+                         {"app": (4, 0), "a": (2, 1), "b": (2, 1), "c": (1, 4), "d": (1, 4), "e": (0, 0)})
+        # Все источники выбраны - betweenness точная
+        self.assertEqual({name: row["betweenness"] for name, row in rows.items()},
+                         {"app": 0.0, "a": 1.0, "b": 1.0, "c": 3.0, "d": 0.0, "e": 0.0})
+        self.assertAlmostEqual(sum(row["pagerank"] for row in rows.values()), 1.0)
+        self.assertEqual(metrics.rows()[0]["package"], "c")
+        self.assertEqual([row["package"] for row in metrics.rows("depth", limit=2, ascending=True)], ["e", "app"])
+        self.assertEqual(metrics.max_depth, 3)
+
+        with self.assertRaises(InvalidPackageNameError):
+            compute_metrics(DependencyGraph(GRAPH), "missing")
+        with self.assertRaises(ValueError):
+            metrics.rows("size")
+
+    def test_closure_matches_traversal(self):
+        graph = generate_graph(400, fanout=3, cycles=5, seed=4)
+        metrics = compute_metrics(graph, "root", samples=0)
+        self.assertTrue(metrics.exact)
+        dependents = {name: 0 for name in graph.get_graph()}
+        for row in metrics.rows():
+            closure = reachable(graph, row["package"])
+            self.assertEqual(row["dependencies"], len(closure), row["package"])
+            for dependency in closure:
+                dependents[dependency] += 1
+        self.assertEqual({row["package"]: row["dependents"] for row in metrics.rows()}, dependents)
+
+    def test_closure_estimate(self):
+        graph = generate_graph(5000, fanout=4, seed=2)
+        exact = compute_metrics(graph, "root", samples=0, exact=True).columns["dependents"]
+        estimate = compute_metrics(graph, "root", samples=0, exact=False).columns["dependents"]
+        large = exact > 100
+        error = np.abs(estimate[large] - exact[large]) / exact[large]
+        self.assertLess(np.median(error), 0.2)
+
+    def test_large_graph_is_fast(self):
+        graph = generate_graph(100000, fanout=5, seed=1)
+        started = time.perf_counter()
+        metrics = compute_metrics(graph, "root")
+        self.assertLess(time.perf_counter() - started, 15)
+        self.assertFalse(metrics.exact)
+        self.assertEqual(metrics.rows("dependencies", limit=1)[0]["package"], "root")
+        self.assertEqual(int((metrics.columns["depth"] >= 0).sum()), len(graph.get_graph()))
+
+
+if __name__ == "__main__":
+    unittest.main()
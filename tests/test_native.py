@@ -0,0 +1,128 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.errors import InvalidURLError
+from src.native import compare_graphs, read_npm_ls
+from src.synthetic import generate_graph, write_npm_ls
+from src.visualizer import DependencyVisualizer
+from src.cli import print_comparison
+
+
+NPM_LS = {
+    "name": "app",
+    "version": "1.0.0",
+    "dependencies": {
+        "a": {
+            "version": "1.0.0",
+            "resolved": "https://registry.npmjs.org/a/-/a-1.0.0.tgz",
+            "dependencies": {
+                "c": {"version": "2.0.0", "dependencies": {"d": {"version": "1.0.0"}}},
+                "e": {"required": "^1.0.0", "missing": True},
+            },
+        },
+        "b": {"version": "1.0.0", "dependencies": {"c": {"version": "1.0.0"}, "a": {"version": "1.0.0"}}},
+        "c": {"version": "1.0.0", "overridden": False, "problems": ["invalid: c@1.0.0"]},
+    },
+}
+
+
+def graph_of(dependencies, versions):
+    graph = DependencyGraph(dependencies)
+    graph.versions = versions
+    return graph
+
+
+class NativeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def dump(self, data, name="npm-ls.json"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
+
+
+class TestReadNpmLs(NativeTestCase):
+    def test_nested_tree(self):
+        problems = []
+        graph = read_npm_ls(self.dump(NPM_LS), problems=problems)
+        self.assertEqual(graph.to_dict(), {
+            "app": ["a", "b", "c"],
+            "a": ["c@2.0.0"],
+            "b": ["c", "a"],
+            "c": [],
+            "c@2.0.0": ["d"],
+            "d": [],
+        })
+        self.assertEqual(graph.versions["c@2.0.0"], "2.0.0")
+        self.assertEqual(problems, ["e"])
+
+    def test_pnpm_projects_and_missing_file(self):
+        path = self.dump([{"name": "app", "version": "0.1.0", "dependencies": {"a": {"version": "1.0.0"}},
+                           "devDependencies": {"t": {"version": "3.0.0"}}}, {"name": "other"}])
+        self.assertEqual(read_npm_ls(path).to_dict(), {"app": ["a", "t"], "a": [], "t": []})
+        with self.assertRaises(InvalidURLError):
+            read_npm_ls(os.path.join(self.tmp.name, "none.json"))
+
+
+class TestCompareGraphs(NativeTestCase):
+    def test_discrepancies(self):
+        ours = graph_of({"app": ["a", "b"], "a": ["c"], "b": ["c", "x"], "c": [], "x": []},
+                        {"app": "1.0.0", "a": "1.0.0", "b": "1.0.0", "c": "1.0.0", "x": "1.0.0"})
+        report = DependencyVisualizer(ours).compare_with_native_tools("app", self.dump(NPM_LS)).to_dict()
+        self.assertFalse(report["identical"])
+        self.assertEqual(report["ours"], {"packages": 5, "edges": 5})
+        self.assertEqual(report["native"], {"packages": 6, "edges": 7})
+        differences = report["differences"]
+        self.assertEqual(differences["missing_in_native"], ["x@1.0.0"])
+        self.assertEqual(differences["missing_in_our"], ["d@1.0.0"])
+        self.assertEqual(differences["version_differences"], [{"name": "c", "ours": [], "native": ["2.0.0"]}])
+        self.assertEqual(differences["edges_missing_in_native"], [["a@1.0.0", "c@1.0.0"]])
+        self.assertEqual(differences["edges_missing_in_our"], [["app@1.0.0", "c@1.0.0"], ["b@1.0.0", "a@1.0.0"]])
+        self.assertEqual(report["problems"], ["e"])
+
+    def test_unresolved_versions(self):
+        # "c" обходчик не разрешил - узел без версии рядом с разрешённым c@3.0.0
+        ours = graph_of({"app": ["a", "b"], "a": ["c", "c@3.0.0"], "b": ["c"], "c": [], "c@3.0.0": []},
+                        {"app": "1.0.0", "a": "1.0.0", "b": "1.0.0", "c": None, "c@3.0.0": "3.0.0"})
+        comparison = compare_graphs(ours, read_npm_ls(self.dump(NPM_LS)), "app")
+        self.assertEqual(comparison.version_differences,
+                         [{"name": "c", "ours": ["3.0.0"], "native": ["1.0.0", "2.0.0"]}])
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            print_comparison(comparison)
+        self.assertIn("c: у нас 3.0.0, в штатных 1.0.0, 2.0.0", out.getvalue())
+
+    def test_versions_are_ignored_without_them(self):
+        ours = DependencyGraph({"app": ["a", "b", "c"], "a": ["c"], "b": ["c", "a"], "c": ["d"], "d": []})
+        comparison = compare_graphs(ours, read_npm_ls(self.dump(NPM_LS)), "app")
+        self.assertFalse(comparison.compare_versions)
+        self.assertEqual(comparison.to_dict()["differences"]["edges_missing_in_our"], [])
+        self.assertTrue(comparison.identical)
+
+    def test_large_round_trip(self):
+        graph = generate_graph(20000, seed=5, cycles=10)
+        path = os.path.join(self.tmp.name, "large.json")
+        write_npm_ls(graph, path)
+        native = read_npm_ls(path)
+        self.assertEqual(native.to_csr().edge_count, graph.to_csr().edge_count)
+        self.assertTrue(compare_graphs(graph, native, "root").identical)
+
+        native.versions["pkg-77"] = "0.0.1"
+        native.add_dependency("pkg-5", "pkg-9")
+        report = compare_graphs(graph, native, "root").to_dict()["differences"]
+        self.assertEqual(report["version_differences"],
+                         [{"name": "pkg-77", "ours": [graph.versions["pkg-77"]], "native": ["0.0.1"]}])
+        self.assertIn([f"pkg-5@{graph.versions['pkg-5']}", f"pkg-9@{graph.versions['pkg-9']}"],
+                      report["edges_missing_in_our"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+import gzip
+import json
+import os
+import threading
+import tempfile
+import unittest
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from src.cache import PackumentCache
+from src.npm_client import NPMClient
+from src.errors import InvalidPackageNameError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_packument(name, version, dependencies):
+    return {
+        "name": name,
+        "dist-tags": {"latest": version},
+        "versions": {version: {"name": name, "version": version, "dependencies": dependencies}},
+    }
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        name = unquote(self.path.lstrip("/"))
+        with server.lock:
+            server.requests.append(name)
+            server.clients.add(self.client_address)
+            server.accept.add(self.headers.get("Accept"))
+        packument = server.packuments.get(name)
+        body = json.dumps(packument).encode() if packument else b'{"error":"Not found"}'
+        etag = '"%x"' % zlib.crc32(body)
+        if packument and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200 if packument else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalRegistry:
+    """Локальная замена npm реестра для тестов"""
+
+    def __init__(self, packuments):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RegistryHandler)
+        self.server.packuments = packuments
+        self.server.requests = []
+        self.server.clients = set()
+        self.server.accept = set()
+        self.server.lock = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self.server
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestNPMClientCrawler(unittest.TestCase):
+    def setUp(self):
+        self.packuments = {
+            "app": make_packument("app", "1.0.0", {"a": "^1.0.0", "b": "^2.0.0"}),
+            "a": make_packument("a", "1.2.0", {"c": "^1.0.0", "@scope/d": "^1.0.0"}),
+            "b": make_packument("b", "2.0.1", {"c": "^1.0.0", "missing": "*"}),
+            "c": make_packument("c", "1.0.3", {"a": "^1.0.0"}),
+            "@scope/d": make_packument("@scope/d", "1.1.0", {}),
+        }
+        for i in range(40):
+            self.packuments["app"]["versions"]["1.0.0"]["dependencies"][f"leaf{i}"] = "*"
+            self.packuments[f"leaf{i}"] = make_packument(f"leaf{i}", "0.1.0", {})
+
+    def test_crawls_transitive_closure(self):
+        registry = LocalRegistry(self.packuments)
+        with registry as server:
+            client = NPMClient(registry.url, max_workers=4)
+            client.verbose = False
+            graph = client.get_dependencies_recursive("app")
+            client.close()
+
+        self.assertEqual(graph.get_dependencies("a"), ["c", "@scope/d"])
+        self.assertEqual(graph.get_dependencies("c"), ["a"])
+        self.assertEqual(graph.versions["b"], "2.0.1")
+        self.assertIn("missing", graph.dependencies)
+        self.assertIn("missing", client.failed)
+        # Каждый пакет запрошен ровно один раз, несмотря на ромбы и цикл a -> c -> a
+        self.assertEqual(sorted(server.requests), sorted(set(server.requests)))
+        self.assertEqual(len(server.requests), len(self.packuments) + 1)
+        # Соединения переиспользуются: их не больше, чем рабочих потоков
+        self.assertLessEqual(len(server.clients), 4)
+        self.assertEqual(len(server.accept), 1)
+        self.assertTrue(server.accept.pop().startswith("application/vnd.npm.install-v1+json"))
+
+    def test_failed_lookup_does_not_claim_name(self):
+        # a требует c, которого нет, раньше, чем b находит c@1.0.3
+        self.packuments["a"]["versions"]["1.2.0"]["dependencies"] = {"c": "^9.0.0"}
+        self.packuments["b"]["versions"]["2.0.1"]["dependencies"] = {"c": "^1.0.0"}
+
+        registry = LocalRegistry(self.packuments)
+        with registry:
+            client = NPMClient(registry.url, max_workers=4)
+            client.verbose = False
+            graph = client.get_dependencies_recursive("app")
+            client.close()
+
+        self.assertIn("c", client.failed)
+        self.assertEqual(graph.get_dependencies("a"), ["c"])
+        self.assertEqual(graph.get_dependencies("b"), ["c"])
+        self.assertEqual(graph.versions["c"], "1.0.3")
+        self.assertEqual(graph.get_dependencies("c"), ["a"])
+        self.assertFalse([key for key in graph.get_graph() if key.startswith("c@")])
+
+    def test_ranges_resolve_to_concrete_versions(self):
+        self.packuments["c"]["versions"]["2.0.0"] = {"version": "2.0.0", "dependencies": {}}
+        self.packuments["c"]["versions"]["1.1.0-beta.1"] = {"version": "1.1.0-beta.1", "dependencies": {}}
+        self.packuments["c"]["dist-tags"]["latest"] = "2.0.0"
+        self.packuments["b"]["versions"]["2.0.1"]["dependencies"] = {"c": "^2.0.0"}
+
+        registry = LocalRegistry(self.packuments)
+        with registry as server:
+            client = NPMClient(registry.url, max_workers=4)
+            client.verbose = False
+            graph = client.get_dependencies_recursive("app")
+            client.close()
+
+        # Ближайший к корню экземпляр занимает имя, другие версии - "имя@версия"
+        self.assertEqual(graph.get_dependencies("a"), ["c", "@scope/d"])
+        self.assertEqual(graph.get_dependencies("b"), ["c@2.0.0"])
+        self.assertEqual(graph.versions["c"], "1.0.3")
+        self.assertEqual(graph.versions["c@2.0.0"], "2.0.0")
+        self.assertEqual(server.requests.count("c"), 1)
+
+    def test_missing_root_raises(self):
+        registry = LocalRegistry(self.packuments)
+        with registry:
+            client = NPMClient(registry.url, max_workers=2)
+            client.verbose = False
+            with self.assertRaises(InvalidPackageNameError):
+                client.get_dependencies_recursive("nope")
+            client.close()
+
+    def test_test_mode_builds_graph_from_file(self):
+        client = NPMClient()
+        repo_path = os.path.join(ROOT, "test_repository.json")
+        graph = client.get_dependencies_recursive("A", test_mode=True, repo_path=repo_path)
+        self.assertEqual(graph.get_dependencies("D"), ["A"])
+        self.assertEqual(set(graph.dependencies), {"A", "B", "C", "D", "E"})
+
+
+class TestNPMClientCache(unittest.TestCase):
+    def setUp(self):
+        self.packuments = {
+            "app": make_packument("app", "1.0.0", {"a": "^1.0.0"}),
+            "a": make_packument("a", "1.0.0", {}),
+        }
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def crawl(self, registry, cache):
+        client = NPMClient(registry.url, max_workers=2, cache=cache)
+        client.verbose = False
+        graph = client.get_dependencies_recursive("app")
+        client.close()
+        return graph
+
+    def test_warm_cache_skips_network(self):
+        registry = LocalRegistry(self.packuments)
+        with registry as server:
+            self.crawl(registry, PackumentCache(self.tmp.name))
+            graph = self.crawl(registry, PackumentCache(self.tmp.name))
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(graph.get_dependencies("app"), ["a"])
+
+    def test_stale_entries_are_revalidated(self):
+        registry = LocalRegistry(self.packuments)
+        with registry as server:
+            self.crawl(registry, PackumentCache(self.tmp.name))
+            cache = PackumentCache(self.tmp.name, ttl=0)
+            graph = self.crawl(registry, cache)
+
+        self.assertEqual(len(server.requests), 4)
+        self.assertEqual(cache.revalidated, 2)
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(graph.versions["a"], "1.0.0")
+
+
+if __name__ == '__main__':
+    unittest.main()
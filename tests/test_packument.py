@@ -0,0 +1,62 @@
+import io
+import json
+import unittest
+
+from src.errors import ConfigError
+from src.packument import scan_packument
+
+
+class TrickleStream(io.BytesIO):
+    """Поток, отдающий данные маленькими порциями, чтобы проверить границы буфера"""
+
+    def read(self, size=-1):
+        return super().read(7)
+
+
+def latest(version, dist_tags):
+    return version == dist_tags.get("latest")
+
+
+class TestScanPackument(unittest.TestCase):
+    def setUp(self):
+        self.document = {
+            "_id": "demo",
+            "name": "demo",
+            "dist-tags": {"latest": "2.0.0", "next": "3.0.0-rc.1"},
+            "versions": {
+                "1.0.0": {"version": "1.0.0", "dependencies": {"old": "^1.0.0"}},
+                "2.0.0": {"version": "2.0.0", "dependencies": {"a": "^1.2.3", "юникод": "*"}},
+                "3.0.0-rc.1": {"version": "3.0.0-rc.1", "dependencies": {}},
+            },
+            "time": {"2.0.0": "2020-01-01T00:00:00.000Z"},
+            "readme": "x" * 200000,
+        }
+
+    def encode(self, document):
+        return json.dumps(document, ensure_ascii=False).encode("utf-8")
+
+    def test_extracts_only_selected_version(self):
+        result = scan_packument(TrickleStream(self.encode(self.document)), latest)
+        self.assertEqual(result["name"], "demo")
+        self.assertEqual(result["dist-tags"]["latest"], "2.0.0")
+        self.assertEqual(list(result["versions"]), ["2.0.0"])
+        self.assertEqual(result["versions"]["2.0.0"]["dependencies"], {"a": "^1.2.3", "юникод": "*"})
+
+    def test_stops_reading_after_versions(self):
+        stream = io.BytesIO(self.encode(self.document))
+        scan_packument(stream, latest)
+        self.assertLess(stream.tell(), len(stream.getvalue()))
+
+    def test_versions_before_dist_tags(self):
+        document = {"versions": self.document["versions"], "dist-tags": self.document["dist-tags"]}
+        result = scan_packument(TrickleStream(self.encode(document)), latest)
+        self.assertEqual(list(result["versions"]), ["2.0.0"])
+
+    def test_truncated_document(self):
+        data = self.encode(self.document)[:120]
+        with self.assertRaises(ConfigError):
+            scan_packument(io.BytesIO(data), latest)
+
+
+if __name__ == '__main__':
+    unittest.main()
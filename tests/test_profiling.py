@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src import profiling
+from src.ascii_tree import generate_ascii_tree
+from src.cache import PackumentCache
+from src.dependency_graph import DependencyGraph
+from src.exporters import export_to_file
+from src.npm_client import NPMClient
+from src.profiling import Profiler, activate
+from tests.test_npm_client import LocalRegistry, make_packument
+
+
+class TestProfiler(unittest.TestCase):
+    def test_inactive_calls_are_noops(self):
+        self.assertIsNone(profiling.active())
+        with profiling.phase("idle"):
+            profiling.count("idle")
+        self.assertIs(profiling.phase("a"), profiling.phase("b"))
+
+    def test_phases_and_counters(self):
+        graph = DependencyGraph({"app": ["a", "b"], "a": ["b"], "b": []})
+        with tempfile.TemporaryDirectory() as tmp, activate(Profiler(trace_memory=True)) as profiler:
+            for _ in range(3):
+                generate_ascii_tree(graph, "app")
+            export_to_file(graph, "app", "dot", os.path.join(tmp, "graph.dot"))
+            profiling.count("cache.hits", 3)
+            profiling.count("cache.misses")
+        self.assertIsNone(profiling.active())
+
+        report = profiler.report()
+        json.dumps(report)
+        self.assertEqual(report["phases"]["render.ascii"]["calls"], 3)
+        self.assertEqual(report["phases"]["export.dot"]["calls"], 1)
+        self.assertEqual(report["counters"]["export.edges"], 3)
+        self.assertEqual(report["cache_hit_ratio"], {"cache": 0.75})
+        self.assertGreater(report["tracemalloc_peak_bytes"], 0)
+        self.assertTrue(report["top_allocators"])
+        if report["peak_rss_bytes"] is not None:
+            self.assertGreater(report["peak_rss_bytes"], 1024 * 1024)
+
+    def test_prometheus_textfile(self):
+        profiler = Profiler()
+        with activate(profiler):
+            with profiling.phase("render.ascii"):
+                profiling.count("registry.bytes", 512)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = profiler.write(os.path.join(tmp, "depviz.prom"), labels={"command": 'say "hi"'})
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            self.assertEqual(os.listdir(tmp), ["depviz.prom"])
+
+        self.assertIn('# TYPE depviz_phase_wall_seconds_total counter\n', text)
+        self.assertIn('depviz_phase_calls_total{command="say \\"hi\\"",phase="render.ascii"} 1\n', text)
+        self.assertIn('depviz_registry_bytes_total{command="say \\"hi\\""} 512\n', text)
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                float(line.rsplit(" ", 1)[1])
+
+    def test_registry_requests_bytes_and_cache(self):
+        packuments = {"app": make_packument("app", "1.0.0", {"a": "^1.0.0"}),
+                      "a": make_packument("a", "1.0.0", {})}
+        with tempfile.TemporaryDirectory() as tmp, LocalRegistry(packuments) as server:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            reports = []
+            for _ in range(2):
+                with activate(Profiler()) as profiler:
+                    client = NPMClient(url, max_workers=2, cache=PackumentCache(tmp))
+                    client.verbose = False
+                    client.get_dependencies_recursive("app")
+                    client.close()
+                reports.append(profiler.report())
+
+        cold, warm = reports
+        self.assertEqual(cold["counters"]["registry.requests"], 2)
+        self.assertEqual(cold["counters"]["http.requests"], 2)
+        self.assertGreater(cold["counters"]["registry.bytes"], 100)
+        self.assertGreater(cold["counters"]["http.wire_bytes"], 0)
+        self.assertEqual(cold["cache_hit_ratio"]["cache"], 0.0)
+        self.assertIn("registry.crawl", cold["phases"])
+        self.assertIn("registry.parse", cold["phases"])
+        self.assertNotIn("registry.requests", warm["counters"])
+        self.assertEqual(warm["cache_hit_ratio"]["cache"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import time
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.errors import InvalidPackageNameError
+from src.reachability import ReachabilityIndex
+from src.synthetic import ROOT, generate_graph
+
+
+class TestReachabilityIndex(unittest.TestCase):
+    def setUp(self):
+        # app -> a -> c -> d, app -> b -> d, b <-> e (цикл), tool -> e, orphan
+        self.graph = DependencyGraph({
+            "app": ["a", "b"],
+            "a": ["c"],
+            "b": ["d", "e"],
+            "c": ["d"],
+            "d": [],
+            "e": ["b"],
+            "tool": ["e"],
+            "orphan": [],
+        })
+
+    def test_dependents_and_roots(self):
+        index = ReachabilityIndex(self.graph)
+        self.assertEqual([index.csr.names[root] for root in index.roots], ["app", "tool", "orphan"])
+        self.assertEqual(sorted(index.dependents_of("d")), ["b", "c"])
+        self.assertEqual(index.roots_of("d"), ["app", "tool"])
+        self.assertEqual(index.roots_of("c"), ["app"])
+        self.assertEqual(index.roots_of("orphan"), ["orphan"])
+
+    def test_reaches(self):
+        index = self.graph.get_reachability_index()
+        self.assertTrue(index.reaches("app", "d"))
+        self.assertTrue(index.reaches("e", "b"))
+        self.assertTrue(index.reaches("b", "e"))
+        self.assertTrue(index.reaches("tool", "d"))
+        self.assertFalse(index.reaches("tool", "c"))
+        self.assertFalse(index.reaches("d", "app"))
+
+    def test_k_shortest_paths(self):
+        index = ReachabilityIndex(self.graph, ["app"])
+        self.assertEqual(index.shortest_path("d"), ["app", "b", "d"])
+        self.assertEqual(index.paths("d", 5), [["app", "b", "d"], ["app", "a", "c", "d"]])
+        self.assertEqual(index.paths("b", 5), [["app", "b"]])
+        self.assertIsNone(index.shortest_path("tool"))
+        self.assertEqual(index.explain("e")["distance"], 2)
+        with self.assertRaises(InvalidPackageNameError):
+            index.paths("missing")
+
+    def test_paths_from_every_root(self):
+        index = ReachabilityIndex(self.graph)
+        self.assertEqual(index.paths("e", 3), [["tool", "e"], ["app", "b", "e"]])
+
+    def test_diamond_ladder(self):
+        # top -> l0, r0 -> m0 -> l1, r1 -> m1 ... : 2^depth равных кратчайших путей
+        depth = 20
+        graph = DependencyGraph({"top": ["l0", "r0"]})
+        for level in range(depth):
+            graph.add_dependency(f"l{level}", f"m{level}")
+            graph.add_dependency(f"r{level}", f"m{level}")
+            if level + 1 < depth:
+                graph.add_dependency(f"m{level}", f"l{level + 1}")
+                graph.add_dependency(f"m{level}", f"r{level + 1}")
+        index = ReachabilityIndex(graph, ["top"])
+        leaf = f"m{depth - 1}"
+        started = time.perf_counter()
+        self.assertEqual(len(index.shortest_path(leaf)), 2 * depth + 1)
+        paths = index.paths(leaf, 5)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(len(paths), 5)
+        self.assertEqual(len({tuple(path) for path in paths}), 5)
+        self.assertTrue(all(len(path) == 2 * depth + 1 for path in paths))
+
+    def test_queries_on_large_graph_are_fast(self):
+        graph = generate_graph(100000, cycles=10, seed=4)
+        index = ReachabilityIndex(graph, [ROOT])
+        rng = random.Random(0)
+        names = index.csr.names
+        started = time.perf_counter()
+        for _ in range(100):
+            package = names[rng.randrange(len(names))]
+            paths = index.paths(package, 3)
+            self.assertEqual(paths[0][0], ROOT)
+            self.assertEqual(paths[0][-1], package)
+            self.assertEqual(len(paths[0]) - 1, index.distance[index.node(package)])
+            self.assertEqual(index.roots_of(package), [ROOT])
+        self.assertLess((time.perf_counter() - started) / 100, 0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+import http.client
+import json
+import threading
+import time
+import unittest
+from urllib.parse import unquote
+
+from src.errors import InvalidURLError, RegistryUnavailableError
+from src.http_pool import Response
+from src.npm_client import NPMClient
+from src.scheduler import AdaptiveLimit, CircuitBreaker, RequestScheduler, SingleFlight, parse_retry_after
+
+from tests.test_npm_client import LocalRegistry, RegistryHandler, make_packument
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def response(status, **headers):
+    return Response(status, "", headers, None)
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    def test_aimd(self):
+        clock = FakeClock()
+        limit = AdaptiveLimit(maximum=8, initial=4, clock=clock)
+        for _ in range(4):
+            limit.acquire()
+        for _ in range(4):
+            limit.release(latency=0.1)
+        self.assertAlmostEqual(limit.limit, 4.92, places=2)
+
+        # Пачка 429 от уже отправленных запросов снижает предел один раз
+        for _ in range(3):
+            limit.acquire()
+        for _ in range(3):
+            limit.release(throttled=True)
+        self.assertAlmostEqual(limit.limit, 2.46, places=2)
+        clock.now += 1
+        limit.acquire()
+        limit.release(throttled=True, retry_after=5)
+        self.assertAlmostEqual(limit.limit, 1.23, places=2)
+        self.assertEqual(limit.paused_until, 6)
+
+        clock.now = 6
+        for _ in range(100):
+            limit.acquire()
+            limit.release(latency=0.1)
+        self.assertEqual(limit.limit, 8)
+
+    def test_latency_growth_decreases_limit(self):
+        clock = FakeClock()
+        limit = AdaptiveLimit(maximum=16, clock=clock)
+        for latency in (0.01, 0.5, 0.5, 0.5, 0.5):
+            clock.now += 1
+            limit.acquire()
+            limit.release(latency=latency)
+        self.assertLess(limit.limit, 16)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("7"), 7)
+        self.assertEqual(parse_retry_after("Thu, 01 Jan 1970 00:01:00 GMT", now=30), 30)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_half_open_closed(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        for _ in range(3):
+            breaker.allow("registry")
+            breaker.record_failure()
+        with self.assertRaises(RegistryUnavailableError):
+            breaker.allow("registry")
+
+        clock.now += 10
+        breaker.allow("registry")
+        # Пока пробный запрос не завершён, остальные отклоняются
+        with self.assertRaises(RegistryUnavailableError):
+            breaker.allow("registry")
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        clock.now += 10
+        breaker.allow("registry")
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.allow("registry")
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def scheduler(self, **kwargs):
+        clock = FakeClock()
+        return RequestScheduler(clock=clock, sleep=clock.sleep, **kwargs), clock
+
+    def test_retries_with_backoff(self):
+        scheduler, clock = self.scheduler(base_delay=1, max_delay=3)
+        answers = [response(503), response(502), response(500), response(200)]
+        result = scheduler.call("registry", lambda: answers.pop(0))
+        self.assertEqual(result.status, 200)
+        self.assertEqual(scheduler.retries, 3)
+        self.assertLessEqual(clock.now, 1 + 2 + 3)
+
+    def test_gives_up_and_returns_last_response(self):
+        scheduler, _ = self.scheduler(max_attempts=3, failure_threshold=10)
+        self.assertEqual(scheduler.call("registry", lambda: response(429)).status, 429)
+        self.assertEqual(scheduler.retries, 2)
+
+        def refuse():
+            raise ConnectionRefusedError("refused")
+        with self.assertRaises(ConnectionRefusedError):
+            scheduler.call("registry", refuse)
+
+    def test_circuit_breaker_fails_fast(self):
+        scheduler, _ = self.scheduler(max_attempts=10, failure_threshold=4)
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise http.client.RemoteDisconnected("closed")
+        with self.assertRaises(RegistryUnavailableError):
+            scheduler.call("registry", broken)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(scheduler.describe()["registry"]["circuit"], "open")
+        # Другие хосты не затронуты
+        self.assertEqual(scheduler.call("mirror", lambda: response(200)).status, 200)
+
+    def test_single_flight(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "packument"
+
+        results = []
+        owner = threading.Thread(target=lambda: results.append(flights.do("a", load)))
+        owner.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flights.do("a", load))) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [owner] + followers:
+            thread.join(5)
+        self.assertEqual(results, ["packument"] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+class ThrottlingHandler(RegistryHandler):
+    """Реестр, отвечающий 429/503 на первые запросы каждого пакета"""
+
+    def do_GET(self):
+        server = self.server
+        name = unquote(self.path.lstrip("/"))
+        with server.lock:
+            failures = server.failures.get(name, 0)
+            server.failures[name] = failures - 1
+            server.attempts.append(name)
+        if failures > 0:
+            body = json.dumps({"error": "slow down"}).encode()
+            self.send_response(429 if failures % 2 else 503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+
+class TestThrottledRegistry(unittest.TestCase):
+    def test_crawl_survives_throttling(self):
+        packuments = {"app": make_packument("app", "1.0.0", {f"dep{i}": "*" for i in range(20)})}
+        for i in range(20):
+            packuments[f"dep{i}"] = make_packument(f"dep{i}", "1.0.0", {})
+        registry = LocalRegistry(packuments)
+        registry.server.RequestHandlerClass = ThrottlingHandler
+        registry.server.failures = {f"dep{i}": 2 for i in range(0, 20, 3)}
+        registry.server.attempts = []
+
+        with registry as server:
+            scheduler = RequestScheduler(max_concurrency=8, base_delay=0.01)
+            client = NPMClient(registry.url, max_workers=8, scheduler=scheduler)
+            client.verbose = False
+            graph = client.get_dependencies_recursive("app")
+            client.close()
+
+        self.assertEqual(len(graph.get_dependencies("app")), 20)
+        self.assertEqual(client.failed, {})
+        self.assertEqual(scheduler.retries, 14)
+        self.assertEqual(len(server.attempts), 21 + 14)
+        host = scheduler.describe()[registry.url.split("//")[1]]
+        self.assertEqual(host["circuit"], "closed")
+        self.assertLess(host["limit"], 8)
+
+    def test_exhausted_retries_become_errors(self):
+        registry = LocalRegistry({"app": make_packument("app", "1.0.0", {})})
+        registry.server.RequestHandlerClass = ThrottlingHandler
+        registry.server.failures = {"app": 10}
+        registry.server.attempts = []
+        with registry as server:
+            client = NPMClient(registry.url, max_workers=2,
+                               scheduler=RequestScheduler(max_attempts=3, base_delay=0.01))
+            client.verbose = False
+            with self.assertRaises(InvalidURLError):
+                client.get_package_info("app")
+            client.close()
+        self.assertEqual(len(server.attempts), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from src.semver import VersionIndex, compile_range, max_satisfying, parse_version, satisfies
+
+
+class TestSemver(unittest.TestCase):
+    def setUp(self):
+        self.index = VersionIndex([
+            "0.0.3", "0.0.4", "0.1.0", "0.1.5", "0.2.0", "1.0.0", "1.2.0",
+            "1.2.3-beta.1", "1.2.3-beta.2", "1.2.3", "1.2.4", "1.3.0", "1.9.9",
+            "2.0.0-rc.1", "2.0.0", "2.1.0", "3.0.0", "not-a-version",
+        ])
+
+    def test_version_ordering(self):
+        ordered = ["1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-alpha.beta", "1.0.0-beta",
+                   "1.0.0-beta.2", "1.0.0-beta.11", "1.0.0-rc.1", "1.0.0", "1.0.1", "1.10.0"]
+        keys = [parse_version(v) for v in ordered]
+        self.assertEqual(keys, sorted(keys))
+        self.assertIsNone(parse_version("latest"))
+
+    def test_max_satisfying(self):
+        cases = {
+            "^1.2.3": "1.9.9", "~1.2.3": "1.2.4", "^0.1.0": "0.1.5", "^0.0.3": "0.0.3",
+            "1.x": "1.9.9", "1.2.*": "1.2.4", "*": "3.0.0", "": "3.0.0",
+            ">= 1.2.3 <2": "1.9.9", "1.2 - 1.3": "1.3.0", "<=1.2": "1.2.4", ">1.2": "3.0.0",
+            "1.0.0 || ^2.0.0": "2.1.0", "^4": None,
+            ">=1.2.3-beta.1 <1.2.3": "1.2.3-beta.2", "^2.0.0-rc.1": "2.1.0",
+        }
+        for range_text, expected in cases.items():
+            with self.subTest(range_text=range_text):
+                self.assertEqual(max_satisfying(self.index, range_text), expected)
+
+    def test_prereleases_need_explicit_opt_in(self):
+        self.assertFalse(satisfies("1.2.3-beta.1", "^1.2.0"))
+        self.assertTrue(satisfies("1.2.3-beta.2", "^1.2.3-beta.1"))
+        self.assertFalse(satisfies("1.3.0-beta.1", "^1.2.3-beta.1"))
+
+    def test_ranges_are_compiled_once(self):
+        self.assertIs(compile_range("^1.2.3"), compile_range("^1.2.3"))
+        self.assertIsNone(compile_range("git+https://example.com/repo.git"))
+        self.assertIsNone(compile_range("next"))
+
+
+if __name__ == '__main__':
+    unittest.main()
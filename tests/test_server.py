@@ -0,0 +1,128 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.errors import ConfigError, InvalidPackageNameError
+from src.server import DaemonClient, GraphStore, QueryService, make_server, parse_address, server_address
+from src.snapshot import save_snapshot
+from src.dependency_graph import DependencyGraph
+
+
+GRAPH = {"app": ["a", "b"], "a": ["c"], "b": ["c"], "c": []}
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, "graph.json")
+        self.write(GRAPH)
+        self.service = QueryService(GraphStore(self.source))
+
+    def write(self, graph):
+        with open(self.source, "w", encoding="utf-8") as f:
+            json.dump(graph, f)
+        # Подвигаем mtime, чтобы изменение было заметно и на грубых файловых системах
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9 * (1 + len(graph))))
+
+    def start(self, address):
+        server = make_server(address, self.service)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+        self.addCleanup(stop)
+        return server_address(server)
+
+
+class TestQueryService(ServerTestCase):
+    def query(self, endpoint, **params):
+        status, _, body = self.service.handle("/" + endpoint, params)
+        return status, body
+
+    def test_queries(self):
+        status, body = self.query("subtree", package="a")
+        self.assertEqual((status, json.loads(body)), (200, {"a": ["c"], "c": []}))
+        self.assertEqual(json.loads(self.query("subtree", package="app", depth="1")[1]),
+                         {"app": ["a", "b"], "a": [], "b": []})
+        self.assertIn("└── c", self.query("ascii", package="a")[1])
+        self.assertIn('"app" -> "a";', self.query("export", package="app", format="dot")[1])
+        self.assertIn("<svg", self.query("svg", package="app")[1])
+        self.assertIn("<canvas", self.query("html", package="app")[1])
+        self.assertEqual(json.loads(self.query("order", package="app")[1])["waves"], [["c"], ["a", "b"], ["app"]])
+        answer = json.loads(self.query("why", package="app", target="c", k="2")[1])
+        self.assertEqual(answer["paths"], [["app", "a", "c"], ["app", "b", "c"]])
+        answer = json.loads(self.query("summary", package="app", max_nodes="1")[1])
+        self.assertEqual((answer["total"], answer["visible"]), (4, 1))
+        self.assertEqual(answer["graph"], {"app": ["… +3 (app)"], "… +3 (app)": []})
+
+    def test_errors(self):
+        self.assertEqual(self.query("why", package="app", target="missing")[0], 404)
+        self.assertEqual(self.query("why", package="app")[0], 400)
+        self.assertEqual(self.query("ascii", package="app", max_depth="x")[0], 400)
+        self.assertEqual(self.query("export", package="app", format="png")[0], 400)
+        self.assertEqual(self.query("nope")[0], 404)
+        self.assertEqual(self.query("order", source=os.path.join(self.tmp.name, "none.json"), package="a")[0], 400)
+
+    def test_graph_is_loaded_once_and_reloaded_on_change(self):
+        self.query("order", package="app")
+        self.query("why", package="app", target="c")
+        self.assertEqual(self.service.store.loads, 1)
+
+        self.write({"app": ["d"], "d": []})
+        self.assertEqual(json.loads(self.query("subtree", package="app")[1]), {"app": ["d"], "d": []})
+        self.assertEqual(self.service.store.loads, 2)
+        self.assertEqual(json.loads(self.query("order", package="app")[1])["waves"], [["d"], ["app"]])
+
+    def test_snapshot_source(self):
+        path = os.path.join(self.tmp.name, "graph.snap")
+        save_snapshot(DependencyGraph(GRAPH), path)
+        answer = json.loads(self.query("why", source=path, package="app", target="c")[1])
+        self.assertEqual(answer["dependents"], ["a", "b"])
+
+
+class TestDaemonClient(ServerTestCase):
+    def test_tcp_concurrent_clients(self):
+        address = self.start("127.0.0.1:0")
+
+        def ask(i):
+            with DaemonClient(address) as client:
+                return [client.json("order", package="app")["waves"][0] for _ in range(5)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(ask, range(16)))
+        self.assertEqual(results, [[["c"]] * 5] * 16)
+        with DaemonClient(address) as client:
+            health = client.json("health")
+            self.assertEqual(health["loads"], 1)
+            self.assertEqual(health["requests"], 16 * 5 + 1)
+            with self.assertRaises(InvalidPackageNameError):
+                client.get("why", package="app", target="missing")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "нет Unix-сокетов")
+    def test_unix_socket(self):
+        path = os.path.join(self.tmp.name, "depviz.sock")
+        address = self.start(f"unix:{path}")
+        self.assertEqual(parse_address(address), ("unix", path))
+        with DaemonClient(address) as client:
+            self.assertIn("app", client.get("ascii", package="app"))
+        with self.assertRaises(ConfigError):
+            make_server(address, self.service)
+
+    def test_unavailable_server(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        with self.assertRaises(ConfigError):
+            DaemonClient(f"127.0.0.1:{port}", timeout=1).get("health")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import struct
+import tempfile
+import time
+import unittest
+from array import array
+
+from src.dependency_graph import CSRGraph, DependencyGraph
+from src.errors import ConfigError
+from src.exporters import iter_edges
+from src.load_order import load_waves
+from src.snapshot import open_snapshot, save_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "graph.snap")
+        self.graph = DependencyGraph({"app": ["@scope/пакет", "b"], "@scope/пакет": ["b@2.0.0"],
+                                      "b": ["app"], "b@2.0.0": []})
+        self.graph.versions = {"app": "1.0.0", "@scope/пакет": "0.1.0", "b": "1.0.0", "b@2.0.0": "2.0.0"}
+
+    def open(self):
+        snapshot = open_snapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_round_trip(self):
+        self.assertEqual(save_snapshot(self.graph, self.path, {"root": "app"}), (4, 4))
+        snapshot = self.open()
+        graph = snapshot.graph
+        self.assertEqual(graph.to_dict(), self.graph.to_dict())
+        self.assertEqual(dict(graph.versions), self.graph.versions)
+        self.assertEqual(snapshot.metadata["root"], "app")
+        self.assertEqual(snapshot.metadata["format"], 1)
+        self.assertEqual(graph.get_dependencies("missing"), [])
+        self.assertNotIn("missing", graph.dependencies)
+        self.assertEqual(list(iter_edges(graph, "app")), list(iter_edges(self.graph, "app")))
+        self.assertEqual(load_waves(graph, "app").waves, load_waves(self.graph, "app").waves)
+
+    def test_arrays_are_views_of_the_mapping(self):
+        save_snapshot(self.graph, self.path)
+        csr = self.open().csr
+        self.assertIsInstance(csr.targets, memoryview)
+        self.assertIsInstance(csr.offsets, memoryview)
+        self.assertEqual(list(csr.successors(csr.ids["app"])), [csr.ids["@scope/пакет"], csr.ids["b"]])
+
+    def test_loaded_graph_can_be_extended(self):
+        save_snapshot(self.graph, self.path)
+        graph = self.open().graph
+        graph.add_dependency("b@2.0.0", "new")
+        graph.add_package("new", "3.0.0")
+        self.assertEqual(graph.get_dependencies("b@2.0.0"), ["new"])
+        self.assertEqual(graph.versions["new"], "3.0.0")
+        self.assertEqual(graph.versions["app"], "1.0.0")
+
+    def test_add_package_to_loaded_graph(self):
+        save_snapshot(self.graph, self.path)
+        graph = self.open().graph
+        graph.add_package("new", "3.0.0")
+        graph.add_package("b", "1.0.1")
+        self.assertEqual(graph.get_dependencies("new"), [])
+        self.assertEqual(graph.get_dependencies("app"), ["@scope/пакет", "b"])
+        self.assertEqual(graph.versions["new"], "3.0.0")
+        self.assertEqual(graph.versions["b"], "1.0.1")
+        self.assertEqual(len(graph.to_dict()), 5)
+
+    def test_rejects_foreign_and_future_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot" * 20)
+        with self.assertRaises(ConfigError):
+            open_snapshot(self.path)
+
+        save_snapshot(self.graph, self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(8)
+            f.write(struct.pack("<I", 99))
+        with self.assertRaises(ConfigError):
+            open_snapshot(self.path)
+        with self.assertRaises(ConfigError):
+            open_snapshot(os.path.join(self.tmp.name, "missing.snap"))
+
+    def test_large_graph_opens_without_copying(self):
+        node_count, fanout = 100000, 10
+        names = [f"package-{i}" for i in range(node_count)]
+        offsets = array('q', range(0, (node_count + 1) * fanout, fanout))
+        targets = array('i', ((i * 7919 + k) % node_count for i in range(node_count) for k in range(fanout)))
+        graph = DependencyGraph.from_csr(CSRGraph(names, offsets, targets))
+        save_snapshot(graph, self.path)
+
+        started = time.perf_counter()
+        snapshot = self.open()
+        elapsed = time.perf_counter() - started
+        self.assertEqual(snapshot.edge_count, node_count * fanout)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(snapshot.graph.get_dependencies("package-99999")[0],
+                         f"package-{99999 * 7919 % node_count}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.errors import ConfigError
+from src.exporters import export_to_file
+from src.server import read_graph
+from src.store import PARAMETER_LIMIT, Store, ingest_batch
+from src.synthetic import generate_graph
+
+
+def service(name, lodash, extra=()):
+    graph = DependencyGraph({name: ["express", "utils"] + list(extra), "express": ["lodash"],
+                             "utils": ["lodash@" + lodash[1]] if lodash[1] else [],
+                             "lodash": [], **({"lodash@" + lodash[1]: []} if lodash[1] else {})})
+    graph.versions = {name: "1.0.0", "express": "4.18.2", "utils": "0.1.0", "lodash": lodash[0]}
+    if lodash[1]:
+        graph.versions["lodash@" + lodash[1]] = lodash[1]
+    for package in extra:
+        graph.add_package(package, "1.0.0")
+    return graph
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = Store(os.path.join(self.tmp.name, "depviz.db"))
+        self.addCleanup(self.store.close)
+
+    def test_fleet_queries(self):
+        self.store.ingest("billing", service("billing", ("4.17.21", "3.10.1")))
+        self.store.ingest("search", service("search", ("4.17.20", None)))
+        self.store.ingest("auth", service("auth", ("4.17.21", None), ["jsonwebtoken"]))
+
+        self.assertEqual(self.store.reach("lodash", "<4.17.21"),
+                         [{"project": "billing", "version": "3.10.1", "depth": 2},
+                          {"project": "search", "version": "4.17.20", "depth": 2}])
+        self.assertEqual([row["project"] for row in self.store.reach("jsonwebtoken")], ["auth"])
+        self.assertEqual(self.store.reach("left-pad"), [])
+        self.assertEqual(self.store.versions("lodash"), [
+            {"version": "3.10.1", "projects": 1},
+            {"version": "4.17.20", "projects": 1},
+            {"version": "4.17.21", "projects": 2},
+        ])
+        self.assertEqual(self.store.dependents("lodash", "^3.0.0"),
+                         [{"project": "billing", "package": "utils", "version": "0.1.0", "dependency": "3.10.1"}])
+        self.assertEqual([row["project"] for row in self.store.dependents("lodash", project="search")],
+                         ["search"])
+        self.assertEqual(self.store.summary(), {"projects": 3, "packages": 7, "versions": 9, "edges": 11})
+        with self.assertRaises(ConfigError):
+            self.store.reach("lodash", "not a range")
+
+    def test_reingest_replaces_project(self):
+        self.store.ingest("billing", service("billing", ("4.17.20", None)))
+        self.store.ingest("billing", service("billing", ("4.17.21", None)))
+        self.assertEqual(self.store.reach("lodash", "<4.17.21"), [])
+        self.assertEqual(len(self.store.projects()), 1)
+        self.assertEqual(self.store.projects()[0]["edges"], 3)
+        self.assertTrue(self.store.remove("billing"))
+        self.assertFalse(self.store.remove("billing"))
+        self.assertEqual(self.store.reach("lodash"), [])
+
+    def test_failed_ingest_rolls_back(self):
+        self.store.ingest("billing", service("billing", ("4.17.20", None)))
+        with self.assertRaises(ConfigError):
+            with self.store.transaction():
+                self.store.remove("billing")
+                self.store.ingest("search", DependencyGraph({"search": []}), root="missing")
+        self.assertEqual([row["project"] for row in self.store.projects()], ["billing"])
+
+    def test_many_projects_query_fast(self):
+        with self.store.transaction():
+            for seed in range(100):
+                graph = generate_graph(300, seed=seed)
+                self.store.ingest(f"svc-{seed}", graph, "root")
+        reached = {row["project"] for row in self.store.reach("pkg-250")}
+        self.assertEqual(len(reached), 100)
+
+        started = time.perf_counter()
+        rows = self.store.reach("pkg-5", "<2.0.0")
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(len(rows), 100)
+        self.assertEqual(self.store.reach("pkg-5", ">=3.0.0"), [])
+
+    def test_many_versions_query(self):
+        # Версий больше, чем параметров в одном запросе
+        count = 2 * PARAMETER_LIMIT + 1
+        keys = [f"lodash@1.0.{i}" for i in range(count)]
+        graph = DependencyGraph({"app": keys, **{key: [] for key in keys}})
+        graph.versions = {"app": "1.0.0", **{key: key.split("@")[1] for key in keys}}
+        self.store.ingest("app", graph)
+        self.assertEqual(len(self.store.reach("lodash")), count)
+        self.assertEqual(len(self.store.dependents("lodash", project="app")), count)
+        self.assertEqual(len(self.store.reach("lodash", ">=1.0.1000")), 1)
+
+    def test_batch_output_round_trip(self):
+        graph = service("billing", ("4.17.21", "3.10.1"))
+        directory = os.path.join(self.tmp.name, "0001_billing")
+        os.makedirs(directory)
+        export_to_file(graph, "billing", "json", os.path.join(directory, "graph.json"))
+        exported = read_graph(os.path.join(directory, "graph.json"))
+        self.assertEqual(exported.to_dict(), graph.to_dict())
+        self.assertEqual(exported.versions, graph.versions)
+
+        manifest = {"jobs": [
+            {"package": "billing", "repository_url": "repo.json", "status": "ok",
+             "directory": "0001_billing", "outputs": {"graph": "graph.json"}},
+            {"package": "broken", "status": "error"},
+            {"package": "billing", "repository_url": "https://registry.npmjs.org", "status": "ok",
+             "directory": "0001_billing", "outputs": {"graph": "graph.json"}},
+        ]}
+        self.assertEqual(ingest_batch(self.store, manifest, self.tmp.name), 2)
+        # Второе задание того же пакета не затирает первое
+        self.assertEqual([(row["project"], row["source"]) for row in self.store.projects()],
+                         [("0001_billing", "https://registry.npmjs.org"), ("billing", "repo.json")])
+        self.assertEqual(self.store.reach("lodash", "3.x")[0]["depth"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import time
+import unittest
+
+from src.dependency_graph import DependencyGraph
+from src.errors import InvalidPackageNameError
+from src.summary import GraphSummary, Summarizer, summarize
+from src.synthetic import generate_graph
+
+
+# app -> big (5 пакетов), mid (3), tiny (1); shared достаётся big первым
+GRAPH = {
+    "app": ["big", "mid", "tiny"],
+    "big": ["b1", "b2", "shared"],
+    "b1": ["b11"], "b2": [], "b11": [],
+    "mid": ["m1", "shared"], "m1": ["m11"], "m11": [],
+    "shared": [], "tiny": [],
+}
+
+
+def aggregated(summary):
+    return sum(aggregate["packages"] for aggregate in summary.aggregates.values())
+
+
+class TestSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.summarizer = Summarizer(DependencyGraph(GRAPH), "app")
+
+    def test_subtree_sizes(self):
+        self.assertEqual(self.summarizer.total, 10)
+        self.assertEqual([self.summarizer.size(name) for name in ("app", "big", "mid", "tiny", "b1")],
+                         [10, 5, 3, 1, 2])
+        with self.assertRaises(InvalidPackageNameError):
+            self.summarizer.size("missing")
+
+    def test_budget_keeps_heaviest_branches(self):
+        summary = self.summarizer.summarize(max_nodes=3)
+        self.assertEqual(summary.graph.get_dependencies("app"), ["big", "mid", "… +1 (app)"])
+        self.assertEqual(summary.graph.get_dependencies("big"), ["… +4 (big)"])
+        self.assertEqual(summary.aggregates["… +4 (big)"]["members"], ["b1", "b2", "shared"])
+        self.assertEqual(summary.visible + aggregated(summary), summary.total)
+
+        limited = self.summarizer.summarize(max_nodes=100, top_k=1)
+        self.assertEqual(limited.graph.get_dependencies("app"), ["big", "… +4 (app)"])
+        self.assertEqual(self.summarizer.summarize(min_size=3).graph.get_dependencies("app"),
+                         ["big", "mid", "tiny"])
+        shallow = self.summarizer.summarize(max_depth=1)
+        self.assertEqual((shallow.visible, len(shallow.aggregates)), (4, 2))
+        self.assertEqual(self.summarizer.summarize().visible, 10)
+
+    def test_expand(self):
+        summary = self.summarizer.summarize(max_nodes=1, expand=["m1"])
+        self.assertEqual(summary.graph.get_dependencies("app"), ["mid", "… +6 (app)"])
+        self.assertEqual(summary.graph.get_dependencies("mid"), ["m1"])
+        self.assertEqual(summary.graph.get_dependencies("m1"), ["m11"])
+        self.assertEqual(summary.visible + aggregated(summary), summary.total)
+
+    def test_links(self):
+        tree = self.summarizer.summarize(max_nodes=100, links=None)
+        self.assertEqual(tree.graph.get_dependencies("mid"), ["m1"])
+        self.assertEqual(self.summarizer.summarize().graph.get_dependencies("mid"), ["m1", "shared"])
+        folded = self.summarizer.summarize(max_nodes=3, links="all")
+        self.assertEqual(folded.graph.get_dependencies("mid"), ["… +2 (mid)", "… +4 (big)"])
+        with self.assertRaises(ValueError):
+            self.summarizer.summarize(links="some")
+
+        data = folded.to_dict()
+        self.assertEqual(GraphSummary.from_dict(data).to_dict(), data)
+
+    def test_large_graph(self):
+        graph = generate_graph(50000, fanout=4, distribution="powerlaw", seed=5)
+        started = time.perf_counter()
+        summary = summarize(graph, "root", max_nodes=80)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertLessEqual(summary.visible, 80)
+        self.assertEqual(summary.total, len(graph.get_graph()))
+        self.assertEqual(summary.visible + aggregated(summary), summary.total)
+
+
+if __name__ == "__main__":
+    unittest.main()
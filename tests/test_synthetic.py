@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.benchmark import CASES, run_benchmarks
+from src.load_order import load_waves
+from src.lockfiles import read_lockfile
+from src.synthetic import ROOT, FANOUT_DISTRIBUTIONS, generate_edges, generate_graph, write_package_lock, \
+    write_test_graph
+
+
+class TestSyntheticGraphs(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(generate_edges(2000, seed=5, cycles=3), generate_edges(2000, seed=5, cycles=3))
+        self.assertNotEqual(generate_edges(2000, seed=5), generate_edges(2000, seed=6))
+
+    def test_every_node_reachable_and_acyclic_without_cycles(self):
+        for distribution in FANOUT_DISTRIBUTIONS:
+            with self.subTest(distribution=distribution):
+                graph = generate_graph(3000, distribution=distribution, seed=1)
+                result = load_waves(graph, ROOT)
+                self.assertEqual(sum(len(wave) for wave in result.waves), 3000)
+                self.assertEqual(result.cycles, [])
+                self.assertEqual(result.waves[-1], [ROOT])
+
+    def test_fanout_and_diamonds(self):
+        tree = generate_graph(2000, diamond_density=0.0, distribution="fixed", fanout=2).freeze()
+        self.assertEqual(tree.edge_count, 1999)
+        self.assertEqual(max(tree.offsets[i + 1] - tree.offsets[i] for i in range(2000)), 2)
+        edges = len(generate_edges(5000, fanout=4, distribution="fixed", diamond_density=1.0)[0])
+        self.assertAlmostEqual(edges / 5000, 5, delta=0.3)
+        sparse = len(generate_edges(5000, diamond_density=0.1)[0])
+        dense = len(generate_edges(5000, diamond_density=0.9)[0])
+        self.assertGreater(dense, sparse)
+
+    def test_cycles_are_added(self):
+        graph = generate_graph(3000, cycles=4, seed=2)
+        # cycles - число обратных рёбер; сливаясь, циклы дают не больше компонент
+        self.assertTrue(1 <= len(load_waves(graph, ROOT).cycles) <= 4)
+        self.assertEqual(graph.freeze().edge_count, generate_graph(3000, seed=2).freeze().edge_count + 4)
+
+    def test_writers_round_trip(self):
+        graph = generate_graph(300, seed=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.json")
+            write_test_graph(graph, path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f), graph.to_dict())
+            lock = os.path.join(tmp, "package-lock.json")
+            write_package_lock(graph, lock)
+            self.assertEqual(read_lockfile(lock).to_dict(), graph.to_dict())
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_results_are_machine_readable(self):
+        results = run_benchmarks(sizes=[200], repeat=1, cycles=1)
+        json.dumps(results)
+        self.assertEqual([record["case"] for record in results["results"]], list(CASES))
+        for record in results["results"]:
+            self.assertEqual(record["nodes"], 200)
+            self.assertGreater(record["seconds"], 0)
+            self.assertGreater(record["peak_bytes"], 0)
+        self.assertEqual(results["parameters"]["cycles"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -30,10 +30,11 @@ class TestVisualizer(unittest.TestCase):
         self.assertIn("loose-envify", ascii_tree)
 
     def test_comparison_structure(self):
-        comparison = self.visualizer.compare_with_native_tools("react")
-        self.assertIn('our_dependencies', comparison)
-        self.assertIn('native_dependencies', comparison)
-        self.assertIn('differences', comparison)
+        native = DependencyGraph({"react": ["prop-types"], "prop-types": []})
+        comparison = self.visualizer.compare_with_native_tools("react", native).to_dict()
+        self.assertIn('ours', comparison)
+        self.assertIn('native', comparison)
+        self.assertEqual(comparison['differences']['missing_in_native'], ["js-tokens", "loose-envify"])
 
 
 if __name__ == '__main__':